@@ -1,12 +1,20 @@
 import os
 import uuid
 import json
-import time
 import shutil
+import threading
+import zipfile
+import unicodedata
+from urllib.parse import quote
 from flask import Flask, render_template, request, jsonify, Response, stream_with_context, send_file, url_for, after_this_request
-from src import config, extractor, visualizer, formula_converter, builder, mappings
+from src import config, visualizer, builder, render_jobs, session_store, conversion_jobs, uploads, pipeline, batch, metrics, reaper, profiler
+from src import review as review_data
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from src.partition import MODES as partition_modes
 
 app = Flask(__name__)
+app.request_class = uploads.UploadRequest
 
 # --- CRITICAL CONFIGURATION ---
 # These keys MUST be set for the app to work.
@@ -14,130 +22,196 @@ app.config['UPLOAD_FOLDER'] = config.INPUT_DIR
 app.config['OUTPUT_FOLDER'] = config.OUTPUT_DIR
 app.config['STATIC_FOLDER'] = os.path.join(os.path.dirname(__file__), 'static')
 app.config['GRAPH_FOLDER'] = os.path.join(app.config['STATIC_FOLDER'], 'graphs')
+app.config['MAX_CONTENT_LENGTH'] = config.UPLOAD_MAX_REQUEST_BYTES
 
 # Create directories if they don't exist
 for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'], app.config['GRAPH_FOLDER']]:
     os.makedirs(folder, exist_ok=True)
 
-# Global Session Store
-SESSIONS = {}
+# Global Session Store (backend chosen by config.SESSION_BACKEND)
+SESSIONS = session_store.create_store()
+
+def count_sessions():
+    counts = SESSIONS.metrics()
+    if 'stored_sessions' in counts:
+        return counts['stored_sessions']
+    return counts['resident_sessions'] + counts['spilled_sessions']
+
+# Gauges are read when /metrics is scraped, not maintained on every request
+metrics.ACTIVE_SESSIONS.set_function(count_sessions)
+metrics.ACTIVE_JOBS.set_function(conversion_jobs.JOBS.count_active)
+metrics.PENDING_RENDERS.set_function(render_jobs.pending_count)
+
+# Abandoned sessions' files are swept in the background (see src/reaper.py)
+if config.REAPER_ENABLED:
+    reaper.start(SESSIONS)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 # --- STAGE 1: UPLOAD ---
+# Uploads are hashed while they stream to disk (see src/uploads.py); identical
+# packages are stored once and the content hash travels with the session.
+@app.errorhandler(413)
+def too_large(e):
+    return jsonify({"error": e.description or "Upload too large"}), 413
+
 @app.route('/upload', methods=['POST'])
 def upload():
+    # Reject oversized bodies before reading them
+    if request.content_length and request.content_length > config.UPLOAD_MAX_BYTES + 64 * 1024:
+        return too_large(RequestEntityTooLarge(f"File exceeds the {config.UPLOAD_MAX_BYTES // (1024 * 1024)} MB upload limit"))
     if 'file' not in request.files: return jsonify({"error": "No file"}), 400
     file = request.files['file']
     
+    SESSIONS.expire()   # Opportunistic sweep of idle sessions
     session_id = str(uuid.uuid4())
-    filename = f"{session_id}_{file.filename}"
+    filename = f"{session_id}_{secure_filename(file.filename) or 'upload'}"
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
+    content_hash, size, duplicate = uploads.commit_upload(file, filepath)
+    if duplicate:
+        print(f"♻️ Duplicate upload {file.filename} ({content_hash[:12]}), reusing stored blob")
     
     SESSIONS[session_id] = {
         "filepath": filepath,
         "filename": file.filename,
+        "content_hash": content_hash,
         "graph": None
     }
     
-    return jsonify({"status": "success", "session_id": session_id})
+    # Eager mode: extraction, parsing, rendering and conversion start right away
+    if config.EAGER_PIPELINE:
+        pipeline.kickoff(session_id, SESSIONS)
+    
+    return jsonify({"status": "success", "session_id": session_id,
+                    "content_hash": content_hash, "size": size, "duplicate": duplicate})
 
 # --- STAGE 2: VISUALIZE ---
 @app.route('/visualize/<session_id>')
 def visualize(session_id):
-    if session_id not in SESSIONS: return jsonify({"error": "Expired"}), 404
-    session = SESSIONS[session_id]
+    session = SESSIONS.get(session_id)
+    if not session: return jsonify({"error": "Expired"}), 404
 
-    workflow_file = extractor.prepare_workflow_file(session['filepath'])
-    graph = extractor.parse_workflow(workflow_file)
-    session['graph'] = graph 
+    # The eager pipeline has usually parsed the upload already
+    graph = session.get('graph') or pipeline.wait_for_graph(session_id, config.EAGER_WAIT_SECONDS)
+    if graph is None:
+        graph = pipeline.load_graph(session_id, session)
+        if graph is None: return jsonify({"error": "Could not read a workflow from the upload"}), 422
+        graph = pipeline.store_graph(SESSIONS, session_id, graph)
+        if graph is None: return jsonify({"error": "Expired"}), 404
+
+    # Client mode: ship the layout as JSON and let the browser draw it (no matplotlib)
+    mode = request.args.get('mode', config.VISUALIZE_MODE)
+    if mode == 'client':
+        return jsonify({
+            "status": "success",
+            "layout": visualizer.build_layout(graph),
+            "node_count": len(graph['nodes'])
+        })
     
-    img_filename = f"viz_{session_id}.png"
-    img_path = os.path.join(app.config['GRAPH_FOLDER'], img_filename)
-    visualizer.draw_exact_workflow(graph, img_path)
+    # PNG mode: rendering runs in the background; identical graphs come straight
+    # from the render cache. The client polls status_url for the image.
+    # ?lod=full|compact|overview overrides the automatic level of detail
+    lod = request.args.get('lod') or config.VIZ_LOD
+    if lod not in visualizer.LOD_LEVELS:
+        return jsonify({"error": f"Unknown level of detail '{lod}'"}), 400
+    graph_hash = render_jobs.submit(graph, lod)
+    session = SESSIONS.update(session_id, lambda s: s.update(graph_hash=graph_hash, graph_lod=lod))
+    if session is None: return jsonify({"error": "Expired"}), 404
     
     return jsonify({
         "status": "success",
-        "image_url": f"/static/graphs/{img_filename}",
-        "node_count": len(graph['nodes'])
+        "node_count": len(graph['nodes']),
+        "status_url": url_for('visualize_status', session_id=session_id),
+        **render_status_payload(session)
     })
 
+@app.route('/visualize/<session_id>/status')
+def visualize_status(session_id):
+    session = SESSIONS.get(session_id)
+    if not session or not session.get('graph_hash'): return jsonify({"error": "Expired"}), 404
+
+    payload = render_status_payload(session)
+    if payload['image_status'] == 'missing':
+        # Queued by another worker process (or lost on restart): queue it here
+        render_jobs.submit(session['graph'], session.get('graph_lod'))
+        payload = render_status_payload(session)
+    return jsonify(payload)
+
+def render_status_payload(session):
+    state, detail = render_jobs.status(session['graph_hash'])
+    payload = {"image_status": state}
+    if state == 'ready':
+        payload['image_url'] = f"/static/graphs/{os.path.basename(detail)}"
+    elif state == 'failed':
+        payload['error'] = detail
+    return payload
+
 # --- STAGE 3: STREAM CONVERSION ---
+# Conversion runs as a background job; this stream only tails its event log.
+# EventSource resends Last-Event-ID on reconnect, so a dropped client resumes
+# where it left off while the job keeps running.
+@app.route('/convert/<session_id>', methods=['POST'])
+def start_conversion(session_id):
+    session = SESSIONS.get(session_id)
+    if not session: return jsonify({"error": "Expired"}), 404
+    if not session.get('graph') and pipeline.wait_for_graph(session_id, config.EAGER_WAIT_SECONDS) is None:
+        return jsonify({"error": "Workflow not parsed yet"}), 409
+    job_id = conversion_jobs.start(session_id, SESSIONS)
+    return jsonify({"status": "success", "job_id": job_id,
+                    "stream_url": url_for('stream_conversion', session_id=session_id)})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = conversion_jobs.JOBS.get(job_id)
+    if not job: return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
 @app.route('/stream_conversion/<session_id>')
 def stream_conversion(session_id):
-    def generate():
+    session = SESSIONS.get(session_id)
+    if session and not session['graph']:
+        pipeline.wait_for_graph(session_id, config.EAGER_WAIT_SECONDS)
         session = SESSIONS.get(session_id)
-        if not session or not session['graph']:
-            yield "data: Error: Session lost\n\n"
-            return
+    if not session or not session['graph']:
+        lost = json.dumps({'progress': 0, 'log': '❌ Session lost', 'done': True, 'failed': True})
+        return Response(f"data: {lost}\n\n", mimetype='text/event-stream')
 
-        graph = session['graph']
-        total = len(graph['nodes'])
-        
-        yield f"data: {json.dumps({'progress': 0, 'log': '🚀 Initializing Conversion Engine...'})}\n\n"
-
-        for i, node in enumerate(graph['nodes']):
-            tool_type = node['type']
-            knime_map = mappings.get_spec(tool_type)['name']
-            time.sleep(0.01) # Small delay for visual effect
-
-            if "Formula" in tool_type and 'formulas' in node['config']:
-                 yield f"data: {json.dumps({'progress': int((i/total)*100), 'log': f'⚡ AI Generating Logic for Node {node['id']}...'})}\n\n"
-                 js_dict = formula_converter.convert_formulas_bulk(node['config']['formulas'])
-                 node['config']['reviewed_js'] = js_dict
-                 msg = f"✅ Node {node['id']}: Translated formulas."
-            else:
-                 msg = f"INFO: Node {node['id']} ({tool_type}) → {knime_map}"
-
-            yield f"data: {json.dumps({'progress': int(((i+1)/total)*100), 'log': msg})}\n\n"
-        
-        yield f"data: {json.dumps({'progress': 100, 'log': '✨ Analysis Complete.', 'done': True})}\n\n"
+    job_id = conversion_jobs.start(session_id, SESSIONS)
+    last_seq = conversion_jobs.parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
 
-    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+    def generate():
+        for seq, data in conversion_jobs.tail(job_id, last_seq):
+            yield conversion_jobs.sse_message(seq, data)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # --- STAGE 4: REVIEW ---
+# The page itself is an empty shell; tools are fetched a page at a time from
+# /api/review (see src/review.py), so it opens instantly for any workflow size.
 @app.route('/review/<session_id>')
 def review(session_id):
     session = SESSIONS.get(session_id)
     if not session: return "Session Expired", 400
-    
-    nodes_data = []
-    for node in session['graph']['nodes']:
-        
-        # Prepare Formula Data
-        formula_comparison = []
-        if "Formula" in node['type'] and 'formulas' in node['config']:
-            # Get the Converted Code (if it exists)
-            converted_dict = node['config'].get('reviewed_js', {})
-            
-            # Match Original vs Converted
-            for original_f in node['config']['formulas']:
-                col = original_f['field']
-                original_expr = original_f['expression']
-                # Get the converted JS for this specific column
-                converted_expr = converted_dict.get(col, "// No conversion found")
-                
-                formula_comparison.append({
-                    "column": col,
-                    "original": original_expr,
-                    "converted": converted_expr
-                })
-
-        nodes_data.append({
-            "id": node['id'],
-            "type": node['type'],
-            "knime_default": mappings.get_spec(node['type'])['name'],
-            "is_formula": "Formula" in node['type'],
-            "formulas": formula_comparison, # New List
-            # Keep js_code for the builder logic compatibility if needed, 
-            # though we primarily rely on the list above for the UI now.
-            "js_code": node['config'].get('reviewed_js', {}) 
-        })
+    return render_template('review.html', session_id=session_id, page_size=config.REVIEW_PAGE_SIZE)
+
+@app.route('/api/review/<session_id>')
+def review_api(session_id):
+    session = SESSIONS.get(session_id)
+    if not session: return jsonify({"error": "Expired"}), 404
+    if not session.get('graph'): return jsonify({"error": "Workflow not parsed yet"}), 409
 
-    return render_template('review.html', nodes=nodes_data, session_id=session_id)
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', config.REVIEW_PAGE_SIZE, type=int)
+    per_page = min(max(per_page, 1), config.REVIEW_MAX_PAGE_SIZE)
+    ai_fallback_only = request.args.get('ai_fallback', '').lower() in ('1', 'true', 'yes')
+
+    return jsonify(review_data.review_page(session['graph'], page, per_page,
+                                           node_type=request.args.get('type') or None,
+                                           ai_fallback_only=ai_fallback_only))
 
 # --- STAGE 5: BUILD ---
 @app.route('/build/<session_id>', methods=['POST'])
@@ -153,27 +227,41 @@ def build(session_id):
         nid = str(node['id'])
         if nid in edits:
             if 'js_code' in edits[nid]:
-                node['config']['reviewed_js'] = edits[nid]['js_code']
+                # The review page only sends the fields that were edited. Only real changes
+                # are kept from a conversion job finishing later (see conversion_jobs.merge_converted)
+                reviewed = node['config'].setdefault('reviewed_js', {})
+                edited = node['config'].setdefault('edited_fields', [])
+                for field, code in edits[nid]['js_code'].items():
+                    if reviewed.get(field) != code and field not in edited:
+                        edited.append(field)
+                reviewed.update(edits[nid]['js_code'])
             if 'knime_type' in edits[nid]:
                 node['config']['knime_type_override'] = edits[nid]['knime_type']
 
-    # 1. Build the skeleton (Default name: skeleton.knwf)
-    builder.build_skeleton(graph)
-    
-    # 2. Rename it to a session-specific file to avoid collisions
-    default_output = os.path.join(app.config['OUTPUT_FOLDER'], "skeleton.knwf")
+    # Optional ?partition=containers|regions|threshold wraps large workflows into metanodes
+    partition = request.args.get('partition') or None
+    if partition and partition not in partition_modes:
+        return jsonify({"error": f"Unknown partition mode '{partition}'"}), 400
+    session['partition'] = partition
+
+    # Stream mode: the archive is built once, straight into the /download response
+    # (build metrics are recorded there); there are no build stats to report yet.
+    if config.DOWNLOAD_MODE == 'stream':
+        session['output_file'] = None
+        session['build_stats'] = None
+        SESSIONS.save(session_id, session)
+        return jsonify({"status": "success", "redirect": url_for('report', session_id=session_id), "build_stats": None})
+
+    # File mode: build to a session-specific file (unchanged nodes come from the settings cache)
     output_filename = f"workflow_{session_id}.knwf"
     output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-    
-    if os.path.exists(default_output):
-        # Remove existing file if it exists (overwrite)
-        if os.path.exists(output_path):
-            os.remove(output_path)
-        shutil.move(default_output, output_path)
+    build_stats = builder.build_skeleton(graph, output_path=output_path, partition=partition)
     
     session['output_file'] = output_filename
+    session['build_stats'] = build_stats
+    SESSIONS.save(session_id, session)
 
-    return jsonify({"status": "success", "redirect": url_for('report', session_id=session_id)})
+    return jsonify({"status": "success", "redirect": url_for('report', session_id=session_id), "build_stats": build_stats})
 
 # --- STAGE 6: REPORT & DOWNLOAD ---
 @app.route('/report/<session_id>')
@@ -191,40 +279,142 @@ def report(session_id):
 @app.route('/download/<session_id>')
 def download(session_id):
     session = SESSIONS.get(session_id)
-    if not session: return "Session Expired", 400
-    
-    # Path to the built file
-    real_filename = session['output_file']
-    file_path = os.path.join(app.config['OUTPUT_FOLDER'], real_filename)
+    if not session or 'output_file' not in session: return "Session Expired", 400
     
     # Get custom name from user query param
+    real_filename = session['output_file'] or f"workflow_{session_id}.knwf"
     download_name = request.args.get('name', real_filename)
     if not download_name.endswith('.knwf'):
         download_name += '.knwf'
 
-    # CLEANUP LOGIC: Delete files AFTER they are sent
+    # Stream mode: zip entries go into the response as the builder produces them.
+    # Rendering happens before the response starts, so a failure is an error page,
+    # not a truncated archive; the session is only cleaned up once fully sent.
+    if not session['output_file']:
+        chunks = builder.stream_skeleton(session['graph'], partition=session.get('partition'))
+
+        def generate():
+            yield from chunks
+            cleanup_session(session_id, session)
+
+        response = Response(generate(), mimetype='application/zip')
+        response.headers.set('Content-Disposition', 'attachment', **attachment_filename(download_name))
+        return response
+
+    # File mode: send the file /build wrote, then delete it
+    file_path = os.path.join(app.config['OUTPUT_FOLDER'], real_filename)
+
     @after_this_request
     def cleanup(response):
-        try:
-            # 1. Delete Uploaded Input
-            if os.path.exists(session['filepath']):
-                os.remove(session['filepath'])
-            
-            # 2. Delete Generated Output
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                
-            # 3. Delete Temp Extraction Folder (if exists)
-            temp_dir = os.path.join(config.BASE_DIR, "temp_extract")
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-
-            print(f"🧹 Cleaned up session {session_id}")
-        except Exception as e:
-            print(f"⚠️ Cleanup Error: {e}")
+        cleanup_session(session_id, session, file_path)
         return response
 
     return send_file(file_path, as_attachment=True, download_name=download_name)
 
+def attachment_filename(name):
+    """Content-Disposition filename options, with an RFC 5987 form for non-ASCII names (as send_file does)."""
+    try:
+        name.encode('ascii')
+        return {"filename": name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+        return {"filename": simple, "filename*": f"UTF-8''{quote(name, safe='!#$&+^`|~')}"}
+
+def cleanup_session(session_id, session, output_path=None):
+    """Deletes the session with its uploaded input, built output and extraction folder."""
+    try:
+        # 1. Delete Uploaded Input
+        if os.path.exists(session['filepath']):
+            os.remove(session['filepath'])
+        
+        # 2. Delete Generated Output
+        if output_path and os.path.exists(output_path):
+            os.remove(output_path)
+            
+        # 3. Delete Temp Extraction Folder (if exists)
+        temp_dir = os.path.join(config.BASE_DIR, "temp_extract", session_id)
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+
+        SESSIONS.delete(session_id)
+        conversion_jobs.JOBS.delete_session(session_id)
+        print(f"🧹 Cleaned up session {session_id}")
+    except Exception as e:
+        print(f"⚠️ Cleanup Error: {e}")
+
+# --- BATCH API ---
+# POST many packages as 'files' (or one .zip of them); the response streams a zip
+# with one .knwf per package plus report.json as conversions finish.
+@app.route('/batch', methods=['POST'])
+def batch_convert():
+    request.max_file_bytes = config.BATCH_MAX_FILE_BYTES
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files: return jsonify({"error": "No files"}), 400
+
+    batch_dir = os.path.join(config.BASE_DIR, "temp_extract", f"batch_{uuid.uuid4()}")
+    os.makedirs(batch_dir)
+    saved = []
+    for i, file in enumerate(files):
+        dest = os.path.join(batch_dir, f"{i}_{secure_filename(file.filename) or 'upload'}")
+        uploads.commit_upload(file, dest)
+        saved.append((file.filename, dest))
+
+    try:
+        inputs = batch.expand_inputs(saved, batch_dir)
+    except zipfile.BadZipFile:
+        inputs = None
+    except RequestEntityTooLarge as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return too_large(e)
+    if not inputs:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({"error": "No Alteryx workflows (.yxmd, .yxwz, .yxzp) found"}), 400
+
+    return Response(batch.stream_batch(inputs, batch_dir), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=batch_conversion.zip'})
+
+# --- OPS ---
+# --- PROFILING ---
+# Re-runs extract -> parse -> convert -> build for a session's upload with timers on
+# and returns the same JSON report as `python main.py --profile`.
+# ?cprofile=1 adds a cProfile of the run, ?memory=1 a tracemalloc snapshot.
+_profile_lock = threading.Lock()
+
+@app.route('/profile/<session_id>', methods=['POST'])
+def profile_session(session_id):
+    session = SESSIONS.get(session_id)
+    if not session: return jsonify({"error": "Expired"}), 404
+    # cProfile and tracemalloc are process-wide: one profiling run at a time
+    if not _profile_lock.acquire(blocking=False):
+        return jsonify({"error": "Another profiling run is in progress"}), 409
+
+    flag = lambda name: request.args.get(name, '').lower() in ('1', 'true', 'yes')
+    extract_dir = os.path.join(config.BASE_DIR, "temp_extract", f"profile_{uuid.uuid4().hex}")
+    try:
+        prof = profiler.Profile(session['filename'], cprofile=flag('cprofile'), memory=flag('memory'))
+        profiler.run_pipeline(session['filepath'], prof, extract_dir=extract_dir)
+        path = profiler.report_path(session['filename'])
+        report = prof.write(path)
+        print(f"⏱️  Profiled session {session_id}: {report['total_seconds']:.3f}s, report in {path}")
+        return jsonify(dict(report, report_file=os.path.basename(path)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 422
+    finally:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        _profile_lock.release()
+
+@app.route('/sessions/metrics')
+def session_metrics():
+    return jsonify(dict(SESSIONS.metrics(), reaper=reaper.last_report))
+
+@app.route('/sessions/reap', methods=['POST'])
+def reap_sessions():
+    """Runs a reaper pass now and returns its report (reclaimed bytes per kind of file)."""
+    return jsonify(reaper.sweep(SESSIONS))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
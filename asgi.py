@@ -0,0 +1,118 @@
+import asyncio
+import json
+import re
+import httpx
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import app as flask_app, SESSIONS
+from src import config, conversion_jobs, pipeline, async_jobs
+
+# Async entry point: serves the same routes as app.py from one event loop.
+#     uvicorn asgi:app --host 0.0.0.0 --port 5000
+# Conversion progress streams and conversion jobs (including Ollama calls) run as
+# coroutines, so an open stream costs a coroutine instead of a server thread.
+# Every other route is the Flask view from app.py, run through a WSGI bridge.
+
+STREAM_ROUTE = re.compile(r'^/stream_conversion/([^/]+)$')
+CONVERT_ROUTE = re.compile(r'^/convert/([^/]+)$')
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI call on one shared thread (thread_sensitive), which
+    # serialises the Flask views and fails under concurrent requests. The views are
+    # thread-safe (as under the threaded dev server), so each runs on the thread pool.
+    run_wsgi_app = sync_to_async(vars(WsgiToAsgiInstance)['run_wsgi_app'].func, thread_sensitive=False)
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+wsgi = ThreadedWsgiToAsgi(flask_app)
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def session_graph(session_id):
+    """The session once its graph is parsed (waiting for the eager pipeline), else None."""
+    session = await asyncio.to_thread(SESSIONS.get, session_id)
+    if session and not session['graph']:
+        await asyncio.to_thread(pipeline.wait_for_graph, session_id, config.EAGER_WAIT_SECONDS)
+        session = await asyncio.to_thread(SESSIONS.get, session_id)
+    return session if session and session['graph'] else None
+
+async def start_conversion(scope, receive, send, session_id):
+    if not await asyncio.to_thread(SESSIONS.get, session_id):
+        return await send_json(send, 404, {"error": "Expired"})
+    if not await session_graph(session_id):
+        return await send_json(send, 409, {"error": "Workflow not parsed yet"})
+    job_id = await asyncio.to_thread(conversion_jobs.start, session_id, SESSIONS)
+    root = scope.get('root_path', '')
+    await send_json(send, 200, {"status": "success", "job_id": job_id,
+                                "stream_url": f"{root}/stream_conversion/{session_id}"})
+
+async def stream_conversion(scope, receive, send, session_id):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                            (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+
+    session = await session_graph(session_id)
+    if session is None:
+        lost = json.dumps({'progress': 0, 'log': '❌ Session lost', 'done': True, 'failed': True})
+        await send({'type': 'http.response.body', 'body': f"data: {lost}\n\n".encode()})
+        return
+
+    headers = dict(scope['headers'])
+    query = dict(pair.split('=', 1) for pair in scope.get('query_string', b'').decode().split('&') if '=' in pair)
+    last_seq = conversion_jobs.parse_last_event_id(
+        headers.get(b'last-event-id', b'').decode() or query.get('last_event_id'))
+    job_id = await asyncio.to_thread(conversion_jobs.start, session_id, SESSIONS)
+
+    # The client closing the stream arrives as http.disconnect
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for seq, data in async_jobs.tail_async(job_id, last_seq):
+            if disconnected.is_set():
+                break
+            message = conversion_jobs.sse_message(seq, data)
+            await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+
+async def lifespan(receive, send):
+    client = None
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            client = httpx.AsyncClient()
+            async_jobs.install(asyncio.get_running_loop(), client)
+            print("⚡ Async server ready: conversion jobs and progress streams run on the event loop")
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if client is not None:
+                await client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http':
+        path, method = scope['path'], scope['method']
+        match = STREAM_ROUTE.match(path)
+        if match and method == 'GET':
+            return await stream_conversion(scope, receive, send, match.group(1))
+        match = CONVERT_ROUTE.match(path)
+        if match and method == 'POST':
+            return await start_conversion(scope, receive, send, match.group(1))
+    await wsgi(scope, receive, send)
@@ -0,0 +1,105 @@
+"""
+Builder scaling benchmark.
+Times build_skeleton() over 1..N workers and checks every run produces
+the same archive bytes as the sequential path.
+
+Usage: python -m benchmarks.bench_builder --nodes 2000 --max-workers 8
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import builder, settings_cache
+
+TOOL_CONFIGS = {
+    "Summarize": {"summarize_fields": [{"field": "Region", "action": "GroupBy"},
+                                       {"field": "Sales", "action": "Sum"},
+                                       {"field": "Qty", "action": "Avg"}]},
+    "Join": {"join_keys": [{"side": "Left", "cols": ["ID", "Date"]},
+                           {"side": "Right", "cols": ["ID", "Date"]}],
+             "select_fields": [{"field": "Notes", "selected": "False"}]},
+    "AlteryxSelect": {"select_fields": [{"field": f"COL_{c}", "selected": "True", "rename": f"Col {c}"}
+                                        for c in range(25)] + [{"field": "*Unknown", "selected": "False"}]},
+    "Sort": {"sort_fields": [{"field": "Date", "order": "Descending"}, {"field": "ID", "order": "Ascending"}]},
+    "Union": {"mode": "ByName"},
+    "Formula": {"formulas": [{"field": "Flag", "expression": "IF [A] > 1 THEN 'Y' ELSE 'N' ENDIF"}],
+                "reviewed_js": {"Flag": "var val = null;\nval = (column(\"A\") > 1) ? \"Y\" : \"N\";\nval;"}},
+}
+
+def synthetic_graph(n_nodes):
+    """Chain of mixed tools with pre-reviewed formulas (no AI calls)."""
+    tool_types = list(TOOL_CONFIGS)
+    nodes, edges = [], []
+    for i in range(n_nodes):
+        tool_type = tool_types[i % len(tool_types)]
+        node_config = {"x": float((i % 40) * 120), "y": float((i // 40) * 100)}
+        node_config.update(TOOL_CONFIGS[tool_type])
+        nodes.append({"id": str(i + 1), "type": tool_type,
+                      "x": node_config["x"], "y": node_config["y"], "config": node_config})
+        if i:
+            edges.append({"source": str(i), "target": str(i + 1),
+                          "origin_connection": "Output", "destination_connection": "Input", "name": ""})
+    return {"nodes": nodes, "edges": edges}
+
+def run(n_nodes, max_workers, executors, repeat):
+    graph = synthetic_graph(n_nodes)
+    out_dir = tempfile.mkdtemp(prefix="bench_builder_")
+    out_path = os.path.join(out_dir, "bench.knwf")
+
+    def timed_build(workers, executor):
+        best = None
+        for _ in range(repeat):
+            # Measure cold builds; the settings cache would otherwise serve every node
+            settings_cache.SETTINGS_CACHE.clear()
+            start = time.perf_counter()
+            builder.build_skeleton(graph, output_path=out_path, workers=workers, executor=executor)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        with open(out_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        return best, digest
+
+    base_time, base_digest = timed_build(1, "thread")
+    results = [("sequential", 1, base_time, True)]
+    for executor in executors:
+        for workers in range(2, max_workers + 1):
+            elapsed, digest = timed_build(workers, executor)
+            results.append((executor, workers, elapsed, digest == base_digest))
+
+    os.remove(out_path)
+    os.rmdir(out_dir)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=2000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--executors", default="thread,process")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Builder logs every node; keep the table readable.
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        results = run(args.nodes, args.max_workers, args.executors.split(","), args.repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    base_time = results[0][2]
+    print(f"build_skeleton scaling ({args.nodes} tools, best of {args.repeat})")
+    print(f"{'executor':<12}{'workers':>8}{'seconds':>10}{'speedup':>9}  identical")
+    for executor, workers, elapsed, identical in results:
+        print(f"{executor:<12}{workers:>8}{elapsed:>10.3f}{base_time / elapsed:>8.2f}x  {'yes' if identical else 'NO'}")
+
+    print("\nGenerator cost (all runs)")
+    print(f"{'generator':<22}{'calls':>8}{'seconds':>10}{'max ms':>9}{'avg KB':>9}")
+    for row in builder.REGISTRY.stats():
+        print(f"{row['generator']:<22}{row['calls']:>8}{row['seconds']:>10.3f}"
+              f"{row['max_seconds'] * 1000:>9.2f}{row['bytes'] / row['calls'] / 1024:>9.1f}")
@@ -0,0 +1,158 @@
+"""
+End-to-end pipeline benchmark.
+Generates synthetic .yxzp packages (benchmarks/generate_workflow.py) and times
+prepare_workflow_file -> parse_workflow -> convert_formulas_bulk -> build_skeleton
+for each size, plus the peak traced memory of every stage (separate tracemalloc
+run, so tracing does not skew the timings). Results are compared with the stored
+baseline (benchmarks/baseline_pipeline.json); stages slower than the tolerance
+are flagged.
+
+Usage: python -m benchmarks.bench_pipeline --sizes 10,100,1000,10000
+       python -m benchmarks.bench_pipeline --save-baseline    # after an intended change
+       python -m benchmarks.bench_pipeline --check            # exit 1 on a regression
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import config, extractor, formula_converter, builder, settings_cache
+from benchmarks import generate_workflow
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_pipeline.json")
+STAGES = ("extract", "parse", "convert", "build")
+
+def run_once(package, work_dir, memory=False):
+    """One pass over the pipeline. Returns {stage: seconds or peak bytes}."""
+    extract_dir = os.path.join(work_dir, "extract")
+    output_path = os.path.join(work_dir, "bench.knwf")
+    settings_cache.SETTINGS_CACHE.clear()   # cold build, like a first upload
+    results = {}
+
+    def stage(name, fn):
+        if memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        results[name] = tracemalloc.get_traced_memory()[1] if memory else elapsed
+        return value
+
+    workflow_file = stage("extract", lambda: extractor.prepare_workflow_file(package, extract_dir))
+    graph = stage("parse", lambda: extractor.parse_workflow(workflow_file, extract_dir))
+
+    def convert():
+        for node in graph['nodes']:
+            if 'formulas' in node['config']:
+                node['config']['reviewed_js'] = formula_converter.convert_formulas_bulk(node['config']['formulas'])
+    stage("convert", convert)
+    stage("build", lambda: builder.build_skeleton(graph, output_path=output_path))
+    return results
+
+def run(sizes, repeat, generator_options):
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    report = {}
+    try:
+        for size in sizes:
+            package = generate_workflow.write(os.path.join(work_dir, f"synthetic_{size}.yxzp"),
+                                              tools=size, **generator_options)
+            timings = [run_once(package, work_dir) for _ in range(repeat)]
+            tracemalloc.start()
+            try:
+                peaks = run_once(package, work_dir, memory=True)
+            finally:
+                tracemalloc.stop()
+
+            best = {stage: min(t[stage] for t in timings) for stage in STAGES}
+            report[str(size)] = {
+                "package_bytes": os.path.getsize(package),
+                "stages": {stage: {"seconds": round(best[stage], 6), "peak_bytes": peaks[stage]} for stage in STAGES},
+                "total_seconds": round(sum(best.values()), 6)
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+def compare(report, baseline, tolerance):
+    """Rows of (size, stage, baseline s, current s, ratio, regression?) for sizes in both runs."""
+    rows = []
+    for size, current in report.items():
+        previous = baseline.get("results", {}).get(size)
+        if not previous:
+            continue
+        for stage in STAGES + ("total",):
+            now = current["total_seconds"] if stage == "total" else current["stages"][stage]["seconds"]
+            before = previous["total_seconds"] if stage == "total" else previous["stages"][stage]["seconds"]
+            ratio = now / before if before else float('inf')
+            # Sub-millisecond stages are noise: only flag slowdowns that are also measurable
+            rows.append((size, stage, before, now, ratio, ratio > 1 + tolerance and now - before > 0.005))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="tool counts, comma separated")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per size (best is kept)")
+    parser.add_argument("--complexity", type=int, default=2)
+    parser.add_argument("--formula-fields", type=int, default=3)
+    parser.add_argument("--edge-density", type=float, default=1.2)
+    parser.add_argument("--macros", type=int, default=2)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if a stage regressed")
+    args = parser.parse_args()
+
+    # No Ollama during benchmarks: generated formulas all transpile, anything else fails fast
+    config.OLLAMA_API_URL = "http://127.0.0.1:9/api/chat"
+    sizes = [int(s) for s in args.sizes.split(",")]
+    options = {"complexity": args.complexity, "formula_fields": args.formula_fields,
+               "edge_density": args.edge_density, "macros": args.macros}
+
+    # The pipeline logs every node; keep the table readable.
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        report = run(sizes, args.repeat, options)
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    print(f"Pipeline benchmark (best of {args.repeat}; memory = peak traced bytes per stage)")
+    print(f"{'tools':>7}  " + "".join(f"{stage:>18}" for stage in STAGES) + f"{'total s':>10}")
+    for size, row in report.items():
+        cells = "".join(f"{row['stages'][s]['seconds']:>9.3f}s {row['stages'][s]['peak_bytes'] / (1024 * 1024):>6.1f}MB"
+                        for s in STAGES)
+        print(f"{size:>7}  {cells}{row['total_seconds']:>10.3f}")
+
+    document = {"python": platform.python_version(), "platform": platform.platform(),
+                "generator": options, "repeat": args.repeat, "results": report}
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        sys.exit(0)
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("generator") != options:
+        print(f"\n⚠️  Baseline was generated with {baseline.get('generator')}; comparing anyway.")
+
+    rows = compare(report, baseline, args.tolerance)
+    print(f"\nAgainst baseline ({baseline.get('platform')}, Python {baseline.get('python')})")
+    print(f"{'tools':>7}{'stage':>10}{'baseline s':>12}{'now s':>10}{'ratio':>8}")
+    for size, stage, before, now, ratio, regressed in rows:
+        print(f"{size:>7}{stage:>10}{before:>12.3f}{now:>10.3f}{ratio:>7.2f}x{'  ⚠️ slower' if regressed else ''}")
+    regressions = [row for row in rows if row[5]]
+    print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+    if args.check and regressions:
+        sys.exit(1)
@@ -0,0 +1,178 @@
+"""
+Synthetic Alteryx workflow generator.
+Writes .yxmd (or .yxzp packages with their macros) shaped like real exports,
+with a configurable number of tools, edge density, formula complexity,
+join / summarize counts and macro usage. The same seed gives the same file.
+
+Usage: python -m benchmarks.generate_workflow --tools 1000 --joins 50 --macros 5 --out input/synthetic.yxzp
+"""
+import os
+import sys
+import random
+import zipfile
+import argparse
+from xml.sax.saxutils import quoteattr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLUGINS = {
+    "DbFileInput": "AlteryxBasePluginsGui.DbFileInput.DbFileInput",
+    "Formula": "AlteryxBasePluginsGui.Formula.Formula",
+    "Join": "AlteryxBasePluginsGui.Join.Join",
+    "Summarize": "AlteryxBasePluginsGui.Summarize.Summarize",
+    "Sort": "AlteryxBasePluginsGui.Sort.Sort",
+    "AlteryxSelect": "AlteryxBasePluginsGui.AlteryxSelect.AlteryxSelect",
+    "Union": "AlteryxBasePluginsGui.Union.Union",
+    "BrowseV2": "AlteryxBasePluginsGui.BrowseV2.BrowseV2",
+}
+FIELDS = ["Region", "Sales", "Qty", "Price", "Name", "City", "Date", "ID"]
+FUNCTIONS = ["Trim({})", "Uppercase({})", "ToString({})", "Length({})", "Abs({})", "Round({}, 2)", "Left({}, 3)"]
+
+def expression(rnd, depth):
+    """Random formula the transpiler accepts; depth = nesting of IF/IIF/functions."""
+    if depth <= 0:
+        field = f"[{rnd.choice(FIELDS)}]"
+        return rnd.choice([field, f"{field} * {rnd.randint(2, 9)}", rnd.choice(FUNCTIONS).format(field)])
+    inner = expression(rnd, depth - 1)
+    condition = f"[{rnd.choice(FIELDS)}] > {rnd.randint(0, 100)}"
+    return rnd.choice([
+        f"IF {condition} THEN {inner} ELSE {expression(rnd, depth - 1)} ENDIF",
+        f"IIF({condition}, {inner}, {expression(rnd, depth - 1)})",
+        rnd.choice(FUNCTIONS).format(inner),
+        f"({inner}) + [{rnd.choice(FIELDS)}]",
+    ])
+
+def tool_configuration(rnd, tool_type, index, formula_fields, complexity, fallback_rate):
+    if tool_type == "DbFileInput":
+        return f"<File>C:\\data\\input_{index}.csv</File>"
+    if tool_type == "Formula":
+        fields = []
+        for f in range(formula_fields):
+            # ELSEIF is not supported by the transpiler: such fields go to the AI fallback
+            expr = ('IF [Qty] > 1 THEN "A" ELSEIF [Qty] = 0 THEN "B" ELSE "C" ENDIF'
+                    if rnd.random() < fallback_rate else expression(rnd, complexity))
+            fields.append(f"<FormulaField field=\"Out_{index}_{f}\" expression={quoteattr(expr)}/>")
+        return f"<FormulaFields>{''.join(fields)}</FormulaFields>"
+    if tool_type == "Join":
+        keys = rnd.sample(FIELDS, 2)
+        left = "".join(f"<Field field=\"{k}\"/>" for k in keys)
+        return (f"<JoinInfo connection=\"Left\">{left}</JoinInfo><JoinInfo connection=\"Right\">{left}</JoinInfo>"
+                f"<SelectConfiguration><Configuration><SelectFields>"
+                f"<SelectField field=\"Right_{keys[0]}\" selected=\"False\" input=\"Right_\"/>"
+                f"<SelectField field=\"*Unknown\" selected=\"True\"/></SelectFields></Configuration></SelectConfiguration>")
+    if tool_type == "Summarize":
+        group, value = rnd.sample(FIELDS, 2)
+        return (f"<SummarizeFields><SummarizeField field=\"{group}\" action=\"GroupBy\" rename=\"{group}\"/>"
+                f"<SummarizeField field=\"{value}\" action=\"{rnd.choice(['Sum', 'Avg', 'Count'])}\" rename=\"Agg_{value}\"/>"
+                f"</SummarizeFields>")
+    if tool_type == "Sort":
+        return f"<SortInfo><Field field=\"{rnd.choice(FIELDS)}\" order=\"{rnd.choice(['Ascending', 'Descending'])}\"/></SortInfo>"
+    if tool_type == "AlteryxSelect":
+        selects = "".join(f"<SelectField field=\"{f}\" selected=\"{rnd.choice(['True', 'False'])}\" rename=\"{f}_x\"/>"
+                          for f in rnd.sample(FIELDS, 4))
+        return f"<SelectFields>{selects}<SelectField field=\"*Unknown\" selected=\"True\"/></SelectFields>"
+    if tool_type == "Union":
+        return "<Mode>ByName</Mode><ByName_OutputMode>All</ByName_OutputMode>"
+    return ""
+
+def tool_types(rnd, tools, joins, summarizes, macros):
+    """Tool type per position: inputs first, the requested joins/summarizes/macros, fillers elsewhere."""
+    inputs = max(1, tools // 25)
+    fillers = ["Formula", "Formula", "Sort", "AlteryxSelect", "Union"]
+    middle = ["Join"] * joins + ["Summarize"] * summarizes + ["Macro"] * macros
+    middle += [rnd.choice(fillers) for _ in range(max(0, tools - inputs - 1 - len(middle)))]
+    rnd.shuffle(middle)
+    return (["DbFileInput"] * inputs + middle)[:tools - 1] + ["BrowseV2"]
+
+def generate(tools=100, edge_density=1.2, formula_fields=3, complexity=2, joins=None, summarizes=None,
+             macros=0, fallback_rate=0.0, seed=42):
+    """
+    Returns (yxmd xml text, {macro file name: yxmc text}).
+    edge_density: connections per tool (>= 1; extra edges feed Join right inputs and Unions).
+    complexity: nesting depth of generated formulas. joins/summarizes default to ~5% of tools each.
+    """
+    rnd = random.Random(seed)
+    tools = max(2, tools)
+    joins = tools // 20 if joins is None else joins
+    summarizes = tools // 20 if summarizes is None else summarizes
+    types = tool_types(rnd, tools, joins, summarizes, macros)
+
+    nodes, macro_files = [], {}
+    for i, tool_type in enumerate(types):
+        tool_id = i + 1
+        x, y = (i % 50) * 120 + 54, (i // 50) * 100 + 90
+        if tool_type == "Macro":
+            name = f"Macros/synthetic_macro_{len(macro_files) + 1}.yxmc"
+            macro_files[name] = macro_document(rnd, complexity)
+            nodes.append(f"<Node ToolID=\"{tool_id}\"><GuiSettings><Position x=\"{x}\" y=\"{y}\"/></GuiSettings>"
+                         f"<Properties><Configuration/></Properties><EngineSettings Macro=\"{name}\"/></Node>")
+            continue
+        configuration = tool_configuration(rnd, tool_type, tool_id, formula_fields, complexity, fallback_rate)
+        nodes.append(f"<Node ToolID=\"{tool_id}\"><GuiSettings Plugin=\"{PLUGINS[tool_type]}\"><Position x=\"{x}\" y=\"{y}\"/></GuiSettings>"
+                     f"<Properties><Configuration>{configuration}</Configuration></Properties></Node>")
+
+    # Every tool after the first input reads from an earlier one: the graph is a DAG
+    connections = []
+    first_tool = types.count("DbFileInput")
+    for i in range(first_tool, tools):
+        source = rnd.randrange(max(0, i - 10), i)
+        origin = "Join" if types[source] == "Join" else "Output"
+        destination = "Left" if types[i] == "Join" else "Input"
+        connections.append((source + 1, origin, i + 1, destination))
+        if types[i] == "Join":
+            connections.append((rnd.randrange(0, i) + 1, "Output", i + 1, "Right"))
+    extra = int(tools * max(0.0, edge_density - 1.0)) - types.count("Join")
+    unions = [i for i, t in enumerate(types) if t == "Union"]
+    for _ in range(max(0, extra)):
+        if not unions:
+            break
+        target = rnd.choice(unions)
+        if target:
+            connections.append((rnd.randrange(0, target) + 1, "Output", target + 1, "Input"))
+
+    edges = "".join(f"<Connection><Origin ToolID=\"{s}\" Connection=\"{o}\"/>"
+                    f"<Destination ToolID=\"{t}\" Connection=\"{d}\"/></Connection>\n"
+                    for s, o, t, d in connections)
+    xml = ("<?xml version=\"1.0\"?>\n<AlteryxDocument yxmdVer=\"2020.1\">\n<Nodes>\n" + "\n".join(nodes) +
+           "\n</Nodes>\n<Connections>\n" + edges + "</Connections>\n</AlteryxDocument>\n")
+    return xml, macro_files
+
+def macro_document(rnd, complexity):
+    expr = quoteattr(expression(rnd, complexity))
+    return ("<?xml version=\"1.0\"?>\n<AlteryxDocument yxmdVer=\"2020.1\"><Nodes>"
+            "<Node ToolID=\"1\"><GuiSettings Plugin=\"AlteryxBasePluginsGui.Formula.Formula\"><Position x=\"0\" y=\"0\"/></GuiSettings>"
+            f"<Properties><Configuration><FormulaFields><FormulaField field=\"MacroOut\" expression={expr}/>"
+            "</FormulaFields></Configuration></Properties></Node></Nodes><Connections/></AlteryxDocument>\n")
+
+def write(path, **options):
+    """Writes a .yxmd (macros dropped) or a .yxzp package (workflow + macros). Returns path."""
+    xml, macro_files = generate(**options)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.lower().endswith('.yxzp'):
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr(os.path.splitext(os.path.basename(path))[0] + ".yxmd", xml)
+            for name, content in macro_files.items():
+                z.writestr(name, content)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(xml)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, default=100)
+    parser.add_argument("--edge-density", type=float, default=1.2, help="connections per tool")
+    parser.add_argument("--formula-fields", type=int, default=3, help="fields per Formula tool")
+    parser.add_argument("--complexity", type=int, default=2, help="nesting depth of formulas")
+    parser.add_argument("--joins", type=int, help="default: 5%% of tools")
+    parser.add_argument("--summarizes", type=int, help="default: 5%% of tools")
+    parser.add_argument("--macros", type=int, default=0)
+    parser.add_argument("--fallback-rate", type=float, default=0.0, help="share of formulas the transpiler rejects")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="input/synthetic.yxzp", help=".yxmd or .yxzp")
+    args = parser.parse_args()
+
+    write(args.out, tools=args.tools, edge_density=args.edge_density, formula_fields=args.formula_fields,
+          complexity=args.complexity, joins=args.joins, summarizes=args.summarizes, macros=args.macros,
+          fallback_rate=args.fallback_rate, seed=args.seed)
+    print(f"Wrote {args.out} ({args.tools} tools, {os.path.getsize(args.out) / 1024:.1f} KB)")
@@ -0,0 +1,366 @@
+"""
+Concurrent load test for the web app.
+N virtual users each run the full browser sequence (upload -> visualize ->
+stream conversion -> review -> build -> download) against a local server, with
+a local stub answering the Ollama /api/chat calls, and the run reports
+throughput, latency percentiles per route, error rates and the server's memory
+growth (RSS of the server process, read from /proc on Linux; process pool
+workers are not included).
+
+By default a threaded Flask server is started on a free port with
+OLLAMA_API_URL pointed at the stub. With --url an already running server is
+targeted instead (start it with OLLAMA_API_URL = the printed stub URL, and pass
+--server-pid to sample its memory).
+
+Usage: python -m benchmarks.load_test --users 20 --iterations 3 --tools 200
+       python -m benchmarks.load_test --url http://127.0.0.1:8000 --server-pid 1234 --stub-port 11500
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import config
+from benchmarks import generate_workflow
+
+ROUTES = ("upload", "visualize", "stream_conversion", "review", "api_review", "build", "download")
+
+# --- OLLAMA STUB ---
+class OllamaStub(BaseHTTPRequestHandler):
+    """Answers /api/chat like Ollama with format=json, after a configurable delay."""
+    latency = 0.0
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        with OllamaStub.lock:
+            OllamaStub.calls += 1
+        time.sleep(self.latency)
+        script = json.dumps({"script": "var val = null;\nval;"})
+        body = json.dumps({"model": config.FORMULA_MODEL_NAME, "done": True,
+                           "message": {"role": "assistant", "content": script}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub(port, latency):
+    OllamaStub.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), OllamaStub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="ollama-stub", daemon=True).start()
+    return server
+
+# --- SERVER UNDER TEST ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port, stub_url, log_path):
+    """Threaded Flask server in a child process, its AI fallback pointed at the stub."""
+    launcher = (f"from src import config; config.OLLAMA_API_URL = {stub_url!r}; "
+                f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)")
+    log = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, "-c", launcher], cwd=config.BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+
+def wait_until_up(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + "/", timeout=2).status_code == 200:
+                return True
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    return False
+
+def rss_bytes(pid):
+    """Resident set size of a process (Linux /proc), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+class MemorySampler:
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="rss-sampler", daemon=True)
+
+    def _loop(self):
+        while True:
+            value = rss_bytes(self.pid)
+            if value is not None:
+                self.samples.append(value)
+            if self._stop.wait(self.interval):
+                break
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        if not self.samples:
+            return None
+        return {"start_bytes": self.samples[0], "peak_bytes": max(self.samples),
+                "end_bytes": self.samples[-1], "growth_bytes": self.samples[-1] - self.samples[0]}
+
+# --- VIRTUAL USERS ---
+class Results:
+    def __init__(self):
+        self.latencies = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+        self.error_samples = []
+        self.flows = 0
+        self.failed_flows = 0
+        self.lock = threading.Lock()
+
+    def record(self, route, seconds, error=None):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            if error:
+                self.errors[route] += 1
+                if len(self.error_samples) < 10:
+                    self.error_samples.append(f"{route}: {error}")
+
+class FlowError(Exception):
+    pass
+
+def timed(results, route, call):
+    """Runs call() -> (value, error or None), recording its latency under route. Raises FlowError on error."""
+    started = time.perf_counter()
+    try:
+        value, error = call()
+    except requests.RequestException as e:
+        value, error = None, f"{type(e).__name__}: {e}"
+    results.record(route, time.perf_counter() - started, error)
+    if error:
+        raise FlowError(error)
+    return value
+
+def checked(response):
+    if response.status_code >= 400:
+        return None, f"HTTP {response.status_code}"
+    return response, None
+
+def run_flow(http, base_url, package, results, visualize_mode, timeout):
+    def upload():
+        with open(package, 'rb') as f:
+            return checked(http.post(f"{base_url}/upload", files={"file": (os.path.basename(package), f)}, timeout=timeout))
+    session_id = timed(results, "upload", upload).json()["session_id"]
+
+    def visualize():
+        response, error = checked(http.get(f"{base_url}/visualize/{session_id}", params={"mode": visualize_mode}, timeout=timeout))
+        if error or visualize_mode == 'client':
+            return response, error
+        # PNG mode: the user waits until the image is ready
+        payload = response.json()
+        deadline = time.time() + timeout
+        while payload.get("image_status") in ("pending", "missing") and time.time() < deadline:
+            time.sleep(0.2)
+            payload = http.get(base_url + payload.get("status_url", f"/visualize/{session_id}/status"), timeout=timeout).json()
+        return payload, None if payload.get("image_status") == "ready" else f"image {payload.get('image_status')}"
+    timed(results, "visualize", visualize)
+
+    def stream():
+        with http.get(f"{base_url}/stream_conversion/{session_id}", stream=True, timeout=timeout) as response:
+            if response.status_code >= 400:
+                return None, f"HTTP {response.status_code}"
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    event = json.loads(line[len("data: "):])
+                    if event.get("done"):
+                        return event, event.get("log") if event.get("failed") else None
+        return None, "stream ended before the job finished"
+    timed(results, "stream_conversion", stream)
+
+    timed(results, "review", lambda: checked(http.get(f"{base_url}/review/{session_id}", timeout=timeout)))
+    page = timed(results, "api_review", lambda: checked(http.get(f"{base_url}/api/review/{session_id}", timeout=timeout))).json()
+
+    # Edit one formula, as a reviewer would
+    edits = {}
+    for node in page["nodes"]:
+        if node.get("formulas"):
+            field = node["formulas"][0]["column"]
+            edits[str(node["id"])] = {"js_code": {field: "var val = null;\nval;"}}
+            break
+    timed(results, "build", lambda: checked(http.post(f"{base_url}/build/{session_id}", json=edits, timeout=timeout)))
+
+    def download():
+        with http.get(f"{base_url}/download/{session_id}", stream=True, timeout=timeout) as response:
+            if response.status_code >= 400:
+                return None, f"HTTP {response.status_code}"
+            head, size = b'', 0
+            for chunk in response.iter_content(64 * 1024):
+                head = head or chunk[:2]
+                size += len(chunk)
+            return size, None if head == b'PK' else "not a zip archive"
+    timed(results, "download", download)
+
+def virtual_user(index, base_url, packages, results, iterations, visualize_mode, timeout, start_at):
+    time.sleep(max(0.0, start_at - time.time()))
+    http = requests.Session()
+    for i in range(iterations):
+        package = packages[(index + i) % len(packages)]
+        try:
+            run_flow(http, base_url, package, results, visualize_mode, timeout)
+            ok = True
+        except (FlowError, KeyError, ValueError) as e:
+            ok = False
+            if not isinstance(e, FlowError):
+                with results.lock:
+                    results.error_samples.append(f"unexpected response: {e!r}")
+        with results.lock:
+            results.flows += 1
+            results.failed_flows += 0 if ok else 1
+
+# --- REPORT ---
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    rank = max(1, int(round(q / 100 * len(values) + 0.5)))
+    return values[min(rank, len(values)) - 1]
+
+def summarize(results, seconds, memory, stub_calls):
+    routes = {}
+    for route in ROUTES:
+        values = sorted(results.latencies[route])
+        routes[route] = {
+            "requests": len(values),
+            "errors": results.errors[route],
+            "error_rate": round(results.errors[route] / len(values), 4) if values else 0.0,
+            **{f"p{q}_ms": round(percentile(values, q) * 1000, 1) if values else None for q in (50, 90, 95, 99)},
+            "max_ms": round(values[-1] * 1000, 1) if values else None
+        }
+    total_requests = sum(route["requests"] for route in routes.values())
+    return {
+        "seconds": round(seconds, 3),
+        "flows": results.flows,
+        "failed_flows": results.failed_flows,
+        "flows_per_second": round(results.flows / seconds, 3) if seconds else None,
+        "requests_per_second": round(total_requests / seconds, 3) if seconds else None,
+        "error_rate": round(sum(r["errors"] for r in routes.values()) / total_requests, 4) if total_requests else 0.0,
+        "routes": routes,
+        "server_memory": memory,
+        "ollama_stub_calls": stub_calls,
+        "error_samples": results.error_samples
+    }
+
+def print_summary(summary, users):
+    mb = lambda value: f"{value / (1024 * 1024):.1f} MB"
+    print(f"\nLoad test: {users} users, {summary['flows']} flows in {summary['seconds']:.1f}s "
+          f"({summary['failed_flows']} failed)")
+    print(f"Throughput: {summary['flows_per_second']:.2f} flows/s, {summary['requests_per_second']:.2f} requests/s, "
+          f"error rate {summary['error_rate']:.1%}")
+    print(f"\n{'route':<20}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    fmt = lambda value: "-" if value is None else f"{value:.1f}"
+    for route, row in summary["routes"].items():
+        print(f"{route:<20}{row['requests']:>9}{row['errors']:>8}{fmt(row['p50_ms']):>10}{fmt(row['p90_ms']):>10}"
+              f"{fmt(row['p95_ms']):>10}{fmt(row['p99_ms']):>10}{fmt(row['max_ms']):>10}")
+    memory = summary["server_memory"]
+    if memory:
+        print(f"\nServer RSS: {mb(memory['start_bytes'])} at start, {mb(memory['peak_bytes'])} peak, "
+              f"{mb(memory['end_bytes'])} at end ({memory['growth_bytes'] / (1024 * 1024):+.1f} MB)")
+    else:
+        print("\nServer RSS: not sampled (needs a local server pid and /proc)")
+    print(f"Ollama stub calls: {summary['ollama_stub_calls']}")
+    for sample in summary["error_samples"]:
+        print(f"  ❌ {sample}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=1, help="flows per user")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which users start")
+    parser.add_argument("--tools", type=int, default=100, help="tools per generated workflow")
+    parser.add_argument("--workflows", type=int, default=5, help="distinct workflows (uploads beyond this are duplicates)")
+    parser.add_argument("--fallback-rate", type=float, default=0.1, help="share of formulas sent to the Ollama stub")
+    parser.add_argument("--visualize-mode", choices=("client", "png"), default=config.VISUALIZE_MODE)
+    parser.add_argument("--timeout", type=float, default=300, help="per request, seconds")
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for memory sampling")
+    parser.add_argument("--server-log", help="write the started server's output here")
+    parser.add_argument("--stub-port", type=int, default=0, help="Ollama stub port (default: any free port)")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="seconds per stubbed Ollama call")
+    parser.add_argument("--json", dest="json_out", help="also write the summary as JSON")
+    args = parser.parse_args()
+
+    stub = start_stub(args.stub_port, args.stub_latency)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}/api/chat"
+    print(f"🤖 Ollama stub on {stub_url} ({args.stub_latency}s per call)")
+
+    work_dir = tempfile.mkdtemp(prefix="load_test_")
+    packages = [generate_workflow.write(os.path.join(work_dir, f"load_{i}.yxzp"), tools=args.tools,
+                                        fallback_rate=args.fallback_rate, seed=i)
+                for i in range(max(1, args.workflows))]
+
+    server = None
+    if args.url:
+        base_url, pid = args.url.rstrip('/'), args.server_pid
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(port, stub_url, args.server_log)
+        pid = server.pid
+        print(f"🚀 Starting server on {base_url} (pid {pid})")
+    try:
+        if not wait_until_up(base_url):
+            sys.exit(f"❌ Server at {base_url} did not come up")
+
+        sampler = MemorySampler(pid).start() if pid else None
+        results = Results()
+        started = time.time()
+        users = [threading.Thread(target=virtual_user, name=f"user-{i}",
+                                  args=(i, base_url, packages, results, args.iterations, args.visualize_mode,
+                                        args.timeout, started + args.ramp_up * i / max(1, args.users)))
+                 for i in range(args.users)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.time() - started
+        memory = sampler.stop() if sampler else None
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        stub.shutdown()
+        for package in packages:
+            os.remove(package)
+        os.rmdir(work_dir)
+
+    summary = summarize(results, elapsed, memory, OllamaStub.calls)
+    print_summary(summary, args.users)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary written to {args.json_out}")
+    sys.exit(1 if summary["failed_flows"] else 0)
@@ -1,7 +1,8 @@
-from src import config, extractor, builder, visualizer
+from src import config, profiler
+import argparse
 import os
 
-def run():
+def run(profile=False, cprofile=False, memory=False, report_path=None):
     print(">>> altKNIME-2.0: SKELETON BUILDER")
     
     # 1. SETUP
@@ -19,34 +20,49 @@ def run():
         return
     
     input_path = os.path.join(config.INPUT_DIR, files[0])
-    
-    # 2. EXTRACT
-    print(f"1. Processing {files[0]}...")
-    
+    if not os.path.exists(config.OUTPUT_DIR): os.makedirs(config.OUTPUT_DIR)
+
     # Handles .yxzp (zip), .yxmd (xml), and .yxwz (xml app)
-    workflow_file = extractor.prepare_workflow_file(input_path)
-    
-    if not workflow_file:
-        print("❌ Failed to identify a valid workflow XML file.")
+    # Steps: extract -> parse -> convert formulas -> visualize (proof of structure) -> build (proof of KNIME compat)
+    prof = profiler.Profile(files[0], cprofile=cprofile, memory=memory)
+    try:
+        profiler.run_pipeline(input_path, prof,
+                              output_path=os.path.join(config.OUTPUT_DIR, "skeleton.knwf"),
+                              structure_path=os.path.join(config.OUTPUT_DIR, "structure.png"),
+                              log=print)
+    except ValueError as e:
+        print(f"❌ {e}")
         return
-
-    graph = extractor.parse_workflow(workflow_file)
-    
-    if not graph: 
-        print("❌ Failed to parse workflow graph.")
-        return
-
-    # 3. VISUALIZE (Proof of Structure)
-    print("2. Visualizing Structure...")
-    if not os.path.exists(config.OUTPUT_DIR): os.makedirs(config.OUTPUT_DIR)
-    
-    visualizer.draw_exact_workflow(graph, os.path.join(config.OUTPUT_DIR, "structure.png"))
-    
-    # 4. BUILD SKELETON (Proof of KNIME Compat)
-    print("3. Generating KNIME Skeleton...")
-    builder.build_skeleton(graph)
     
     print("✅ DONE. Check output/skeleton.knwf")
 
+    if profile:
+        path = report_path or profiler.report_path(files[0])
+        report = prof.write(path)
+        print(f"⏱️  Profile ({report['total_seconds']:.3f}s total) written to {path}")
+        for stage, entry in report['stages'].items():
+            print(f"   {stage:<10} {entry['seconds']:.4f}s")
+        for node in report['slowest_nodes'][:5]:
+            print(f"   slowest: tool {node['id']} ({node['type']}) {node['total']:.4f}s")
+
+def watch(workers=None, interval=None, once=False):
+    from src.watcher import Watcher
+    print(">>> altKNIME-2.0: WATCH MODE")
+    Watcher(workers=workers).run(interval=interval, once=once)
+
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Convert Alteryx workflows in input/ to KNIME skeletons.")
+    parser.add_argument("--watch", action="store_true", help="keep running and convert new or changed files in input/")
+    parser.add_argument("--once", action="store_true", help="with --watch: convert what is there now, then exit")
+    parser.add_argument("--workers", type=int, help=f"files converted at once (default {config.WATCH_WORKERS})")
+    parser.add_argument("--interval", type=float, help=f"seconds between scans (default {config.WATCH_INTERVAL_SECONDS})")
+    parser.add_argument("--profile", action="store_true", help="write a JSON timing report (per stage and per tool)")
+    parser.add_argument("--cprofile", action="store_true", help="with --profile: include a cProfile of the run (+ .pstats dump)")
+    parser.add_argument("--tracemalloc", action="store_true", help="with --profile: trace memory allocations (+ snapshot dump)")
+    parser.add_argument("--profile-out", help=f"report path (default {os.path.relpath(config.PROFILE_DIR, config.BASE_DIR)}/<name>_<time>.json)")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(args.workers, args.interval, args.once)
+    else:
+        run(args.profile, args.cprofile, args.tracemalloc, args.profile_out)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from concurrent.futures.process import BrokenProcessPool
+from src import config, conversion_jobs, formula_converter, metrics
+from src.conversion_jobs import JOBS, ACTIVE
+
+# Coroutine versions of the conversion job and the SSE tail, used by asgi.py.
+# Waiting (on Ollama, on new job events) holds no thread: Ollama calls go through
+# an async HTTP client, the Lark transpiler runs in executors and SQLite calls are
+# short hops to the default thread pool.
+
+_waiters = {}   # job_id -> set of asyncio.Event, one per open stream
+
+def install(loop, client):
+    """Routes new conversion jobs and event wake-ups to this event loop."""
+    def wake(job_id):
+        loop.call_soon_threadsafe(_wake, job_id)
+
+    def launch(job_id, session_id, sessions):
+        asyncio.run_coroutine_threadsafe(run_job_async(job_id, session_id, sessions, client), loop)
+
+    conversion_jobs.add_listener(wake)
+    conversion_jobs.set_launcher(launch)
+
+def _wake(job_id):
+    for event in _waiters.get(job_id, ()):
+        event.set()
+
+async def transpile(executor, formulas):
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, conversion_jobs.timed_transpile, formulas)
+    except BrokenProcessPool:
+        # A worker died: retry on the default thread pool
+        conversion_jobs.reset_transpile_pool()
+        return await loop.run_in_executor(None, conversion_jobs.timed_transpile, formulas)
+
+async def convert_graph_async(graph, report, client):
+    """Same result as conversion_jobs.convert_graph; report is a coroutine function."""
+    total = len(graph['nodes'])
+    await report(0, '🚀 Initializing Conversion Engine...')
+    skipped = []
+    formula_nodes = conversion_jobs.split_formula_nodes(graph, lambda progress, log: skipped.append((progress, log)))
+    for progress, log in skipped:
+        await report(progress, log)
+
+    completed = total - len(formula_nodes)
+    many = len(formula_nodes) >= config.TRANSPILE_PROCESS_MIN_NODES
+    executor = conversion_jobs.get_transpile_pool() if many else None
+    ai_slots = asyncio.Semaphore(config.AI_FALLBACK_WORKERS)
+
+    async def ask_ai(field, expressions, error):
+        async with ai_slots:
+            print(f"🔄 Transpiler failed on '{field}' ({error}). Switching to AI...")
+            return field, await formula_converter.convert_with_ai_fallback_async(field, expressions, client)
+
+    async def convert_node(node):
+        nonlocal completed
+        scripts, failures, seconds = await transpile(executor, node['config']['formulas'])
+        metrics.TRANSPILE_SECONDS.observe(seconds)
+        fallback = {}
+        if failures:
+            await report(int((completed / total) * 100), f"⚡ AI Generating Logic for Node {node['id']}...")
+            fallback = dict(await asyncio.gather(*(ask_ai(field, expressions, error)
+                                                   for field, (expressions, error) in failures.items())))
+        conversion_jobs.store_scripts(node, scripts, fallback)
+        completed += 1
+        await report(int((completed / total) * 100), f"✅ Node {node['id']}: Translated formulas.")
+
+    await asyncio.gather(*(convert_node(node) for node in formula_nodes))
+
+async def run_job_async(job_id, session_id, sessions, client):
+    """Coroutine counterpart of conversion_jobs.run_job."""
+    async def emit(event):
+        await asyncio.to_thread(conversion_jobs.emit, job_id, event)
+
+    async def report(progress, log):
+        await emit({'progress': progress, 'log': log})
+
+    await asyncio.to_thread(JOBS.set_status, job_id, "running")
+    try:
+        session = await asyncio.to_thread(sessions.get, session_id)
+        if not session or not session.get('graph'):
+            raise RuntimeError("Session lost")
+
+        await convert_graph_async(session['graph'], report, client)
+
+        updated = await asyncio.to_thread(sessions.update, session_id,
+                                          lambda latest: conversion_jobs.merge_converted(latest, session['graph']))
+        if updated is None:
+            raise RuntimeError("Session lost")
+
+        # Final event first: a tail that sees the job finished must find it in the log
+        await emit({'progress': 100, 'log': '✨ Analysis Complete.', 'done': True})
+        await asyncio.to_thread(JOBS.set_status, job_id, "done")
+    except Exception as e:
+        print(f"❌ Conversion job {job_id} failed: {e}")
+        await emit({'progress': 100, 'log': f'❌ Conversion failed: {e}', 'done': True, 'failed': True})
+        await asyncio.to_thread(JOBS.set_status, job_id, "failed", str(e))
+
+async def tail_async(job_id, last_seq=0):
+    """Async counterpart of conversion_jobs.tail: yields (seq, data), (None, None) = keep-alive."""
+    wakeup = asyncio.Event()
+    _waiters.setdefault(job_id, set()).add(wakeup)
+    idle_since = time.monotonic()
+    try:
+        while True:
+            wakeup.clear()
+            events = await asyncio.to_thread(JOBS.events_after, job_id, last_seq)
+            for seq, data in events:
+                last_seq = seq
+                yield seq, data
+            if events:
+                idle_since = time.monotonic()
+                continue
+
+            job = await asyncio.to_thread(JOBS.get, job_id)
+            if job is None or job['status'] not in ACTIVE:
+                for seq, data in await asyncio.to_thread(JOBS.events_after, job_id, last_seq):
+                    yield seq, data
+                return
+
+            # Woken by this process's jobs; the timeout covers jobs run by other processes
+            try:
+                await asyncio.wait_for(wakeup.wait(), config.JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            if time.monotonic() - idle_since >= config.JOB_KEEPALIVE_SECONDS:
+                idle_since = time.monotonic()
+                yield None, None
+    finally:
+        waiters = _waiters.get(job_id)
+        if waiters is not None:
+            waiters.discard(wakeup)
+            if not waiters:
+                del _waiters[job_id]
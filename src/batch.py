@@ -0,0 +1,146 @@
+import json
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from werkzeug.exceptions import RequestEntityTooLarge
+from src import config, extractor, mappings, builder, conversion_jobs
+from src.zip_writer import ZipWriter
+
+# Batch conversion: many Alteryx packages in, one archive out. Each package runs
+# the same extractor -> formula conversion -> builder chain as the web flow, in
+# parallel, and its .knwf is streamed into the result archive as soon as it is
+# built. The archive ends with report.json (timings and per-node outcomes).
+
+WORKFLOW_EXTENSIONS = ('.yxmd', '.yxwz', '.yxzp')
+
+def expand_inputs(paths, work_dir):
+    """
+    Replaces plain .zip uploads by the workflow packages inside them. Returns [(name, path)].
+    Raises RequestEntityTooLarge when the packages exceed the BATCH_MAX_* limits
+    (checked before anything is unpacked).
+    """
+    inputs, members, expanded = [], 0, 0
+    for name, path in paths:
+        if not name.lower().endswith('.zip'):
+            inputs.append((name, path))
+            continue
+        unpack_dir = os.path.join(work_dir, f"unzip_{len(inputs)}")
+        os.makedirs(unpack_dir, exist_ok=True)
+        with zipfile.ZipFile(path) as z:
+            wanted = [(index, member) for index, member in enumerate(z.infolist())
+                      if not member.is_dir() and member.filename.lower().endswith(WORKFLOW_EXTENSIONS)]
+            for _, member in wanted:
+                members += 1
+                expanded += member.file_size
+                if members > config.BATCH_MAX_MEMBERS:
+                    raise RequestEntityTooLarge(f"Batch holds more than {config.BATCH_MAX_MEMBERS} workflow packages")
+                if expanded > config.BATCH_MAX_EXPANDED_BYTES:
+                    raise RequestEntityTooLarge(f"Batch expands to more than "
+                                                f"{config.BATCH_MAX_EXPANDED_BYTES // (1024 * 1024)} MB")
+                if member.file_size > config.BATCH_MAX_COMPRESSION_RATIO * max(member.compress_size, 1):
+                    raise RequestEntityTooLarge(f"{member.filename} is compressed suspiciously well")
+            for index, member in wanted:
+                # Flatten member paths: never write outside unpack_dir.
+                # zipfile stops at the declared file_size, so the checks above bound what is written.
+                target = os.path.join(unpack_dir, f"{index}_{os.path.basename(member.filename)}")
+                with z.open(member) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                inputs.append((member.filename, target))
+    return inputs
+
+def node_outcomes(graph):
+    """Per-tool result: the KNIME nodes it became and how its formulas were converted."""
+    outcomes = []
+    for node in graph['nodes']:
+        specs = builder.REGISTRY.get(node['type']).node_specs(node['type'], node['config'])
+        entry = {"id": node['id'], "type": node['type'], "knime_nodes": [s['spec']['name'] for s in specs]}
+        if not specs:
+            entry['outcome'] = "skipped"
+        elif any(s['spec'] is mappings.NODE_SPECS["Unknown"] for s in specs):
+            entry['outcome'] = "unmapped"
+        else:
+            entry['outcome'] = "mapped"
+
+        scripts = node['config'].get('reviewed_js')
+        if scripts is not None:
+            fallback = node['config'].get('ai_fallback_fields', [])
+            failed = [f for f, js in scripts.items() if js.startswith("// Critical Error")]
+            entry['formulas'] = {"fields": len(scripts), "ai_fallback": fallback, "failed": failed}
+            entry['outcome'] = "failed" if failed else ("ai_fallback" if fallback else "transpiled")
+        outcomes.append(entry)
+    return outcomes
+
+def convert_file(name, path, work_dir, index):
+    """Converts one package. Returns (report entry, .knwf bytes or None)."""
+    timings = {}
+    started = time.perf_counter()
+    report = {"file": name, "status": "failed", "timings": timings}
+    item_dir = os.path.join(work_dir, f"item_{index}")
+    try:
+        t = time.perf_counter()
+        workflow_file = extractor.prepare_workflow_file(path, os.path.join(item_dir, "extract"))
+        graph = extractor.parse_workflow(workflow_file, os.path.join(item_dir, "extract"))
+        timings['parse_seconds'] = round(time.perf_counter() - t, 4)
+        if graph is None:
+            raise ValueError("No workflow found in package")
+
+        t = time.perf_counter()
+        conversion_jobs.convert_graph(graph, lambda progress, log: None)
+        timings['convert_seconds'] = round(time.perf_counter() - t, 4)
+
+        t = time.perf_counter()
+        build_stats = {}
+        archive = b"".join(builder.stream_skeleton(graph, build_stats))
+        timings['build_seconds'] = round(time.perf_counter() - t, 4)
+
+        report.update(status="ok", tools=len(graph['nodes']), nodes=node_outcomes(graph),
+                      build={k: build_stats[k] for k in ('nodes', 'cache_hits', 'metanodes')})
+        return report, archive
+    except Exception as e:
+        print(f"❌ Batch: {name} failed: {e}")
+        report['error'] = str(e)
+        return report, None
+    finally:
+        timings['total_seconds'] = round(time.perf_counter() - started, 4)
+        shutil.rmtree(item_dir, ignore_errors=True)
+
+def output_name(name, used):
+    stem = os.path.splitext(os.path.basename(name))[0] or "workflow"
+    candidate, n = f"{stem}.knwf", 2
+    while candidate in used:
+        candidate, n = f"{stem}_{n}.knwf", n + 1
+    used.add(candidate)
+    return candidate
+
+def stream_batch(inputs, work_dir, workers=None):
+    """
+    Generator of ZIP chunks: one .knwf per converted package (completion order),
+    then report.json. Removes work_dir when done or when the client goes away.
+    """
+    batch_id = str(uuid.uuid4())
+    started = time.perf_counter()
+    writer = ZipWriter(time.localtime()[:6])
+    reports, used = [None] * len(inputs), set()
+    pool = ThreadPoolExecutor(max_workers=workers or config.BATCH_WORKERS, thread_name_prefix="batch")
+    try:
+        futures = {pool.submit(convert_file, name, path, work_dir, i): i for i, (name, path) in enumerate(inputs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            report, archive = future.result()
+            if archive:
+                report['output'] = output_name(report['file'], used)
+                yield writer.add(report['output'], archive)
+            reports[index] = report
+
+        converted = sum(1 for r in reports if r['status'] == "ok")
+        summary = {"batch_id": batch_id, "files": len(inputs), "converted": converted,
+                   "failed": len(inputs) - converted, "seconds": round(time.perf_counter() - started, 4)}
+        print(f"📦 Batch {batch_id}: {converted}/{len(inputs)} converted in {summary['seconds']}s")
+        yield writer.add("report.json", json.dumps({"summary": summary, "files": reports}, indent=2))
+        yield writer.finish()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
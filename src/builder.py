@@ -1,7 +1,18 @@
 import os
-import zipfile
 import json
-from src import config, mappings, formula_converter
+import time
+import multiprocessing
+from xml.sax.saxutils import escape
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from src import config, mappings, formula_converter, template_store, settings_cache, generators, metrics
+from src.zip_writer import ZipWriter, compress_entry
+from src.partition import partition_graph
+
+# Bump whenever generated settings.xml content changes (invalidates the settings cache)
+BUILDER_VERSION = "2.0.1"
+
+# Matches the "authored-when" stamp below; keeps archives reproducible.
+ZIP_TIMESTAMP = (2026, 1, 1, 0, 0, 0)
 
 # --- XML TEMPLATES ---
 
@@ -48,6 +59,74 @@ CONNECTION_TEMPLATE = """        <config key="connection_{index}">
             <entry key="destPort" type="xint" value="{dest_port}"/>
         </config>"""
 
+# --- METANODE TEMPLATES (Large workflows) ---
+
+METANODE_ENTRY_TEMPLATE = """        <config key="node_{index}">
+            <entry key="id" type="xint" value="{knime_id}"/>
+            <entry key="node_settings_file" type="xstring" value="{folder_name}/workflow.knime"/>
+            <entry key="node_is_meta" type="xboolean" value="true"/>
+            <entry key="node_type" type="xstring" value="MetaNode"/>
+            <entry key="ui_classname" type="xstring" value="org.knime.core.node.workflow.NodeUIInformation"/>
+            <config key="ui_settings">
+                <config key="extrainfo.node.bounds">
+                    <entry key="array-size" type="xint" value="4"/>
+                    <entry key="0" type="xint" value="{x}"/>
+                    <entry key="1" type="xint" value="{y}"/>
+                    <entry key="2" type="xint" value="-1"/>
+                    <entry key="3" type="xint" value="-1"/>
+                </config>
+            </config>
+        </config>"""
+
+METANODE_PORT_TEMPLATE = """            <config key="{direction}_{index}">
+                <entry key="index" type="xint" value="{index}"/>
+                <config key="type">
+                    <entry key="object_class" type="xstring" value="org.knime.core.node.BufferedDataTable"/>
+                </config>
+            </config>"""
+
+METANODE_WORKFLOW_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<config xmlns="http://www.knime.org/2008/09/XMLConfig" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.knime.org/2008/09/XMLConfig http://www.knime.org/XMLConfig_2008_09.xsd" key="workflow.knime">
+    <entry key="created_by" type="xstring" value="5.1.0"/>
+    <entry key="version" type="xstring" value="5.1.0"/>
+    <entry key="name" type="xstring" value="{name}"/>
+    <config key="meta_in_ports">
+        <config key="ui_settings">
+            <config key="extrainfo.meta.bounds">
+                <entry key="array-size" type="xint" value="4"/>
+                <entry key="0" type="xint" value="{in_x}"/>
+                <entry key="1" type="xint" value="{bar_y}"/>
+                <entry key="2" type="xint" value="50"/>
+                <entry key="3" type="xint" value="-1"/>
+            </config>
+        </config>
+        <config key="port_enum">
+{in_ports_block}
+        </config>
+    </config>
+    <config key="meta_out_ports">
+        <config key="ui_settings">
+            <config key="extrainfo.meta.bounds">
+                <entry key="array-size" type="xint" value="4"/>
+                <entry key="0" type="xint" value="{out_x}"/>
+                <entry key="1" type="xint" value="{bar_y}"/>
+                <entry key="2" type="xint" value="50"/>
+                <entry key="3" type="xint" value="-1"/>
+            </config>
+        </config>
+        <config key="port_enum">
+{out_ports_block}
+        </config>
+    </config>
+    <config key="nodes">
+{nodes_block}
+    </config>
+    <config key="connections">
+{connections_block}
+    </config>
+</config>
+"""
+
 # --- NODE SPECIFIC SETTINGS TEMPLATES ---
 
 # 1. Base Generic Shell
@@ -225,19 +304,12 @@ def get_oracle_connector_model(config_data):
 def load_oracle_template(alias):
     """
     Tries to load a pre-configured settings.xml for a specific DB Alias.
-    Look in src/templates/oracle/{alias}.xml
+    Look in src/templates/oracle/{alias}.xml (served from the in-memory template store)
     """
-    # Clean alias to be filename safe (e.g. "TMUPROD")
-    safe_alias = "".join([c for c in alias if c.isalnum() or c in (' ', '_', '-')]).strip()
-    
-    template_path = os.path.join(config.BASE_DIR, "src", "templates", "oracle", f"{safe_alias}.xml")
-    
-    if os.path.exists(template_path):
-        print(f"   [Oracle] 🟢 Found Template for '{safe_alias}'")
-        with open(template_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    
-    return None
+    custom_xml = template_store.ORACLE_TEMPLATES.get(alias)
+    if custom_xml:
+        print(f"   [Oracle] 🟢 Found Template for '{template_store.normalize_alias(alias)}'")
+    return custom_xml
 
 def get_groupby_model(config_data):
     """Generates GroupBy settings with correctly mapped aggregations."""
@@ -601,147 +673,242 @@ def get_sorter_model(config_data):
     <entry key="missingToEnd" type="xboolean" value="false"/>
     <entry key="sortinmemory" type="xboolean" value="false"/>
     """
-def build_skeleton(graph_data):
-    output_path = os.path.join(config.OUTPUT_DIR, "skeleton.knwf")
-    print(f"🏗️  Building Skeleton to {output_path}...")
+# --- GENERATOR REGISTRY ---
+# Maps Alteryx tool types to the generators that emit their KNIME nodes.
+# New tools only need a generator and a REGISTRY.register() call.
 
-    nodes_xml_parts = []
-    conns_xml_parts = []
-    zip_contents = {} 
-    
+ORACLE_CONNECTOR_SPEC = {
+    "name": "Oracle Connector",
+    "factory": "org.knime.database.extension.oracle.node.connector.OracleDBConnectorNodeFactory",
+    "bundle": "KNIME Oracle database extension",
+    "symbolic": "org.knime.database.extensions.oracle"
+}
+
+def xml_attr(value):
+    """Escapes text for a double-quoted XML attribute (captions, node names)."""
+    return escape(str(value), {'"': '&quot;'})
+
+def wrap_settings(spec, model_block):
+    return SETTINGS_TEMPLATE.format(
+        name=xml_attr(spec['name']), factory=spec['factory'], bundle=spec['bundle'],
+        symbolic=spec['symbolic'], model_content=model_block
+    )
+
+class ModelGenerator(generators.NodeGenerator):
+    """Single KNIME node whose model block comes from `model_fn(config_data)`."""
+
+    def __init__(self, name, model_fn=None):
+        self.name = name
+        self.model_fn = model_fn
+
+    def build_settings(self, part, spec, node_config):
+        model_block = self.model_fn(node_config) if self.model_fn else ""
+        return wrap_settings(spec, model_block)
+
+class SkipGenerator(generators.NodeGenerator):
+    """Tools that are dropped from the KNIME workflow (e.g. Browse)."""
+    name = "Skip"
+
+    def node_specs(self, tool_type, node_config):
+        return []
+
+class DbInputGenerator(generators.NodeGenerator):
+    """
+    Input Data: Database inputs become Oracle Connector -> DB Query Reader,
+    file inputs stay a single (unconfigured) reader.
+    """
+    name = "DB Input"
+
+    def node_specs(self, tool_type, node_config):
+        if node_config.get('input_type') != 'DB':
+            return super().node_specs(tool_type, node_config)
+        return [
+            {"spec": ORACLE_CONNECTOR_SPEC, "offset_x": 0, "offset_y": -80},
+            {"spec": mappings.get_spec("DbFileInput_DB", node_config), "offset_x": 0, "offset_y": 0}
+        ]
+
+    def is_cacheable(self, part, spec):
+        # Oracle output depends on Gold Image files on disk, not just the node config
+        return spec['name'] != ORACLE_CONNECTOR_SPEC['name']
+
+    def build_settings(self, part, spec, node_config):
+        if spec['name'] == "DB Query Reader":
+            raw_sql = node_config.get('sql_query', 'SELECT * FROM TABLE')
+            safe_sql = raw_sql.replace('"', '&quot;').replace('<', '&lt;')
+            return wrap_settings(spec, DB_QUERY_CONTENT.format(sql_query=safe_sql))
+        if spec['name'] == ORACLE_CONNECTOR_SPEC['name']:
+            return self.build_oracle_settings(spec, node_config)
+        return wrap_settings(spec, "")
+
+    def build_oracle_settings(self, spec, node_config):
+        # 1. Determine Alias (Standard logic)
+        cached_name = node_config.get('cached_name', '')
+        raw_file = node_config.get('sql_query', '')
+        alias = "XE"
+        if cached_name:
+            alias = cached_name.split('_')[0]
+        elif "aka:" in raw_file:
+            potential = raw_file.split("aka:")[1].split("|||")[0].strip()
+            if len(potential) < 30: alias = potential
+
+        # 2. Strategy Check: Template vs. Generator
+        custom_xml = load_oracle_template(alias)
+        
+        if custom_xml:
+            # STRATEGY A: Use the User's Gold Image
+            # We bypass the SETTINGS_TEMPLATE entirely because the file is already complete
+            return custom_xml
+
+        # STRATEGY B: Fallback to Auto-Generation
+        print(f"   [Oracle] ⚠️ No template for '{alias}'. Using generic generator.")
+        return wrap_settings(spec, get_oracle_connector_model(node_config))
+
+REGISTRY = generators.GeneratorRegistry(default=ModelGenerator("Shell"))
+REGISTRY.register("BrowseV2", SkipGenerator())
+REGISTRY.register("DbFileInput", DbInputGenerator())
+REGISTRY.register("Summarize", ModelGenerator("GroupBy", get_groupby_model))
+REGISTRY.register("Join", ModelGenerator("Joiner", get_joiner_model))
+REGISTRY.register(["Formula", "MultiRowFormula"], ModelGenerator("Column Expressions", get_expression_model))
+REGISTRY.register("Union", ModelGenerator("Concatenate", get_concatenate_model))
+REGISTRY.register(["Select", "AlteryxSelect"], ModelGenerator("Table Manipulator", get_table_manipulator_model))
+REGISTRY.register("Sort", ModelGenerator("Sorter", get_sorter_model))
+
+# --- BUILD PHASES ---
+
+def plan_nodes(graph_data, skip_ids=()):
+    """
+    Phase 1: Assigns KNIME IDs and canvas positions (tools in `skip_ids` are left out).
+    Returns (node_plans, internal_connections, id_map). Each plan carries
+    everything its settings.xml depends on, so phase 2 can run in any order.
+    """
+    node_plans = []
+    internal_conns = []
     id_map = {}
     current_knime_id = 1
-    node_entries_count = 0
-    
-    # --- 1. PROCESS NODES ---
+
     for node in graph_data['nodes']:
         alteryx_id = node['id']
         tool_type = node['type']
-        
-        # SKIP BROWSE NODES (As requested)
-        if tool_type == "BrowseV2":
-            print(f"      [SKIP] Ignoring Browser Tool {alteryx_id}")
+        if alteryx_id in skip_ids:
             continue
+        generator = REGISTRY.get(tool_type)
+        nodes_to_create = generator.node_specs(tool_type, node['config'])
 
-        nodes_to_create = []
-        
-        if tool_type == "DbFileInput" and node['config'].get('input_type') == 'DB':
-            nodes_to_create.append({
-                "spec": {
-                    "name": "Oracle Connector",
-                    "factory": "org.knime.database.extension.oracle.node.connector.OracleDBConnectorNodeFactory",
-                    "bundle": "KNIME Oracle database extension",
-                    "symbolic": "org.knime.database.extensions.oracle"
-                },
-                "config": node['config'],
-                "offset_x": 0, "offset_y": -80
-            })
-            nodes_to_create.append({
-                "spec": mappings.get_spec("DbFileInput_DB", node['config']),
-                "config": node['config'],
-                "offset_x": 0, "offset_y": 0
-            })
-        else:
-            nodes_to_create.append({
-                "spec": mappings.get_spec(tool_type, node['config']),
-                "config": node['config'],
-                "offset_x": 0, "offset_y": 0
-            })
+        # SKIP BROWSE NODES (As requested)
+        if not nodes_to_create:
+            print(f"      [SKIP] Ignoring {tool_type} Tool {alteryx_id}")
+            continue
 
         created_knime_ids = []
         
-        for n_def in nodes_to_create:
+        for part, n_def in enumerate(nodes_to_create):
             knime_id = current_knime_id
             current_knime_id += 1
             created_knime_ids.append(knime_id)
-            
+
             spec = n_def['spec']
-            folder_name = f"{spec['name']} (#{knime_id})"
-            
-            model_block = ""
-            if spec['name'] == "DB Query Reader":
-                raw_sql = n_def['config'].get('sql_query', 'SELECT * FROM TABLE')
-                safe_sql = raw_sql.replace('"', '&quot;').replace('<', '&lt;')
-                model_block = DB_QUERY_CONTENT.format(sql_query=safe_sql)
-            elif spec['name'] == "Oracle Connector":
-                # 1. Determine Alias (Standard logic)
-                cached_name = n_def['config'].get('cached_name', '')
-                raw_file = n_def['config'].get('sql_query', '')
-                alias = "XE"
-                if cached_name:
-                    alias = cached_name.split('_')[0]
-                elif "aka:" in raw_file:
-                    potential = raw_file.split("aka:")[1].split("|||")[0].strip()
-                    if len(potential) < 30: alias = potential
-
-                # 2. Strategy Check: Template vs. Generator
-                custom_xml = load_oracle_template(alias)
-                
-                if custom_xml:
-                    # STRATEGY A: Use the User's Gold Image
-                    # We bypass the SETTINGS_TEMPLATE entirely because the file is already complete
-                    settings_content = custom_xml
-                else:
-                    # STRATEGY B: Fallback to Auto-Generation
-                    print(f"   [Oracle] ⚠️ No template for '{alias}'. Using generic generator.")
-                    model_block = get_oracle_connector_model(n_def['config'])
-                    settings_content = SETTINGS_TEMPLATE.format(
-                        name=spec['name'], factory=spec['factory'], bundle=spec['bundle'],
-                        symbolic=spec['symbolic'], model_content=model_block
-                    )
-
-                # 3. Write to Zip (Common for both strategies)
-                zip_contents[f"{folder_name}/settings.xml"] = settings_content
-
-                x = int(node['x']) + n_def['offset_x']
-                y = int(node['y']) + n_def['offset_y']
-                
-                nodes_xml_parts.append(NODE_ENTRY_TEMPLATE.format(
-                    index=node_entries_count, knime_id=knime_id, folder_name=folder_name, x=x, y=y
-                ))
-                node_entries_count += 1
-                
-                # SKIP the default loop processing below since we handled it manually
+            node_plans.append({
+                "knime_id": knime_id,
+                "folder_name": f"{spec['name']} (#{knime_id})",
+                "alteryx_id": alteryx_id,
+                "tool_type": tool_type,
+                "part": part,
+                "spec": spec,
+                "config": node['config'],
+                "x": int(node['x']) + n_def['offset_x'],
+                "y": int(node['y']) + n_def['offset_y']
+            })
+
+        for src_part, dest_part, src_port, dest_port in generator.internal_connections(len(created_knime_ids)):
+            internal_conns.append((created_knime_ids[src_part], created_knime_ids[dest_part], src_port, dest_port))
+        id_map[alteryx_id] = created_knime_ids[generator.output_part(len(created_knime_ids))]
+
+    return node_plans, internal_conns, id_map
+
+def render_node_settings(plan):
+    """Phase 2: Generates the settings.xml text for a single planned node."""
+    generator = REGISTRY.get(plan['tool_type'])
+    return generator.build_settings(plan['part'], plan['spec'], plan['config'])
+
+def render_node_entry(plan):
+    """
+    Pool task: settings.xml text, its deflated zip payload, and generator timing.
+    Timing travels with the result so process workers are accounted for too.
+    """
+    start = time.perf_counter()
+    settings_content = render_node_settings(plan)
+    elapsed = time.perf_counter() - start
+    generator_name = REGISTRY.get(plan['tool_type']).name
+    return settings_content, compress_entry(settings_content), generator_name, elapsed
+
+def render_all_settings(node_plans, workers=None, executor=None, cache=None, node_seconds=None):
+    """
+    Phase 2 driver: Generates settings for every plan, optionally in a pool.
+    Nodes found in the settings cache are reused; only misses are rendered.
+    Results come back in plan order, so the archive is identical to the sequential path.
+    Returns (entries, stats) where entries[i] = (settings_text, compressed_entry)
+    and stats include per-generator timing for the nodes rendered in this build.
+    node_seconds: optional dict filled with render time per Alteryx tool id (cache hits count 0).
+    """
+    workers = config.BUILDER_WORKERS if workers is None else workers
+    executor = executor or config.BUILDER_EXECUTOR
+    cache = settings_cache.SETTINGS_CACHE if cache is None else cache
+
+    entries = [None] * len(node_plans)
+    keys = [None] * len(node_plans)
+    if node_seconds is not None:
+        node_seconds.update((plan['alteryx_id'], 0.0) for plan in node_plans)
+    pending = []
+    for idx, plan in enumerate(node_plans):
+        if REGISTRY.get(plan['tool_type']).is_cacheable(plan['part'], plan['spec']):
+            keys[idx] = settings_cache.settings_key(plan['spec'], plan['config'], BUILDER_VERSION)
+            cached = cache.get(keys[idx])
+            if cached is not None:
+                entries[idx] = (cached['text'], cached['compressed'])
                 continue
-            elif spec['name'] == "GroupBy":
-                model_block = get_groupby_model(n_def['config'])
-            elif spec['name'] == "Joiner":
-                model_block = get_joiner_model(n_def['config'])
-            elif spec['name'] == "Column Expressions (legacy)":
-                model_block = get_expression_model(n_def['config'])
-            elif spec['name'] == "Concatenate":
-                model_block = get_concatenate_model(n_def['config'])
-            elif spec['name'] == "Table Manipulator":
-                model_block = get_table_manipulator_model(n_def['config'])
-            elif spec['name'] == "Sorter":
-                model_block = get_sorter_model(n_def['config'])
-            
-            settings_content = SETTINGS_TEMPLATE.format(
-                name=spec['name'], factory=spec['factory'], bundle=spec['bundle'],
-                symbolic=spec['symbolic'], model_content=model_block
-            )
-            zip_contents[f"{folder_name}/settings.xml"] = settings_content
-
-            x = int(node['x']) + n_def['offset_x']
-            y = int(node['y']) + n_def['offset_y']
-            
-            nodes_xml_parts.append(NODE_ENTRY_TEMPLATE.format(
-                index=node_entries_count, knime_id=knime_id, folder_name=folder_name, x=x, y=y
-            ))
-            node_entries_count += 1
-
-        if len(created_knime_ids) > 1:
-            conns_xml_parts.append(CONNECTION_TEMPLATE.format(
-                index=len(conns_xml_parts), source_id=created_knime_ids[0], dest_id=created_knime_ids[1],
-                source_port=1, dest_port=1
-            ))
-            id_map[alteryx_id] = created_knime_ids[-1]
+        pending.append(idx)
+
+    pending_plans = [node_plans[idx] for idx in pending]
+    if workers <= 1 or len(pending_plans) < 2:
+        rendered = [render_node_entry(plan) for plan in pending_plans]
+    else:
+        if executor == "process":
+            # spawn: forking a threaded web server can deadlock the child
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
         else:
-            id_map[alteryx_id] = created_knime_ids[0]
+            pool = ThreadPoolExecutor(max_workers=workers)
+        with pool:
+            rendered = list(pool.map(render_node_entry, pending_plans))
 
-    # --- 2. PROCESS EXTERNAL CONNECTIONS ---
-    conn_base_index = len(conns_xml_parts)
-    for i, edge in enumerate(graph_data['edges']):
+    generator_stats = {}
+    for idx, (settings_content, compressed, generator_name, elapsed) in zip(pending, rendered):
+        entries[idx] = (settings_content, compressed)
+        if keys[idx] is not None:
+            cache.put(keys[idx], settings_content, compressed)
+        REGISTRY.record(generator_name, elapsed, len(settings_content))
+        if node_seconds is not None:
+            tool_id = node_plans[idx]['alteryx_id']
+            node_seconds[tool_id] = node_seconds.get(tool_id, 0.0) + elapsed
+        row = generator_stats.setdefault(generator_name, {"calls": 0, "seconds": 0.0, "bytes": 0})
+        row["calls"] += 1
+        row["seconds"] += elapsed
+        row["bytes"] += len(settings_content)
+
+    cacheable = sum(1 for key in keys if key is not None)
+    hits = len(node_plans) - len(pending)
+    stats = {
+        "nodes": len(node_plans),
+        "cache_hits": hits,
+        "cache_misses": cacheable - hits,
+        "cache_hit_rate": round(hits / cacheable, 4) if cacheable else 0.0,
+        "generators": generator_stats
+    }
+    return entries, stats
+
+def map_edges(edges, id_map):
+    """Alteryx edges -> KNIME connections: list of (edge_index, src_id, dest_id, src_port, dest_port)."""
+    external_conns = []
+    for i, edge in enumerate(edges):
         src = id_map.get(edge['source'])
         dest = id_map.get(edge['target'])
         
@@ -764,22 +931,193 @@ def build_skeleton(graph_data):
             elif dest_conn == "Source": dest_port = 2
             elif dest_conn == "Targets": dest_port = 1
 
-            conns_xml_parts.append(CONNECTION_TEMPLATE.format(
-                index=conn_base_index + i,
-                source_id=src, dest_id=dest,
-                source_port=src_port, dest_port=dest_port
-            ))
+            external_conns.append((i, src, dest, src_port, dest_port))
+    return external_conns
+
+def node_entries_xml(node_plans):
+    return [NODE_ENTRY_TEMPLATE.format(
+        index=index, knime_id=plan['knime_id'], folder_name=plan['folder_name'],
+        x=plan['x'], y=plan['y']
+    ) for index, plan in enumerate(node_plans)]
+
+def connections_xml(connections, start_index=0):
+    return [CONNECTION_TEMPLATE.format(
+        index=start_index + index, source_id=src, dest_id=dest,
+        source_port=src_port, dest_port=dest_port
+    ) for index, (src, dest, src_port, dest_port) in enumerate(connections)]
+
+def assemble_flat(node_plans, internal_conns, external_conns):
+    """Single-level workflow.knime. Returns [(arcname, text)] for the workflow files."""
+    conns_xml_parts = connections_xml(internal_conns)
+
+    conn_base_index = len(conns_xml_parts)
+    for i, src, dest, src_port, dest_port in external_conns:
+        conns_xml_parts.extend(connections_xml([(src, dest, src_port, dest_port)], conn_base_index + i))
 
-    # --- 3. ASSEMBLE & ZIP ---
     workflow_content = WORKFLOW_TEMPLATE.format(
-        nodes_block="\n".join(nodes_xml_parts),
+        nodes_block="\n".join(node_entries_xml(node_plans)),
         connections_block="\n".join(conns_xml_parts)
     )
+    return [("workflow.knime", workflow_content)], {plan['knime_id']: "" for plan in node_plans}
+
+def assemble_metanodes(node_plans, internal_conns, external_conns, groups, group_of):
+    """
+    Two-level workflow: grouped tools move into metanodes, everything else stays top level.
+    Connections that cross a metanode boundary are routed through its in/out ports
+    (-1 is the metanode itself inside its own workflow.knime; metanode ports are 0-based).
+    Returns ([(arcname, text)], {knime_id: folder prefix}).
+    """
+    next_id = max([plan['knime_id'] for plan in node_plans], default=0) + 1
+    meta_ids = [next_id + g for g in range(len(groups))]
+    meta_folders = [f"{safe_folder_name(name)} (#{meta_ids[g]})" for g, name in enumerate(groups)]
+
+    location = {plan['knime_id']: group_of.get(plan['alteryx_id']) for plan in node_plans}
+    members = {g: [] for g in range(len(groups))}
+    top_plans = []
+    for plan in node_plans:
+        group = location[plan['knime_id']]
+        (top_plans if group is None else members[group]).append(plan)
+
+    level_conns = {None: [], **{g: [] for g in members}}
+    in_ports = {g: {} for g in members}     # source reference -> inport index
+    out_ports = {g: {} for g in members}    # (inner node, port) -> outport index
+
+    connections = list(internal_conns) + [conn[1:] for conn in external_conns]
+    for src, dest, src_port, dest_port in connections:
+        src_group, dest_group = location.get(src), location.get(dest)
+        if src_group == dest_group:
+            level_conns[src_group].append((src, dest, src_port, dest_port))
+            continue
+
+        # Leaving a metanode: route through one of its outports
+        if src_group is not None:
+            key = (src, src_port)
+            if key not in out_ports[src_group]:
+                out_ports[src_group][key] = len(out_ports[src_group])
+                level_conns[src_group].append((src, -1, src_port, out_ports[src_group][key]))
+            src, src_port = meta_ids[src_group], out_ports[src_group][key]
+
+        # Entering a metanode: one inport per distinct upstream source
+        if dest_group is not None:
+            key = (src, src_port)
+            if key not in in_ports[dest_group]:
+                in_ports[dest_group][key] = len(in_ports[dest_group])
+                level_conns[None].append((src, meta_ids[dest_group], src_port, in_ports[dest_group][key]))
+            level_conns[dest_group].append((-1, dest, in_ports[dest_group][key], dest_port))
+        else:
+            level_conns[None].append((src, dest, src_port, dest_port))
+
+    files = []
+    prefixes = {plan['knime_id']: "" for plan in top_plans}
+    meta_entries = []
+    for g, plans in members.items():
+        xs = [plan['x'] for plan in plans] or [0]
+        ys = [plan['y'] for plan in plans] or [0]
+        meta_entries.append(METANODE_ENTRY_TEMPLATE.format(
+            index=len(top_plans) + g, knime_id=meta_ids[g], folder_name=meta_folders[g],
+            x=sum(xs) // len(xs), y=sum(ys) // len(ys)
+        ))
+        files.append((f"{meta_folders[g]}/workflow.knime", METANODE_WORKFLOW_TEMPLATE.format(
+            name=xml_attr(groups[g]),
+            in_x=min(xs) - 150, out_x=max(xs) + 150, bar_y=min(ys),
+            in_ports_block="\n".join(METANODE_PORT_TEMPLATE.format(direction="inport", index=i) for i in range(len(in_ports[g]))),
+            out_ports_block="\n".join(METANODE_PORT_TEMPLATE.format(direction="outport", index=i) for i in range(len(out_ports[g]))),
+            nodes_block="\n".join(node_entries_xml(plans)),
+            connections_block="\n".join(connections_xml(level_conns[g]))
+        )))
+        for plan in plans:
+            prefixes[plan['knime_id']] = f"{meta_folders[g]}/"
+
+    workflow_content = WORKFLOW_TEMPLATE.format(
+        nodes_block="\n".join(node_entries_xml(top_plans) + meta_entries),
+        connections_block="\n".join(connections_xml(level_conns[None]))
+    )
+    return [("workflow.knime", workflow_content)] + files, prefixes
+
+def drop_empty_groups(groups, group_of, node_plans):
+    """Removes metanodes none of whose tools became KNIME nodes (e.g. a slice of Browse tools)."""
+    used = sorted({group_of[plan['alteryx_id']] for plan in node_plans if plan['alteryx_id'] in group_of})
+    if len(used) == len(groups):
+        return groups, group_of
+    new_index = {old: new for new, old in enumerate(used)}
+    return ([groups[old] for old in used],
+            {node_id: new_index[g] for node_id, g in group_of.items() if g in new_index})
+
+def safe_folder_name(name):
+    """KNIME folder names cannot contain path separators or reserved characters."""
+    cleaned = "".join(c if c.isalnum() or c in " _-()." else "_" for c in str(name)).strip()
+    return cleaned[:60] or "Metanode"
+
+def build_skeleton(graph_data, output_path=None, workers=None, executor=None, partition=None, max_nodes=None,
+                   node_seconds=None):
+    """
+    Builds the .knwf archive and returns build stats
+    (node count, settings cache hits/misses/hit rate, generator timings, metanodes).
+    partition: None (flat), "containers", "regions" or "threshold" -> wrap tools into metanodes
+    of at most `max_nodes` tools each. Defaults come from config.
+    node_seconds: optional dict filled with settings render time per tool (profiling).
+    """
+    output_path = output_path or os.path.join(config.OUTPUT_DIR, "skeleton.knwf")
+    print(f"🏗️  Building Skeleton to {output_path}...")
+
+    stats = {}
+    with open(output_path, 'wb') as f:
+        for chunk in stream_skeleton(graph_data, stats, workers=workers, executor=executor,
+                                     partition=partition, max_nodes=max_nodes, node_seconds=node_seconds):
+            f.write(chunk)
+    return stats
+
+def stream_skeleton(graph_data, stats=None, workers=None, executor=None, partition=None, max_nodes=None,
+                    node_seconds=None):
+    """
+    Returns an iterator of the .knwf archive bytes, chunk by chunk (same bytes as build_skeleton).
+    Planning and settings rendering (everything that can fail) run before this
+    returns, so errors surface before a response is started; `stats` is filled
+    by then too. Only zipping is left to the iterator.
+    """
+    stats = {} if stats is None else stats
+    started = time.perf_counter()
+    partition = config.METANODE_PARTITION if partition is None else partition
+    max_nodes = max_nodes or config.METANODE_MAX_NODES
+
+    # --- 1. ASSIGN IDS & LAYOUT ---
+    groups, group_of, skipped = [], {}, set()
+    if partition:
+        groups, group_of, skipped = partition_graph(graph_data, partition, max_nodes)
+        print(f"   [Layout] 📦 Wrapping tools into {len(groups)} metanodes ({partition}, max {max_nodes}/level)")
+    node_plans, internal_conns, id_map = plan_nodes(graph_data, skip_ids=skipped)
+    external_conns = map_edges(graph_data['edges'], id_map)
+    if groups:
+        groups, group_of = drop_empty_groups(groups, group_of, node_plans)
+
+    # --- 2. ASSEMBLE WORKFLOW FILES ---
+    if groups:
+        workflow_files, prefixes = assemble_metanodes(node_plans, internal_conns, external_conns, groups, group_of)
+    else:
+        workflow_files, prefixes = assemble_flat(node_plans, internal_conns, external_conns)
+
+    # --- 3. GENERATE NODE SETTINGS (Parallel, cached) ---
+    entries, settings_stats = render_all_settings(node_plans, workers=workers, executor=executor,
+                                                  node_seconds=node_seconds)
+    if settings_stats['cache_hits']:
+        print(f"   [Cache] ♻️  Reused {settings_stats['cache_hits']}/{settings_stats['nodes']} node settings "
+              f"({settings_stats['cache_hit_rate']:.0%} hit rate)")
+    stats.update(settings_stats, metanodes=len(groups))
+    metrics.CACHE_LOOKUPS.labels("settings", "hit").inc(settings_stats['cache_hits'])
+    metrics.CACHE_LOOKUPS.labels("settings", "miss").inc(settings_stats['cache_misses'])
+    # Build work only: the time a client takes to read a streamed archive is not build latency
+    metrics.BUILD_SECONDS.observe(time.perf_counter() - started)
 
-    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as z:
-        root_dir = "Workflow"
-        z.writestr(f"{root_dir}/workflow.knime", workflow_content)
-        for path, content in zip_contents.items():
-            z.writestr(f"{root_dir}/{path}", content)
+    return zip_chunks(node_plans, entries, workflow_files, prefixes)
 
-    print("✅ Skeleton Build Complete.")
\ No newline at end of file
+def zip_chunks(node_plans, entries, workflow_files, prefixes):
+    """--- 4. ZIP --- the planned workflow files and pre-compressed settings, as archive chunks."""
+    root_dir = "Workflow"
+    writer = ZipWriter(ZIP_TIMESTAMP)
+    yield writer.add(f"{root_dir}/{workflow_files[0][0]}", workflow_files[0][1])
+    for plan, (_, compressed) in zip(node_plans, entries):
+        arcname = f"{root_dir}/{prefixes[plan['knime_id']]}{plan['folder_name']}/settings.xml"
+        yield writer.add_compressed(arcname, *compressed)
+    for arcname, content in workflow_files[1:]:
+        yield writer.add(f"{root_dir}/{arcname}", content)
+    yield writer.finish()
@@ -26,4 +26,111 @@ MODEL_NAME = "llama3.2"
 FORMULA_MODEL_NAME = "llama3.2"
 
 # DEBUG SETTINGS
-DEBUG_MODE = True
\ No newline at end of file
+DEBUG_MODE = True
+# BUILDER SETTINGS
+# Per-node settings.xml generation runs in a pool ("thread" or "process").
+# Set BUILDER_WORKERS = 1 to use the plain sequential path.
+# "process" is opt-in: its spawn start-up costs seconds per build (2.4s vs 0.2s
+# sequential for 600 tools), so it only pays off for very large workflows.
+BUILDER_WORKERS = min(8, os.cpu_count() or 1)
+BUILDER_EXECUTOR = "thread"
+
+# ORACLE "GOLD IMAGE" TEMPLATES
+ORACLE_TEMPLATE_DIR = os.path.join(BASE_DIR, 'src', 'templates', 'oracle')
+TEMPLATE_RECHECK_SECONDS = 2.0  # How often the template store re-stats the disk
+
+# SETTINGS CACHE (Incremental rebuilds after review edits)
+SETTINGS_CACHE_MAX_ENTRIES = 5000  # 0 disables the cache
+
+# METANODES (Large workflows)
+# None keeps a flat workflow; "containers", "regions" or "threshold" wraps tools
+# into metanodes so no workflow level holds more than METANODE_MAX_NODES tools.
+METANODE_PARTITION = None
+METANODE_MAX_NODES = 150
+
+# VISUALIZATION
+# "client": /visualize returns the layout as JSON and the browser draws an SVG.
+# "png": server-side matplotlib render (also available per request via ?mode=png).
+VISUALIZE_MODE = "client"
+
+# RENDER CACHE (PNG mode): identical graphs reuse one image, LRU-trimmed by size
+RENDER_CACHE_DIR = os.path.join(BASE_DIR, 'static', 'graphs')
+RENDER_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# LEVEL OF DETAIL (PNG mode)
+VIZ_LOD = "auto"               # "auto", "full", "compact" or "overview"
+VIZ_LABEL_MAX_NODES = 150      # Above this, labels and arrow heads are dropped
+VIZ_OVERVIEW_MIN_NODES = 1000  # Above this, tools are collapsed into aggregate regions
+VIZ_MAX_AGGREGATES = 400       # Upper bound on aggregate nodes in the overview
+VIZ_DPI = 300
+RENDER_WORKERS = 2             # Background processes drawing PNGs for /visualize
+
+# WEB SESSIONS
+# "sqlite": shared by all worker processes (e.g. gunicorn -w 4 app:app).
+# "memory": single process, in-memory LRU with disk spill.
+SESSION_BACKEND = "sqlite"
+SESSION_DB_FILE = os.path.join(BASE_DIR, 'sessions', 'sessions.db')
+SESSION_DIR = os.path.join(BASE_DIR, 'sessions')   # Cold sessions are spilled here
+SESSION_TTL_SECONDS = 6 * 60 * 60                  # Idle sessions expire after this
+SESSION_MAX_RESIDENT = 50                          # Sessions kept in memory (memory backend)
+SESSION_MAX_RESIDENT_BYTES = 256 * 1024 * 1024     # Memory budget for resident sessions
+
+# CONVERSION JOBS
+JOBS_DB_FILE = os.path.join(BASE_DIR, 'sessions', 'jobs.db')   # Job status + event log (shared by processes)
+CONVERSION_WORKERS = 4         # Conversion jobs running at once per server process
+JOB_STALE_SECONDS = 300        # A running job silent this long is presumed dead and re-queued
+JOB_POLL_SECONDS = 0.5         # How often an SSE tail re-checks the event log
+JOB_KEEPALIVE_SECONDS = 15     # SSE comment sent on quiet streams to keep proxies from closing them
+TRANSPILE_WORKERS = min(4, os.cpu_count() or 1)   # Processes running the Lark transpiler
+TRANSPILE_PROCESS_MIN_NODES = 8   # Fewer Formula tools than this are transpiled in-process
+AI_FALLBACK_WORKERS = 4           # Concurrent AI fallback requests per server process
+
+# UPLOADS
+UPLOAD_BLOB_DIR = os.path.join(INPUT_DIR, 'blobs')   # One file per distinct upload (sha256 name)
+UPLOAD_MAX_BYTES = 100 * 1024 * 1024                  # Per file
+UPLOAD_MAX_REQUEST_BYTES = 2 * 1024 * 1024 * 1024     # Whole request (batch uploads)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# EAGER PIPELINE
+EAGER_PIPELINE = True          # Start parse/render/convert in the background as soon as an upload lands
+PIPELINE_WORKERS = 4
+EAGER_WAIT_SECONDS = 30        # How long /visualize waits for a running pipeline before parsing itself
+PARSED_GRAPH_CACHE_SIZE = 16   # Parsed graphs kept per process, keyed by upload content hash
+
+# BATCH API
+BATCH_WORKERS = 4                              # Packages converted at once per batch request
+BATCH_MAX_FILE_BYTES = 1024 * 1024 * 1024      # Per uploaded file (a .zip may hold many packages)
+BATCH_MAX_MEMBERS = 500                        # Packages unpacked from the .zip uploads of one request
+BATCH_MAX_EXPANDED_BYTES = 4 * 1024 * 1024 * 1024   # Their total uncompressed size
+BATCH_MAX_COMPRESSION_RATIO = 100              # Per package; higher looks like a zip bomb
+
+# DOWNLOADS
+# "stream": /download generates the .knwf straight into the response (no file in OUTPUT_DIR).
+# "file": /build writes the archive to OUTPUT_DIR and /download sends it.
+DOWNLOAD_MODE = "stream"
+
+# REVIEW
+REVIEW_PAGE_SIZE = 50          # Tools per page of /api/review
+REVIEW_MAX_PAGE_SIZE = 500
+
+# DISK REAPER
+# Deletes uploads, built archives, extraction folders and rendered graphs that no
+# live session uses (files otherwise only go away when a user downloads).
+# Requires SESSION_BACKEND = "sqlite": with the memory backend each worker process
+# only sees its own sessions, so the background reaper is not started and
+# POST /sessions/reap only expires and evicts sessions (no orphan file sweep).
+REAPER_ENABLED = True
+REAPER_INTERVAL_SECONDS = 10 * 60
+REAPER_GRACE_SECONDS = 15 * 60                  # Files younger than this are never reaped
+REAPER_DISK_QUOTA_BYTES = 10 * 1024 * 1024 * 1024   # 0 = no quota; above it idle sessions are evicted, oldest first
+
+# WATCH MODE (python main.py --watch)
+WATCH_DB_FILE = os.path.join(OUTPUT_DIR, 'watch_state.db')   # Processed files, hashes and timings
+WATCH_INTERVAL_SECONDS = 5
+WATCH_SETTLE_SECONDS = 2       # A file must be unmodified this long before it is picked up (copy in progress)
+WATCH_WORKERS = 4
+
+# PROFILING (python main.py --profile, POST /profile/<session_id>)
+PROFILE_DIR = os.path.join(OUTPUT_DIR, 'profiles')   # JSON reports (+ .pstats / .tracemalloc dumps)
+PROFILE_TOP_FUNCTIONS = 30     # cProfile entries kept in the JSON report
+PROFILE_TOP_ALLOCATIONS = 20   # tracemalloc allocation sites kept in the JSON report
@@ -0,0 +1,390 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from src import config, mappings, formula_converter, metrics
+
+# Background conversion jobs. The conversion stage runs in a worker pool that is
+# independent of the HTTP connection; every progress message is appended to an
+# SQLite event log so any server process can tail it and a reconnecting client
+# can resume after the last event id it saw.
+
+ACTIVE = ("queued", "running")
+
+class JobStore:
+    """Jobs and their ordered event log in one SQLite file (WAL mode, shared across processes)."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False   # The file is created on first use, not at import
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._ensure_schema()
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                with conn:
+                    conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                                        id TEXT PRIMARY KEY,
+                                        session_id TEXT NOT NULL,
+                                        status TEXT NOT NULL,
+                                        progress INTEGER NOT NULL DEFAULT 0,
+                                        error TEXT,
+                                        created_at REAL NOT NULL,
+                                        updated_at REAL NOT NULL)""")
+                    conn.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, created_at)")
+                    conn.execute("""CREATE TABLE IF NOT EXISTS events (
+                                        job_id TEXT NOT NULL,
+                                        seq INTEGER NOT NULL,
+                                        data TEXT NOT NULL,
+                                        PRIMARY KEY (job_id, seq))""")
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def create(self, session_id):
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT INTO jobs (id, session_id, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                         (job_id, session_id, now, now))
+        return job_id
+
+    def claim(self, session_id, stale_seconds):
+        """
+        Returns (job id, created): the session's finished or live job, or a new
+        queued one. Check and insert share one write transaction, so concurrent
+        callers (in any process) agree on a single job.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE session_id = ? ORDER BY created_at DESC LIMIT 1",
+                               (session_id,)).fetchone()
+            now = time.time()
+            if row is not None:
+                stale = now - row['updated_at'] > stale_seconds
+                if row['status'] == "done" or (row['status'] in ACTIVE and not stale):
+                    conn.commit()
+                    return row['id'], False
+            job_id = str(uuid.uuid4())
+            conn.execute("INSERT INTO jobs (id, session_id, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                         (job_id, session_id, now, now))
+            conn.commit()
+            return job_id, True
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_for_session(self, session_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE session_id = ? ORDER BY created_at DESC LIMIT 1",
+                                   (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def set_status(self, job_id, status, error=None):
+        with self._conn() as conn:
+            conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                         (status, error, time.time(), job_id))
+
+    def append_event(self, job_id, event):
+        """Stores one event and returns its sequence number (1-based, per job)."""
+        with self._conn() as conn:
+            # One statement: the next seq is read under the write lock, so concurrent emitters never collide
+            seq = conn.execute("""INSERT INTO events (job_id, seq, data)
+                                  SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM events WHERE job_id = ?
+                                  RETURNING seq""", (job_id, json.dumps(event), job_id)).fetchone()[0]
+            conn.execute("UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                         (event.get('progress', 0), time.time(), job_id))
+        return seq
+
+    def events_after(self, job_id, last_seq):
+        rows = self._conn().execute("SELECT seq, data FROM events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                                    (job_id, last_seq)).fetchall()
+        return [(row['seq'], row['data']) for row in rows]
+
+    def count_active(self):
+        return self._conn().execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE).fetchone()[0]
+
+    def idle_sessions(self, before):
+        """Sessions whose jobs are all finished and untouched since `before` (epoch seconds)."""
+        rows = self._conn().execute("""SELECT session_id FROM jobs GROUP BY session_id
+                                       HAVING MAX(updated_at) < ? AND SUM(status IN (?, ?)) = 0""",
+                                    (before,) + ACTIVE).fetchall()
+        return [row['session_id'] for row in rows]
+
+    def delete_session(self, session_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM events WHERE job_id IN (SELECT id FROM jobs WHERE session_id = ?)", (session_id,))
+            conn.execute("DELETE FROM jobs WHERE session_id = ?", (session_id,))
+
+JOBS = JobStore(config.JOBS_DB_FILE)
+
+_pool = None
+_transpile_pool = None
+_fallback_pool = None
+_pool_lock = threading.Lock()
+_new_events = threading.Condition()   # Wakes tails in this process; other processes poll
+_listeners = []                       # Extra wake-up callbacks, e.g. the ASGI event loop
+_launcher = None                      # Runs new jobs; None = run_job on the conversion thread pool
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Threads: the stage is dominated by AI fallback calls (network I/O)
+            _pool = ThreadPoolExecutor(max_workers=config.CONVERSION_WORKERS, thread_name_prefix="convert")
+        return _pool
+
+def emit(job_id, event):
+    seq = JOBS.append_event(job_id, event)
+    with _new_events:
+        _new_events.notify_all()
+    for listener in _listeners:
+        listener(job_id)
+    return seq
+
+def add_listener(callback):
+    """callback(job_id) runs (on the emitting thread) after every new event."""
+    _listeners.append(callback)
+
+def set_launcher(launcher):
+    """launcher(job_id, session_id, sessions) starts new jobs, e.g. as coroutines (see asgi.py)."""
+    global _launcher
+    _launcher = launcher
+
+def sse_message(seq, data):
+    """One SSE frame for a tailed event; seq None means keep-alive."""
+    if seq is None:
+        return ": keep-alive\n\n"
+    return f"id: {seq}\ndata: {data}\n\n"
+
+def parse_last_event_id(value):
+    try:
+        return int(value or 0)
+    except ValueError:
+        return 0
+
+def get_transpile_pool():
+    global _transpile_pool
+    with _pool_lock:
+        if _transpile_pool is None:
+            # Lark parsing is CPU-bound: processes sidestep the GIL.
+            # spawn: forking a threaded web server can deadlock the child
+            _transpile_pool = ProcessPoolExecutor(max_workers=config.TRANSPILE_WORKERS,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+        return _transpile_pool
+
+def get_fallback_pool():
+    global _fallback_pool
+    with _pool_lock:
+        if _fallback_pool is None:
+            # AI fallback calls wait on the network: threads are enough
+            _fallback_pool = ThreadPoolExecutor(max_workers=config.AI_FALLBACK_WORKERS, thread_name_prefix="ai-fallback")
+        return _fallback_pool
+
+def reset_transpile_pool():
+    global _transpile_pool
+    with _pool_lock:
+        broken, _transpile_pool = _transpile_pool, None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+def timed_transpile(formulas):
+    """transpile_formulas plus its duration, measured where it runs (possibly a worker process)."""
+    started = time.perf_counter()
+    scripts, failures = formula_converter.transpile_formulas(formulas)
+    return scripts, failures, time.perf_counter() - started
+
+def timed_fallback(failures):
+    """resolve_failures plus its duration (per node, all of its rejected fields)."""
+    started = time.perf_counter()
+    return formula_converter.resolve_failures(failures), time.perf_counter() - started
+
+def submit_transpile(formulas):
+    try:
+        return get_transpile_pool().submit(timed_transpile, formulas)
+    except BrokenProcessPool:
+        reset_transpile_pool()
+        return get_transpile_pool().submit(timed_transpile, formulas)
+
+def split_formula_nodes(graph, report):
+    """Reports the non-formula tools (nothing to convert) and returns the formula tools."""
+    total = len(graph['nodes'])
+    formula_nodes, completed = [], 0
+    for node in graph['nodes']:
+        if "Formula" in node['type'] and 'formulas' in node['config']:
+            formula_nodes.append(node)
+            continue
+        completed += 1
+        knime_map = mappings.get_spec(node['type'])['name']
+        report(int((completed / total) * 100), f"INFO: Node {node['id']} ({node['type']}) → {knime_map}")
+    return formula_nodes
+
+def store_scripts(node, scripts, fallback):
+    """Writes a node's converted scripts (transpiled + AI fallback) in the original column order."""
+    order = formula_converter.group_by_field(node['config']['formulas'])
+    scripts = {**scripts, **fallback}
+    node['config']['reviewed_js'] = {field: scripts[field] for field in order}
+    # Fields the transpiler rejected (their scripts came from the AI fallback)
+    node['config']['ai_fallback_fields'] = [field for field in order if field in fallback]
+
+def merge_converted(latest, graph):
+    """
+    Copies the converted formula fields of `graph` (a job's copy) into the session's
+    latest graph, node by node; everything else written meanwhile is kept, and so
+    are scripts the user edited at /build (edited_fields).
+    """
+    if not latest.get('graph'):
+        latest['graph'] = graph
+        return
+    converted = {node['id']: node['config'] for node in graph['nodes'] if 'reviewed_js' in node['config']}
+    for node in latest['graph']['nodes']:
+        done = converted.get(node['id'])
+        if done is None:
+            continue
+        current = node['config'].get('reviewed_js', {})
+        edited = set(node['config'].get('edited_fields', []))
+        node['config']['reviewed_js'] = {field: current[field] if field in edited and field in current else script
+                                         for field, script in done['reviewed_js'].items()}
+        node['config']['ai_fallback_fields'] = list(done.get('ai_fallback_fields', []))
+
+def convert_graph(graph, report, node_seconds=None):
+    """
+    Translates the formulas of every Formula tool in place. report(progress, log)
+    receives progress as each node finishes, in completion order.
+    Transpiling runs in worker processes; fields the transpiler rejects go to the
+    AI fallback on a thread pool.
+    node_seconds: optional dict filled with {node id: {"transpile": s, "ai_fallback": s}} (profiling).
+    """
+    total = len(graph['nodes'])
+    report(0, '🚀 Initializing Conversion Engine...')
+    formula_nodes = split_formula_nodes(graph, report)
+    completed = total - len(formula_nodes)
+
+    use_processes = len(formula_nodes) >= config.TRANSPILE_PROCESS_MIN_NODES
+    pending = {}   # future -> (node, stage, transpiled scripts)
+    for node in formula_nodes:
+        formulas = node['config']['formulas']
+        if use_processes:
+            pending[submit_transpile(formulas)] = (node, "transpile", None)
+        else:
+            # A few Formula tools do not pay for the trip to a worker process
+            pending[get_fallback_pool().submit(timed_transpile, formulas)] = (node, "transpile", None)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            node, stage, scripts = pending.pop(future)
+            if stage == "transpile":
+                try:
+                    scripts, failures, seconds = future.result()
+                except BrokenProcessPool:
+                    # A worker died: transpile this node here instead
+                    reset_transpile_pool()
+                    scripts, failures, seconds = timed_transpile(node['config']['formulas'])
+                metrics.TRANSPILE_SECONDS.observe(seconds)
+                if node_seconds is not None:
+                    node_seconds[node['id']] = {"transpile": seconds}
+                if failures:
+                    report(int((completed / total) * 100), f"⚡ AI Generating Logic for Node {node['id']}...")
+                    pending[get_fallback_pool().submit(timed_fallback, failures)] = (node, "fallback", scripts)
+                    continue
+                fallback = {}
+            else:
+                fallback, seconds = future.result()
+                if node_seconds is not None:
+                    node_seconds[node['id']]["ai_fallback"] = seconds
+
+            store_scripts(node, scripts, fallback)
+            completed += 1
+            report(int((completed / total) * 100), f"✅ Node {node['id']}: Translated formulas.")
+
+def run_job(job_id, session_id, sessions):
+    """Worker task: converts the session's graph and saves it back to the session store."""
+    JOBS.set_status(job_id, "running")
+    try:
+        session = sessions.get(session_id)
+        if not session or not session.get('graph'):
+            raise RuntimeError("Session lost")
+
+        convert_graph(session['graph'], lambda progress, log: emit(job_id, {'progress': progress, 'log': log}))
+
+        # Atomic update of the converted fields only: anything written while converting survives
+        if sessions.update(session_id, lambda latest: merge_converted(latest, session['graph'])) is None:
+            raise RuntimeError("Session lost")
+
+        # Final event first: a tail that sees the job finished must find it in the log
+        emit(job_id, {'progress': 100, 'log': '✨ Analysis Complete.', 'done': True})
+        JOBS.set_status(job_id, "done")
+    except Exception as e:
+        print(f"❌ Conversion job {job_id} failed: {e}")
+        emit(job_id, {'progress': 100, 'log': f'❌ Conversion failed: {e}', 'done': True, 'failed': True})
+        JOBS.set_status(job_id, "failed", str(e))
+
+def start(session_id, sessions):
+    """
+    Returns the session's conversion job, queueing a new one unless one is still
+    active. Jobs with no progress for JOB_STALE_SECONDS (e.g. their server process
+    died) are replaced.
+    """
+    # The eager pipeline and the browser's stream both call this on every upload
+    job_id, created = JOBS.claim(session_id, config.JOB_STALE_SECONDS)
+    if not created:
+        return job_id
+    if _launcher is None:
+        get_pool().submit(run_job, job_id, session_id, sessions)
+    else:
+        _launcher(job_id, session_id, sessions)
+    return job_id
+
+def tail(job_id, last_seq=0):
+    """
+    Yields (seq, json data) for every event after last_seq until the job finishes.
+    Yields (None, None) as a keep-alive while waiting.
+    """
+    idle_since = time.time()
+    while True:
+        events = JOBS.events_after(job_id, last_seq)
+        for seq, data in events:
+            last_seq = seq
+            yield seq, data
+        if events:
+            idle_since = time.time()
+            continue
+
+        job = JOBS.get(job_id)
+        if job is None or job['status'] not in ACTIVE:
+            # Pick up anything written between the read above and the status check
+            for seq, data in JOBS.events_after(job_id, last_seq):
+                yield seq, data
+            return
+
+        with _new_events:
+            _new_events.wait(config.JOB_POLL_SECONDS)
+        if time.time() - idle_since >= config.JOB_KEEPALIVE_SECONDS:
+            idle_since = time.time()
+            yield None, None
@@ -3,15 +3,17 @@ import zipfile
 import os
 import shutil
 import glob
-from src import config
+import time
+from src import config, metrics
 
-def prepare_workflow_file(file_path):
+def prepare_workflow_file(file_path, extract_dir=None):
     """
     Prepares the workflow file for parsing.
     - If .yxzp: Unzips to temp folder and finds the main .yxmd/.yxwz.
     - If .yxmd or .yxwz: Returns the path directly.
+    Pass a per-job extract_dir when several conversions can run at once.
     """
-    temp_extract_dir = os.path.join(config.BASE_DIR, "temp_extract")
+    temp_extract_dir = extract_dir or os.path.join(config.BASE_DIR, "temp_extract")
     
     # Clear previous temp data
     if os.path.exists(temp_extract_dir):
@@ -26,7 +28,7 @@ def prepare_workflow_file(file_path):
     # 2. Archives (Zip/YXZP)
     print(f"📦 Unpacking Archive: {os.path.basename(file_path)}...")
     try:
-        with zipfile.ZipFile(file_path, 'r') as z:
+        with metrics.EXTRACT_SECONDS.time(), zipfile.ZipFile(file_path, 'r') as z:
             z.extractall(temp_extract_dir)
     except zipfile.BadZipFile:
         print(f"❌ Error: {file_path} is not a valid zip file.")
@@ -150,14 +152,22 @@ def get_node_config(tool_type, node_xml):
                 })
             data['select_fields'] = select_fields
 
+        # Tool Container (Used to group nodes into KNIME metanodes)
+        elif "ToolContainer" in tool_type:
+            data['caption'] = conf.findtext('Caption')
+
     return data
 
-def parse_workflow(workflow_path):
-    """Main parsing logic."""
+def parse_workflow(workflow_path, extract_dir=None, node_seconds=None):
+    """
+    Main parsing logic. extract_dir must match the one given to prepare_workflow_file.
+    node_seconds: optional dict filled with the time spent reading each tool's config (profiling).
+    """
     if not workflow_path:
         print("❌ No valid workflow file found.")
         return None
         
+    started = time.perf_counter()
     try:
         tree = ET.parse(workflow_path)
         root = tree.getroot()
@@ -168,6 +178,14 @@ def parse_workflow(workflow_path):
     nodes = []
     edges = []
 
+    # Map each tool to the Tool Container it sits in (direct parent only)
+    container_of = {}
+    for container in root.iter('Node'):
+        children = container.find('ChildNodes')
+        if children is not None:
+            for child in children.findall('Node'):
+                container_of[child.get('ToolID')] = container.get('ToolID')
+
     # Parse Nodes
     for node in root.findall('.//Node'):
         tool_id = node.get('ToolID')
@@ -178,13 +196,17 @@ def parse_workflow(workflow_path):
         tool_type = plugin.split('.')[-1] if "." in plugin else plugin
         if "Macro" in plugin: tool_type = "Macro"
 
+        node_started = time.perf_counter()
         config_data = get_node_config(tool_type, node)
+        if node_seconds is not None:
+            node_seconds[tool_id] = time.perf_counter() - node_started
 
         nodes.append({
             "id": tool_id,
             "type": tool_type,
             "x": config_data['x'],
             "y": config_data['y'],
+            "container": container_of.get(tool_id),
             "config": config_data
         })
 
@@ -203,8 +225,9 @@ def parse_workflow(workflow_path):
             })
 
     # Cleanup (Only if we created a temp dir for a zip)
-    temp_dir = os.path.join(config.BASE_DIR, "temp_extract")
+    temp_dir = extract_dir or os.path.join(config.BASE_DIR, "temp_extract")
     if os.path.exists(temp_dir) and config.INPUT_DIR not in workflow_path:
         shutil.rmtree(temp_dir)
 
+    metrics.PARSE_SECONDS.observe(time.perf_counter() - started)
     return {"nodes": nodes, "edges": edges}
\ No newline at end of file
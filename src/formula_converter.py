@@ -1,10 +1,11 @@
 import re
 import json
+import time
 import requests
 from collections import defaultdict
 from transpiler.engine import get_parser, AlteryxToAST
 from transpiler.codegen import KNIMECodeGenerator
-from src import config
+from src import config, metrics
 
 # --- 1. SYSTEMATIC COMPONENTS ---
 PARSER = get_parser()
@@ -17,10 +18,8 @@ def preprocess(formula: str) -> str:
     return formula
 
 # --- 2. AI FALLBACK COMPONENTS (Llama 3.2) ---
-def convert_with_ai_fallback(field, steps):
-    """
-    Fallback function: Sends difficult logic to Llama 3.2
-    """
+def ai_fallback_payload(field, steps):
+    """Ollama chat request for one target column."""
     system_prompt = r"""
     You are a KNIME JavaScript Compiler. 
     Task: Convert sequential Alteryx formulas into a SINGLE, STATEFUL KNIME script.
@@ -40,7 +39,7 @@ def convert_with_ai_fallback(field, steps):
     OUTPUT JSON: {{"script": "..."}}
     """
 
-    payload = {
+    return {
         "model": config.FORMULA_MODEL_NAME,
         "format": "json",
         "messages": [
@@ -51,68 +50,121 @@ def convert_with_ai_fallback(field, steps):
         "options": {"temperature": 0.0}
     }
 
+def ai_fallback_script(response_json):
+    """Extracts the script from an Ollama chat response and applies the safety net."""
+    data = json.loads(response_json['message']['content'])
+    script = data.get("script", "// AI Conversion Failed")
+    
+    # Apply Safety Net (Post-Processing)
+    return script.replace("isNull(", "isMissing(")
+
+def ai_fallback_error(e):
+    return f"// Critical Error: Both Transpiler and AI failed. {str(e)}"
+
+def convert_with_ai_fallback(field, steps):
+    """
+    Fallback function: Sends difficult logic to Llama 3.2
+    """
+    payload = ai_fallback_payload(field, steps)
+    started = time.perf_counter()
     try:
         if config.DEBUG_MODE: print(f"⚠️ [Fallback] Calling AI for {field}...")
         response = requests.post(config.OLLAMA_API_URL, json=payload, timeout=30)
         response.raise_for_status()
-        
-        # Extract script from JSON
-        data = json.loads(response.json()['message']['content'])
-        script = data.get("script", "// AI Conversion Failed")
-        
-        # Apply Safety Net (Post-Processing)
-        script = script.replace("isNull(", "isMissing(")
+        script = ai_fallback_script(response.json())
+        metrics.AI_FALLBACKS.labels("ok").inc()
         return script
 
     except Exception as e:
-        return f"// Critical Error: Both Transpiler and AI failed. {str(e)}"
+        metrics.AI_FALLBACKS.labels("error").inc()
+        return ai_fallback_error(e)
+    finally:
+        metrics.AI_FALLBACK_SECONDS.observe(time.perf_counter() - started)
 
-# --- 3. MAIN HYBRID CONVERTER ---
-def convert_formulas_bulk(formulas_list):
-    """
-    Deterministic Transpiler with Safe Initialization.
-    """
-    if not formulas_list: return {}
+async def convert_with_ai_fallback_async(field, steps, client):
+    """Coroutine version of convert_with_ai_fallback for the ASGI server (client: httpx.AsyncClient)."""
+    payload = ai_fallback_payload(field, steps)
+    started = time.perf_counter()
+    try:
+        if config.DEBUG_MODE: print(f"⚠️ [Fallback] Calling AI for {field}...")
+        response = await client.post(config.OLLAMA_API_URL, json=payload, timeout=30)
+        response.raise_for_status()
+        script = ai_fallback_script(response.json())
+        metrics.AI_FALLBACKS.labels("ok").inc()
+        return script
 
-    # 1. Group formulas by Target Column
+    except Exception as e:
+        metrics.AI_FALLBACKS.labels("error").inc()
+        return ai_fallback_error(e)
+    finally:
+        metrics.AI_FALLBACK_SECONDS.observe(time.perf_counter() - started)
+
+# --- 3. MAIN HYBRID CONVERTER ---
+def group_by_field(formulas_list):
+    """Group formulas by Target Column (document order kept)."""
     grouped_logic = defaultdict(list)
     for item in formulas_list:
         grouped_logic[item['field']].append(item['expression'])
+    return grouped_logic
 
-    final_results = {}
+def transpile_field(field, expressions):
+    """Deterministic Transpiler with Safe Initialization. Raises if the parser rejects a formula."""
+    script_lines = []
 
-    for field, expressions in grouped_logic.items():
-        try:
-            # --- ATTEMPT 1: SYSTEMATIC TRANSPILER ---
-            script_lines = []
-            
-            # --- SAFE INITIALIZATION BLOCK ---
-            # Try to read the column (in case we are updating it).
-            # If it fails (because it's a new column), catch the error and default to null.
-            script_lines.append(f'var val = null;')
-            script_lines.append(f'try {{ val = column("{field}"); }} catch(e) {{}}') 
-            
-            generator = KNIMECodeGenerator(target_column=field)
-            
-            for expr in expressions:
-                clean_expr = preprocess(expr)
-                tree = PARSER.parse(clean_expr)
-                ast = AlteryxToAST().transform(tree)
-                js_expression = generator.generate(ast)
-                
-                # Update the variable
-                script_lines.append(f'val = {js_expression};')
-            
-            # Final Return
-            script_lines.append('val;')
-            final_results[field] = "\n".join(script_lines)
+    # --- SAFE INITIALIZATION BLOCK ---
+    # Try to read the column (in case we are updating it).
+    # If it fails (because it's a new column), catch the error and default to null.
+    script_lines.append(f'var val = null;')
+    script_lines.append(f'try {{ val = column("{field}"); }} catch(e) {{}}')
+
+    generator = KNIMECodeGenerator(target_column=field)
 
+    for expr in expressions:
+        clean_expr = preprocess(expr)
+        tree = PARSER.parse(clean_expr)
+        ast = AlteryxToAST().transform(tree)
+        js_expression = generator.generate(ast)
+
+        # Update the variable
+        script_lines.append(f'val = {js_expression};')
+
+    # Final Return
+    script_lines.append('val;')
+    return "\n".join(script_lines)
+
+def transpile_formulas(formulas_list):
+    """
+    CPU-only half of the converter (safe to run in a worker process).
+    Returns (scripts, failures): failures maps field -> (expressions, error text)
+    for the fields that need the AI fallback.
+    """
+    scripts, failures = {}, {}
+    for field, expressions in group_by_field(formulas_list).items():
+        try:
+            scripts[field] = transpile_field(field, expressions)
         except Exception as e:
-            # --- ATTEMPT 2: AI FALLBACK ---
-            print(f"🔄 Transpiler failed on '{field}' ({e}). Switching to AI...")
-            final_results[field] = convert_with_ai_fallback(field, expressions)
+            failures[field] = (expressions, str(e))
+    return scripts, failures
+
+def resolve_failures(failures):
+    """I/O half of the converter: sends each failed field to the AI fallback."""
+    results = {}
+    for field, (expressions, error) in failures.items():
+        print(f"🔄 Transpiler failed on '{field}' ({error}). Switching to AI...")
+        results[field] = convert_with_ai_fallback(field, expressions)
+    return results
+
+def convert_formulas_bulk(formulas_list):
+    """
+    Deterministic Transpiler with AI fallback for the fields it cannot parse.
+    """
+    if not formulas_list: return {}
+
+    scripts, failures = transpile_formulas(formulas_list)
+    scripts.update(resolve_failures(failures))
 
-    return final_results
+    # Keep the column order of the original formulas
+    return {field: scripts[field] for field in group_by_field(formulas_list)}
 
 def convert_alteryx_formula(expr):
     res = convert_formulas_bulk([{'field': 'Result', 'expression': expr}])
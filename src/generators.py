@@ -0,0 +1,73 @@
+import threading
+from src import mappings
+
+class NodeGenerator:
+    """
+    Converts one Alteryx tool into one or more KNIME nodes.
+    Subclasses override node_specs() for multi-node tools and build_settings()
+    for the settings.xml of each created node ("part").
+    """
+    name = "Shell"
+
+    def node_specs(self, tool_type, node_config):
+        """KNIME nodes to create: list of {"spec", "offset_x", "offset_y"}. Empty list skips the tool."""
+        return [{"spec": mappings.get_spec(tool_type, node_config), "offset_x": 0, "offset_y": 0}]
+
+    def internal_connections(self, node_count):
+        """Wiring between created nodes: list of (source_part, dest_part, source_port, dest_port)."""
+        return [(i, i + 1, 1, 1) for i in range(node_count - 1)]
+
+    def output_part(self, node_count):
+        """Created node that Alteryx edges attach to (the last one by default)."""
+        return node_count - 1
+
+    def is_cacheable(self, part, spec):
+        """False when the output depends on more than (spec, node config)."""
+        return True
+
+    def build_settings(self, part, spec, node_config):
+        """Full settings.xml text for created node `part`."""
+        raise NotImplementedError(f"{type(self).__name__} must implement build_settings()")
+
+class GeneratorRegistry:
+    """
+    Maps Alteryx tool types to generators and records, per generator,
+    how many nodes it produced, how long it took and how much XML it wrote.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self._generators = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, tool_types, generator):
+        if isinstance(tool_types, str):
+            tool_types = [tool_types]
+        for tool_type in tool_types:
+            self._generators[tool_type] = generator
+        return generator
+
+    def get(self, tool_type):
+        return self._generators.get(tool_type, self.default)
+
+    def tool_types(self):
+        return sorted(self._generators)
+
+    def record(self, generator_name, seconds, output_bytes):
+        with self._lock:
+            entry = self._stats.setdefault(generator_name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["bytes"] += output_bytes
+
+    def stats(self):
+        """Cumulative timings, most expensive generator first."""
+        with self._lock:
+            rows = [dict(generator=name, **entry) for name, entry in self._stats.items()]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
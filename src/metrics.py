@@ -0,0 +1,194 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal Prometheus instrumentation (text exposition format 0.0.4), no extra
+# dependency. Hot paths only take a lock and bump a number; gauges backed by a
+# function are evaluated when /metrics is scraped.
+# Values are per process: with several server processes, scrape each one
+# (or sum them in Prometheus).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+def format_value(value):
+    if value != value:
+        return "NaN"
+    if value in (float('inf'), float('-inf')):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        """Child metric for one label combination (cached, so callers may keep it)."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics have a single child
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.samples(self.name, self.labelnames, values))
+        return lines
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labelnames, values):
+        return [f"{name}{format_labels(labelnames, values)} {format_value(self.value)}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self, name, labelnames, values):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                value = float('nan')
+        return [f"{name}{format_labels(labelnames, values)} {format_value(value)}"]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, function):
+        """Evaluates function() at scrape time instead of tracking the value on every change."""
+        self._default().set_function(function)
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = format_labels(labelnames, values, [("le", format_value(float(bound)))])
+            lines.append(f"{name}_bucket{le} {cumulative}")
+        labels = format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+REGISTRY = []
+
+def render():
+    """All metrics in Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- APPLICATION METRICS ---
+STAGE_SECONDS = Histogram(
+    "alternime_stage_seconds",
+    "Latency of pipeline stages (extract, parse, render, transpile, ai_fallback, build).",
+    ["stage"]
+)
+EXTRACT_SECONDS = STAGE_SECONDS.labels("extract")
+PARSE_SECONDS = STAGE_SECONDS.labels("parse")
+RENDER_SECONDS = STAGE_SECONDS.labels("render")
+TRANSPILE_SECONDS = STAGE_SECONDS.labels("transpile")
+AI_FALLBACK_SECONDS = STAGE_SECONDS.labels("ai_fallback")
+BUILD_SECONDS = STAGE_SECONDS.labels("build")
+
+AI_FALLBACKS = Counter("alternime_ai_fallback_total", "Formula fields sent to the AI fallback, by result.", ["result"])
+CACHE_LOOKUPS = Counter("alternime_cache_lookups_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"])
+
+ACTIVE_SESSIONS = Gauge("alternime_active_sessions", "Web sessions currently stored.")
+ACTIVE_JOBS = Gauge("alternime_active_jobs", "Conversion jobs queued or running.")
+PENDING_RENDERS = Gauge("alternime_pending_renders", "PNG renders queued or running in this process.")
+
+RECLAIMED_BYTES = Counter("alternime_reclaimed_bytes_total", "Disk space freed by the reaper, by kind of file.", ["kind"])
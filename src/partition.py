@@ -0,0 +1,130 @@
+from collections import defaultdict, deque
+
+# Partitioning of large workflows into KNIME metanodes.
+# Every strategy returns (groups, group_of, skipped):
+#   groups   -> list of metanode names
+#   group_of -> Alteryx tool id -> index into groups (missing = top level)
+#   skipped  -> Alteryx tool ids that should not become KNIME nodes
+
+MODES = ("containers", "regions", "threshold")
+
+def topological_order(graph_data):
+    """Kahn's algorithm, ties broken by document order. Cycles are appended as-is."""
+    order_index = {n['id']: i for i, n in enumerate(graph_data['nodes'])}
+    indegree = {node_id: 0 for node_id in order_index}
+    successors = defaultdict(list)
+    for edge in graph_data['edges']:
+        if edge['source'] in order_index and edge['target'] in order_index:
+            successors[edge['source']].append(edge['target'])
+            indegree[edge['target']] += 1
+
+    ready = deque(node_id for node_id in order_index if indegree[node_id] == 0)
+    order = []
+    while ready:
+        node_id = ready.popleft()
+        order.append(node_id)
+        for target in sorted(successors[node_id], key=order_index.get):
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                ready.append(target)
+
+    seen = set(order)
+    order.extend(node_id for node_id in order_index if node_id not in seen)
+    return order
+
+def connected_regions(graph_data):
+    """Weakly connected components, each listed in document order."""
+    parent = {n['id']: n['id'] for n in graph_data['nodes']}
+
+    def find(node_id):
+        while parent[node_id] != node_id:
+            parent[node_id] = parent[parent[node_id]]
+            node_id = parent[node_id]
+        return node_id
+
+    for edge in graph_data['edges']:
+        if edge['source'] in parent and edge['target'] in parent:
+            parent[find(edge['source'])] = find(edge['target'])
+
+    regions = {}
+    for node in graph_data['nodes']:
+        regions.setdefault(find(node['id']), []).append(node['id'])
+    return list(regions.values())
+
+def chunk(node_ids, max_nodes):
+    return [node_ids[i:i + max_nodes] for i in range(0, len(node_ids), max_nodes)]
+
+def by_containers(graph_data, max_nodes):
+    """One metanode per top-level Alteryx Tool Container (nested containers are flattened)."""
+    nodes = {n['id']: n for n in graph_data['nodes']}
+
+    def outermost(node_id):
+        container = nodes[node_id].get('container')
+        while container in nodes and nodes[container].get('container') in nodes:
+            container = nodes[container]['container']
+        return container if container in nodes else None
+
+    groups, group_of, skipped = [], {}, set()
+    group_index = {}
+    for node in graph_data['nodes']:
+        if node['type'] == "ToolContainer":
+            skipped.add(node['id'])
+            continue
+        container = outermost(node['id'])
+        if container is None:
+            continue
+        if container not in group_index:
+            caption = nodes[container]['config'].get('caption') or f"Container {container}"
+            group_index[container] = len(groups)
+            groups.append(caption)
+        group_of[node['id']] = group_index[container]
+
+    # Oversized containers are split further so no level exceeds max_nodes
+    return split_oversized(groups, group_of, skipped, graph_data, max_nodes)
+
+def by_regions(graph_data, max_nodes):
+    """One metanode per connected region (single tools stay top level)."""
+    groups, group_of = [], {}
+    for region in connected_regions(graph_data):
+        if len(region) < 2:
+            continue
+        for node_id in region:
+            group_of[node_id] = len(groups)
+        groups.append(f"Region {len(groups) + 1}")
+    return split_oversized(groups, group_of, set(), graph_data, max_nodes)
+
+def by_threshold(graph_data, max_nodes):
+    """Consecutive slices of the topological order, max_nodes tools each."""
+    groups, group_of = [], {}
+    for part in chunk(topological_order(graph_data), max_nodes):
+        for node_id in part:
+            group_of[node_id] = len(groups)
+        groups.append(f"Part {len(groups) + 1}")
+    return groups, group_of, set()
+
+def split_oversized(groups, group_of, skipped, graph_data, max_nodes):
+    members = defaultdict(list)
+    for node_id in topological_order(graph_data):
+        if node_id in group_of:
+            members[group_of[node_id]].append(node_id)
+
+    new_groups, new_group_of = [], {}
+    for index, name in enumerate(groups):
+        parts = chunk(members[index], max_nodes) if max_nodes else [members[index]]
+        for part_no, part in enumerate(parts):
+            for node_id in part:
+                new_group_of[node_id] = len(new_groups)
+            new_groups.append(name if len(parts) == 1 else f"{name} ({part_no + 1})")
+    return new_groups, new_group_of, skipped
+
+STRATEGIES = {
+    "containers": by_containers,
+    "regions": by_regions,
+    "threshold": by_threshold,
+}
+
+def partition_graph(graph_data, mode, max_nodes):
+    """Dispatches to a partition strategy. See module header for the return value."""
+    if mode not in STRATEGIES:
+        raise ValueError(f"Unknown partition mode '{mode}'. Use one of {', '.join(MODES)}.")
+    return STRATEGIES[mode](graph_data, max_nodes)
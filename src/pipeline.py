@@ -0,0 +1,103 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src import config, extractor, render_jobs, conversion_jobs, metrics
+
+# Eager pipeline: as soon as an upload lands, extraction, parsing, rendering and
+# formula conversion start in the background, so /visualize and the conversion
+# stream mostly find their results ready. Every step is idempotent; a request
+# that arrives first (or in another process) simply does the work itself.
+
+_pool = None
+_lock = threading.Lock()
+_running = {}            # session_id -> Future of run_pipeline (this process only)
+_parsed = OrderedDict()  # content hash -> parsed graph, most recently used last
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=config.PIPELINE_WORKERS, thread_name_prefix="pipeline")
+        return _pool
+
+def load_graph(session_id, session):
+    """Extracts and parses the session's upload. Identical uploads (same content hash) are parsed once."""
+    key = session.get('content_hash')
+    with _lock:
+        cached = _parsed.get(key) if key else None
+        if cached is not None:
+            metrics.CACHE_LOOKUPS.labels("parsed_graph", "hit").inc()
+            _parsed.move_to_end(key)
+            # Conversion writes into the graph, so every session gets its own copy
+            return copy.deepcopy(cached)
+
+    if key:
+        metrics.CACHE_LOOKUPS.labels("parsed_graph", "miss").inc()
+    extract_dir = os.path.join(config.BASE_DIR, "temp_extract", session_id)
+    workflow_file = extractor.prepare_workflow_file(session['filepath'], extract_dir)
+    graph = extractor.parse_workflow(workflow_file, extract_dir)
+
+    if graph is not None and key:
+        with _lock:
+            _parsed[key] = copy.deepcopy(graph)
+            while len(_parsed) > config.PARSED_GRAPH_CACHE_SIZE:
+                _parsed.popitem(last=False)
+    return graph
+
+def store_graph(sessions, session_id, graph):
+    """Saves a parsed graph unless another worker got there first. Returns the session's graph."""
+    def keep_first(session):
+        if not session.get('graph'):
+            session['graph'] = graph
+    session = sessions.update(session_id, keep_first)
+    return session['graph'] if session else None
+
+def run_pipeline(session_id, sessions):
+    """Worker task: parse -> (png mode) queue render -> queue conversion. Returns the graph."""
+    session = sessions.get(session_id)
+    if session is None:
+        return None
+    try:
+        graph = session.get('graph') or load_graph(session_id, session)
+        if graph is None:
+            print(f"❌ Eager pipeline: could not parse upload for session {session_id}")
+            return None
+        graph = store_graph(sessions, session_id, graph)
+        if graph is None:
+            return None
+        print(f"⚙️ Eager pipeline: parsed {len(graph['nodes'])} tools for session {session_id}")
+
+        if config.VISUALIZE_MODE == 'png':
+            lod = config.VIZ_LOD
+            key = render_jobs.submit(graph, lod)
+            sessions.update(session_id, lambda s: s.update(graph_hash=key, graph_lod=lod))
+
+        conversion_jobs.start(session_id, sessions)
+        return graph
+    except Exception as e:
+        print(f"⚠️ Eager pipeline failed for session {session_id}: {e}")
+        return None
+
+def kickoff(session_id, sessions):
+    future = get_pool().submit(run_pipeline, session_id, sessions)
+    with _lock:
+        _running[session_id] = future
+    future.add_done_callback(lambda f: _forget(session_id, f))
+
+def _forget(session_id, future):
+    with _lock:
+        if _running.get(session_id) is future:
+            del _running[session_id]
+
+def wait_for_graph(session_id, timeout):
+    """Waits for this process's pipeline to parse the session. None if no pipeline is running here."""
+    with _lock:
+        future = _running.get(session_id)
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=timeout)
+    except Exception:
+        return None
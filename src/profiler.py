@@ -0,0 +1,208 @@
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from src import config, extractor, conversion_jobs, builder, visualizer
+
+# Pipeline profiling for `python main.py --profile` and POST /profile/<session_id>.
+# A run records wall time per stage (extract, parse, convert, visualize, build) and
+# per tool (parse, transpile, ai_fallback, build), optionally a cProfile of the
+# calling thread and tracemalloc allocation sites, into one JSON report with
+# sorted keys, so reports from two versions diff cleanly:
+#     python -m src.profiler old.json new.json
+
+NODE_COLUMNS = ("parse", "transpile", "ai_fallback", "build")
+
+class Profile:
+    def __init__(self, name, cprofile=False, memory=False):
+        self.name = name
+        self.stages = {}
+        self.nodes = {}   # tool id -> {"type", "parse", "transpile", "ai_fallback", "build"}
+        self.memory = memory
+        self._cprofile = cProfile.Profile() if cprofile else None
+        self._started = None
+        self._snapshot = None
+        self._peak = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.memory:
+            tracemalloc.start(10)
+        if self._cprofile:
+            self._cprofile.enable()
+        return self
+
+    def stop(self):
+        if self._cprofile:
+            self._cprofile.disable()
+        self.total_seconds = time.perf_counter() - self._started
+        if self.memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name):
+        """Times one pipeline stage (and its peak traced memory when memory profiling is on)."""
+        if self.memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = {"seconds": round(time.perf_counter() - started, 6)}
+            if self.memory:
+                entry["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            self.stages[name] = entry
+
+    def add_nodes(self, graph):
+        for node in graph['nodes']:
+            self.nodes.setdefault(str(node['id']), {"type": node['type']})
+
+    def record(self, column, node_seconds):
+        """Merges {tool id: seconds} (or {tool id: {column: seconds}}) into the per-tool table."""
+        for tool_id, value in node_seconds.items():
+            row = self.nodes.setdefault(str(tool_id), {})
+            if isinstance(value, dict):
+                row.update((key, round(seconds, 6)) for key, seconds in value.items())
+            else:
+                row[column] = round(value, 6)
+
+    def report(self):
+        nodes = {}
+        for tool_id, row in self.nodes.items():
+            row = dict(row)
+            row["total"] = round(sum(row.get(column, 0.0) for column in NODE_COLUMNS), 6)
+            nodes[tool_id] = row
+        slowest = sorted(nodes, key=lambda tool_id: nodes[tool_id]["total"], reverse=True)[:10]
+
+        report = {
+            "name": self.name,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "builder_version": builder.BUILDER_VERSION,
+            "total_seconds": round(self.total_seconds, 6),
+            "stages": self.stages,
+            "tools": len(nodes),
+            "nodes": nodes,
+            "slowest_nodes": [dict(nodes[tool_id], id=tool_id) for tool_id in slowest]
+        }
+        if self._cprofile:
+            report["cprofile"] = {"scope": "calling thread (worker processes and pools show up as waits)",
+                                  "top": top_functions(self._cprofile)}
+        if self._snapshot:
+            report["memory"] = {"peak_bytes": self._peak, "top": top_allocations(self._snapshot)}
+        return report
+
+    def write(self, path):
+        """Writes the JSON report; the raw cProfile / tracemalloc data go next to it."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        report = self.report()
+        stem = os.path.splitext(path)[0]
+        if self._cprofile:
+            report["cprofile"]["file"] = f"{stem}.pstats"
+            self._cprofile.dump_stats(f"{stem}.pstats")
+        if self._snapshot:
+            report["memory"]["file"] = f"{stem}.tracemalloc"
+            self._snapshot.dump(f"{stem}.tracemalloc")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        return report
+
+def top_functions(profile):
+    stats = pstats.Stats(profile, stream=io.StringIO()).sort_stats("cumulative")
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        # Paths relative to the repo, so reports from different checkouts line up
+        if filename.startswith(config.BASE_DIR):
+            filename = os.path.relpath(filename, config.BASE_DIR)
+        rows.append({"function": f"{filename}:{line}({function})", "calls": calls,
+                     "own_seconds": round(own, 6), "cumulative_seconds": round(cumulative, 6)})
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:config.PROFILE_TOP_FUNCTIONS]
+
+def top_allocations(snapshot):
+    return [{"site": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+            for stat in snapshot.statistics("lineno")[:config.PROFILE_TOP_ALLOCATIONS]]
+
+def report_path(name):
+    stem = os.path.splitext(os.path.basename(name))[0] or "workflow"
+    return os.path.join(config.PROFILE_DIR, f"{stem}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+
+def run_pipeline(input_path, profile, extract_dir=None, output_path=None, structure_path=None, log=None):
+    """
+    extract -> parse -> convert formulas -> (visualize) -> build, each step timed into profile.
+    Writes the .knwf to output_path (or only measures the build when None). Returns the graph.
+    log: optional callable for step messages (main.py prints them).
+    """
+    log = log or (lambda message: None)
+    profile.start()
+    try:
+        log(f"1. Processing {os.path.basename(input_path)}...")
+        with profile.stage("extract"):
+            workflow_file = extractor.prepare_workflow_file(input_path, extract_dir)
+        if not workflow_file:
+            raise ValueError("No valid workflow XML file found")
+
+        parse_seconds = {}
+        with profile.stage("parse"):
+            graph = extractor.parse_workflow(workflow_file, extract_dir, node_seconds=parse_seconds)
+        if not graph:
+            raise ValueError("Could not parse the workflow graph")
+        profile.add_nodes(graph)
+        profile.record("parse", parse_seconds)
+
+        convert_seconds = {}
+        log("2. Converting Formulas...")
+        with profile.stage("convert"):
+            conversion_jobs.convert_graph(graph, lambda progress, log: None, node_seconds=convert_seconds)
+        profile.record("transpile", convert_seconds)
+
+        if structure_path:
+            log("3. Visualizing Structure...")
+            with profile.stage("visualize"):
+                visualizer.draw_exact_workflow(graph, structure_path)
+
+        build_seconds, build_stats = {}, {}
+        log("4. Generating KNIME Skeleton...")
+        with profile.stage("build"):
+            if output_path:
+                build_stats = builder.build_skeleton(graph, output_path=output_path, node_seconds=build_seconds)
+            else:
+                for _ in builder.stream_skeleton(graph, build_stats, node_seconds=build_seconds):
+                    pass
+        profile.record("build", build_seconds)
+        profile.stages["build"]["cache_hits"] = build_stats.get("cache_hits", 0)
+        return graph
+    finally:
+        profile.stop()
+
+def compare(old, new):
+    """Per-stage and total seconds of two reports: [(name, old, new, change %)]."""
+    rows = []
+    for stage in sorted(set(old["stages"]) | set(new["stages"])):
+        before = old["stages"].get(stage, {}).get("seconds")
+        after = new["stages"].get(stage, {}).get("seconds")
+        rows.append((stage, before, after))
+    rows.append(("total", old["total_seconds"], new["total_seconds"]))
+    return [(name, before, after, round((after - before) / before * 100, 1) if before and after is not None else None)
+            for name, before, after in rows]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m src.profiler OLD.json NEW.json")
+    with open(sys.argv[1], encoding='utf-8') as f:
+        old_report = json.load(f)
+    with open(sys.argv[2], encoding='utf-8') as f:
+        new_report = json.load(f)
+    print(f"{'stage':<12}{'old (s)':>12}{'new (s)':>12}{'change':>10}")
+    for name, before, after, change in compare(old_report, new_report):
+        fmt = lambda value: "-" if value is None else f"{value:.4f}"
+        print(f"{name:<12}{fmt(before):>12}{fmt(after):>12}{'' if change is None else f'{change:+.1f}%':>10}")
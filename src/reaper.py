@@ -0,0 +1,231 @@
+import os
+import re
+import shutil
+import threading
+import time
+from src import config, uploads, metrics, session_store
+from src.conversion_jobs import JOBS, ACTIVE
+
+# Disk reaper. A session's files (upload link, built archive, extraction folder)
+# are only deleted when the user downloads; abandoned sessions and unreferenced
+# upload blobs / rendered graphs are removed here, periodically:
+#   1. expire idle sessions in the session store (the store decides what is live),
+#   2. over REAPER_DISK_QUOTA_BYTES, evict the least recently used idle sessions,
+#   3. delete files that belong to no live session.
+# Anything younger than REAPER_GRACE_SECONDS is left alone, so uploads in flight
+# and sessions created by other processes since the store was read are safe.
+# Every step tolerates files vanishing underneath it (several processes may sweep).
+# Step 3 needs every live session, so it only runs with the shared SQLite store:
+# a memory store only knows this process's sessions, not other workers'.
+
+EXTRACT_DIR = os.path.join(config.BASE_DIR, "temp_extract")
+
+SESSION_ID = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+UPLOAD_FILE = re.compile(rf'^({SESSION_ID})_')
+OUTPUT_FILE = re.compile(rf'^workflow_({SESSION_ID})\.knwf$')
+EXTRACT_FOLDER = re.compile(rf'^({SESSION_ID})$')
+
+_thread = None
+_stop = threading.Event()
+last_report = None
+
+def age(stat, now):
+    # ctime changes when a hard link is added or removed, mtime when data is written
+    return now - max(stat.st_mtime, stat.st_ctime)
+
+def remove(path):
+    """Deletes a file or folder. Returns the bytes actually freed (0 for a link whose data is still used)."""
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            freed = 0
+            for root, _, files in os.walk(path):
+                for name in files:
+                    stat = os.lstat(os.path.join(root, name))
+                    freed += stat.st_size if stat.st_nlink == 1 else 0
+            shutil.rmtree(path, ignore_errors=True)
+            return freed
+        stat = os.lstat(path)
+        os.remove(path)
+        return stat.st_size if stat.st_nlink == 1 else 0
+    except FileNotFoundError:
+        return 0
+
+def disk_usage():
+    """Bytes used by uploads, outputs, extraction folders and rendered graphs (hard links counted once)."""
+    seen, total = set(), 0
+    for folder in (config.INPUT_DIR, config.OUTPUT_DIR, EXTRACT_DIR, config.RENDER_CACHE_DIR):
+        for root, _, files in os.walk(folder):
+            for name in files:
+                try:
+                    stat = os.lstat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                if (stat.st_dev, stat.st_ino) not in seen:
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+    return total
+
+def scan(folder, pattern=None, prefix=None):
+    """(entry, stat, session id or None) for the entries of folder matching pattern or prefix."""
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        match = pattern.match(entry.name) if pattern else None
+        if pattern and not match:
+            continue
+        if prefix and not entry.name.startswith(prefix):
+            continue
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        yield entry, stat, match.group(1) if match else None
+
+class Report:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.expired_sessions = 0
+        self.evicted_sessions = 0
+        self.files = 0
+        self.bytes = {}
+
+    def add(self, kind, freed):
+        self.files += 1
+        self.bytes[kind] = self.bytes.get(kind, 0) + freed
+        metrics.RECLAIMED_BYTES.labels(kind).inc(freed)
+
+    def as_dict(self, disk_bytes):
+        return {
+            "expired_sessions": self.expired_sessions,
+            "evicted_sessions": self.evicted_sessions,
+            "files_removed": self.files,
+            "reclaimed_bytes": sum(self.bytes.values()),
+            "reclaimed_by_kind": self.bytes,
+            "disk_bytes": disk_bytes,
+            "seconds": round(time.perf_counter() - self.started, 4),
+            "finished_at": time.time()
+        }
+
+def delete_session_files(session_id, session, report, output_path=None):
+    """Removes a session's upload link, archive and extraction folder; the blob too if nothing else uses it."""
+    if session and session.get('filepath'):
+        report.add("uploads", remove(session['filepath']))
+    output_path = output_path or os.path.join(config.OUTPUT_DIR, f"workflow_{session_id}.knwf")
+    if os.path.exists(output_path):
+        report.add("outputs", remove(output_path))
+    if os.path.exists(os.path.join(EXTRACT_DIR, session_id)):
+        report.add("extracts", remove(os.path.join(EXTRACT_DIR, session_id)))
+    if session and session.get('content_hash'):
+        blob = uploads.blob_path(session['content_hash'], session.get('filename'))
+        try:
+            if os.stat(blob).st_nlink == 1:
+                report.add("blobs", remove(blob))
+        except FileNotFoundError:
+            pass
+
+def evict_over_quota(sessions, report, now):
+    """Deletes idle sessions, least recently used first, until the managed folders fit the quota."""
+    usage = disk_usage()
+    if not config.REAPER_DISK_QUOTA_BYTES or usage <= config.REAPER_DISK_QUOTA_BYTES:
+        return usage
+    print(f"⚠️ Reaper: {usage / (1024 * 1024):.1f} MB on disk, quota is {config.REAPER_DISK_QUOTA_BYTES / (1024 * 1024):.1f} MB")
+
+    for session_id, last_access in sessions.idle_sessions():
+        if usage <= config.REAPER_DISK_QUOTA_BYTES or now - last_access < config.REAPER_GRACE_SECONDS:
+            break
+        job = JOBS.latest_for_session(session_id)
+        if job and job['status'] in ACTIVE:
+            continue
+        session = sessions.get(session_id)
+        sessions.delete(session_id)
+        JOBS.delete_session(session_id)
+        before = sum(report.bytes.values())
+        delete_session_files(session_id, session, report)
+        usage -= sum(report.bytes.values()) - before
+        report.evicted_sessions += 1
+    return usage
+
+def reap_orphans(live, report, now):
+    grace = config.REAPER_GRACE_SECONDS
+
+    def stale(stat):
+        return age(stat, now) >= grace
+
+    for entry, stat, session_id in scan(config.INPUT_DIR, UPLOAD_FILE):
+        if session_id not in live and stale(stat):
+            report.add("uploads", remove(entry.path))
+    for entry, stat, session_id in scan(config.OUTPUT_DIR, OUTPUT_FILE):
+        if session_id not in live and stale(stat):
+            report.add("outputs", remove(entry.path))
+    for entry, stat, session_id in scan(EXTRACT_DIR, EXTRACT_FOLDER):
+        if session_id not in live and stale(stat):
+            report.add("extracts", remove(entry.path))
+
+    # Blobs no session links to any more, and spools of uploads that never finished
+    for entry, stat, _ in scan(config.UPLOAD_BLOB_DIR):
+        if entry.name.startswith('.upload_') or stat.st_nlink == 1:
+            if stale(stat):
+                report.add("blobs", remove(entry.path))
+
+    # Rendered graphs are shared by identical workflows and touched on every use:
+    # one nobody has looked at for a whole session TTL is not shown anywhere
+    for entry, stat, _ in scan(config.RENDER_CACHE_DIR, prefix="viz_"):
+        if now - stat.st_mtime >= max(config.SESSION_TTL_SECONDS, grace):
+            report.add("graphs", remove(entry.path))
+    for entry, stat, _ in scan(config.RENDER_CACHE_DIR, prefix=".tmp_"):
+        if stale(stat):
+            report.add("graphs", remove(entry.path))
+
+    for session_id in JOBS.idle_sessions(now - grace):
+        if session_id not in live:
+            JOBS.delete_session(session_id)
+
+def shared_store(sessions):
+    return isinstance(sessions, session_store.SQLiteSessionStore)
+
+def sweep(sessions):
+    """One reaper pass. Returns a report of what was removed and the bytes reclaimed."""
+    global last_report
+    now = time.time()
+    report = Report()
+
+    report.expired_sessions = len(sessions.expire())
+    evict_over_quota(sessions, report, now)
+    if shared_store(sessions):
+        live = {session_id for session_id, _ in sessions.idle_sessions()}
+        reap_orphans(live, report, now)
+
+    last_report = report.as_dict(disk_usage())
+    if report.files or report.expired_sessions:
+        print(f"🧹 Reaper: reclaimed {last_report['reclaimed_bytes'] / (1024 * 1024):.2f} MB from {report.files} files "
+              f"({report.expired_sessions} expired, {report.evicted_sessions} evicted sessions)")
+    return last_report
+
+def start(sessions, interval=None):
+    """Runs sweep() every REAPER_INTERVAL_SECONDS on a daemon thread (once per process)."""
+    global _thread
+    if _thread is not None:
+        return _thread
+    if not shared_store(sessions):
+        print("⚠️ Reaper not started: it needs SESSION_BACKEND = \"sqlite\" (a memory store cannot see other workers' sessions)")
+        return None
+    interval = interval or config.REAPER_INTERVAL_SECONDS
+
+    def loop():
+        while not _stop.wait(interval):
+            try:
+                sweep(sessions)
+            except Exception as e:
+                print(f"⚠️ Reaper sweep failed: {e}")
+
+    _stop.clear()
+    _thread = threading.Thread(target=loop, name="reaper", daemon=True)
+    _thread.start()
+    return _thread
+
+def stop():
+    global _thread
+    _stop.set()
+    _thread = None
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from src import config
+
+# Bump when the PNG drawing code changes so stale images are not served
+RENDER_VERSION = "2"
+LOCK_STRIPES = 64   # Renders of the same graph serialise on one of these; the set never grows
+
+def graph_hash(graph_data, **render_options):
+    """Stable hash of what the picture shows: node ids, types, coordinates, edges (+ render options)."""
+    nodes = sorted((str(n['id']), n['type'], float(n['x']), float(n['y'])) for n in graph_data['nodes'])
+    edges = sorted((str(e['source']), str(e['target'])) for e in graph_data['edges'])
+    payload = json.dumps([RENDER_VERSION, nodes, edges, sorted(render_options.items())], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class RenderCache:
+    """
+    Rendered workflow images stored as viz_<hash>.png, bounded by total size.
+    LRU order is the file mtime (touched on every hit), so it also works
+    when several server processes share the directory.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.hits = 0
+        self.misses = 0
+
+    def filename(self, key):
+        return f"viz_{key[:32]}.png"
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, self.filename(key))
+
+    def _lock_for(self, key):
+        return self._locks[hash(key) % LOCK_STRIPES]
+
+    def get(self, key):
+        """Path of the cached image (and marks it recently used), or None."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def get_or_render(self, key, render_fn):
+        """
+        Returns (path, hit). On a miss, render_fn(tmp_path) draws the image,
+        which is then moved into place atomically and the cache trimmed.
+        """
+        with self._lock_for(key):
+            path = self.get(key)
+            if path:
+                self.hits += 1
+                return path, True
+
+            self.misses += 1
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = os.path.join(self.cache_dir, f".tmp_{uuid.uuid4().hex}.png")
+            try:
+                render_fn(tmp_path)
+                if not os.path.exists(tmp_path):
+                    return None, False
+                os.replace(tmp_path, self.path(key))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        self.evict(keep=self.path(key))
+        return self.path(key), False
+
+    def evict(self, keep=None):
+        """Deletes least recently used images until the cache fits in max_bytes. Returns bytes freed."""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith("viz_") and entry.name.endswith(".png") and entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        freed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            freed += size
+        return freed
+
+RENDER_CACHE = RenderCache(config.RENDER_CACHE_DIR, config.RENDER_CACHE_MAX_BYTES)
@@ -0,0 +1,110 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src import config, render_cache, metrics
+
+# Background PNG rendering. matplotlib runs in worker processes (it is neither
+# thread-safe nor GIL-friendly), and readiness is read from the render cache on
+# disk, so any server process can answer a status request.
+
+_pool = None
+_pool_lock = threading.Lock()
+_futures = {}   # graph key -> Future (this process only)
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded web server can deadlock the child
+            _pool = ProcessPoolExecutor(max_workers=config.RENDER_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        broken, _pool = _pool, None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+def render_into_cache(graph_data, key, lod):
+    """
+    Worker task: draws the graph into the shared render cache.
+    Returns (image path, render seconds or None if another worker had drawn it).
+    """
+    from src import visualizer
+    started = time.perf_counter()
+    path, hit = render_cache.RENDER_CACHE.get_or_render(
+        key, lambda tmp_path: visualizer.draw_exact_workflow(graph_data, tmp_path, lod=lod)
+    )
+    return path, None if hit else time.perf_counter() - started
+
+def submit(graph_data, lod):
+    """Queues a render unless the image is cached or already being drawn. Returns the graph key."""
+    key = render_cache.graph_hash(graph_data, lod=lod)
+    if render_cache.RENDER_CACHE.get(key):
+        metrics.CACHE_LOOKUPS.labels("render", "hit").inc()
+        return key
+    metrics.CACHE_LOOKUPS.labels("render", "miss").inc()
+    with _pool_lock:
+        future = _futures.get(key)
+        if future is not None and not future.done():
+            return key
+    try:
+        future = get_pool().submit(render_into_cache, graph_data, key, lod)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge graph): start a fresh pool once
+        reset_pool()
+        future = get_pool().submit(render_into_cache, graph_data, key, lod)
+    with _pool_lock:
+        _futures[key] = future
+    future.add_done_callback(lambda f: _forget(key, f))
+    return key
+
+def _drop(key, future):
+    with _pool_lock:
+        if _futures.get(key) is future:
+            del _futures[key]
+
+def _forget(key, future):
+    # Cancelled by reset_pool(): nothing to report, status() says "missing" and it is queued again
+    if future.cancelled():
+        _drop(key, future)
+        return
+    # Keep failures (and renders that produced no image) around until status()
+    # has reported them; successful images live in the cache
+    if future.exception() is None:
+        path, seconds = future.result()
+        if seconds is not None:
+            # Measured in the worker process, recorded here where /metrics can see it
+            metrics.RENDER_SECONDS.observe(seconds)
+        if path is not None:
+            _drop(key, future)
+
+def pending_count():
+    with _pool_lock:
+        return sum(1 for future in _futures.values() if not future.done())
+
+def status(key):
+    """
+    ("ready", path) | ("pending", None) | ("failed", error message) | ("missing", None).
+    "missing" means no render is known here (e.g. it was queued by another process).
+    """
+    path = render_cache.RENDER_CACHE.get(key)
+    if path:
+        return "ready", path
+    with _pool_lock:
+        future = _futures.get(key)
+    if future is None or future.cancelled():
+        return "missing", None
+    if not future.done():
+        return "pending", None
+    # A failure is reported once; asking again queues a new attempt
+    _drop(key, future)
+    error = future.exception()
+    if error is not None:
+        return "failed", str(error)
+    # Finished without an image (e.g. empty graph)
+    return "failed", "Nothing to render"
@@ -0,0 +1,51 @@
+from collections import Counter
+from src import mappings
+
+# Review data for /api/review: one entry per tool with its original and converted
+# formulas, filtered and sliced into pages so the review page only ever holds
+# the tools the user is looking at.
+
+def review_entry(node):
+    """Original vs converted formulas of one tool, as shown on the review page."""
+    formula_comparison = []
+    converted_dict = node['config'].get('reviewed_js', {})
+    if "Formula" in node['type'] and 'formulas' in node['config']:
+        for original_f in node['config']['formulas']:
+            col = original_f['field']
+            formula_comparison.append({
+                "column": col,
+                "original": original_f['expression'],
+                "converted": converted_dict.get(col, "// No conversion found")
+            })
+
+    return {
+        "id": node['id'],
+        "type": node['type'],
+        "knime_default": mappings.get_spec(node['type'])['name'],
+        "is_formula": "Formula" in node['type'],
+        "formulas": formula_comparison,
+        "ai_fallback_fields": node['config'].get('ai_fallback_fields', [])
+    }
+
+def filter_nodes(nodes, node_type=None, ai_fallback_only=False):
+    return [node for node in nodes
+            if (not node_type or node['type'] == node_type)
+            and (not ai_fallback_only or node['config'].get('ai_fallback_fields'))]
+
+def review_page(graph, page=1, per_page=50, node_type=None, ai_fallback_only=False):
+    """One page of review entries plus what the filter controls need (type counts, totals)."""
+    nodes = graph['nodes']
+    matches = filter_nodes(nodes, node_type, ai_fallback_only)
+    pages = max(1, -(-len(matches) // per_page))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * per_page
+
+    return {
+        "page": page,
+        "per_page": per_page,
+        "pages": pages,
+        "total": len(matches),
+        "nodes": [review_entry(node) for node in matches[start:start + per_page]],
+        "types": dict(sorted(Counter(node['type'] for node in nodes).items())),
+        "ai_fallback_nodes": sum(1 for node in nodes if node['config'].get('ai_fallback_fields'))
+    }
@@ -0,0 +1,306 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from src import config
+
+class BaseSessionStore:
+    """Dict-style access used by app.py; backends implement get/save/delete/expire/idle_sessions/metrics."""
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id):
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __setitem__(self, session_id, session):
+        self.save(session_id, session)
+
+    def __delitem__(self, session_id):
+        self.delete(session_id)
+
+    def update(self, session_id, mutate):
+        """
+        Atomic read-modify-write: calls mutate(session) and saves the result, so
+        concurrent writers (conversion jobs, the eager pipeline, requests) do not
+        overwrite each other's fields. Returns the session, or None if it is gone.
+        """
+        raise NotImplementedError
+
+class SessionStore(BaseSessionStore):
+    """
+    Dict-like store for web sessions with a TTL and a bounded resident set.
+    - Sessions idle for longer than `ttl_seconds` are dropped.
+    - When more than `max_resident` sessions or `max_resident_bytes` are in memory,
+      the least recently used ones are pickled to `spill_dir` and reloaded on access.
+    Callers that mutate a session should call save() so its size is re-measured.
+    Process-local: use SQLiteSessionStore when running several worker processes.
+    """
+
+    def __init__(self, spill_dir, ttl_seconds, max_resident, max_resident_bytes):
+        self.spill_dir = spill_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_resident = max_resident
+        self.max_resident_bytes = max_resident_bytes
+        self._resident = OrderedDict()   # session_id -> [session, size_bytes, last_access]
+        self._resident_bytes = 0
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.reloads = 0
+        self.expired = 0
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, session_id, default=None):
+        with self._lock:
+            entry = self._resident.get(session_id)
+            if entry is not None:
+                if self._is_stale(entry[2]):
+                    self.delete(session_id)
+                    self.expired += 1
+                    return default
+                entry[2] = time.time()
+                self._resident.move_to_end(session_id)
+                return entry[0]
+
+            session = self._load_spilled(session_id)
+            if session is None:
+                return default
+            self.reloads += 1
+            self._admit(session_id, session)
+            return session
+
+    def save(self, session_id, session):
+        """Inserts or re-measures a session and marks it most recently used."""
+        with self._lock:
+            old = self._resident.pop(session_id, None)
+            if old is not None:
+                self._resident_bytes -= old[1]
+            self._remove_spill(session_id)
+            self._admit(session_id, session)
+
+    def update(self, session_id, mutate):
+        with self._lock:
+            session = self.get(session_id)
+            if session is None:
+                return None
+            mutate(session)
+            self.save(session_id, session)
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            old = self._resident.pop(session_id, None)
+            if old is not None:
+                self._resident_bytes -= old[1]
+            self._remove_spill(session_id)
+
+    def expire(self):
+        """Drops every session idle longer than the TTL. Returns their ids."""
+        removed = []
+        with self._lock:
+            for session_id, entry in list(self._resident.items()):
+                if self._is_stale(entry[2]):
+                    self.delete(session_id)
+                    removed.append(session_id)
+            for name in os.listdir(self.spill_dir):
+                path = os.path.join(self.spill_dir, name)
+                if name.endswith(".pkl") and self._is_stale(os.path.getmtime(path)):
+                    self._remove_spill(name[:-4])
+                    removed.append(name[:-4])
+            self.expired += len(removed)
+        return removed
+
+    def idle_sessions(self):
+        """[(session_id, last_access)] of every stored session, least recently used first."""
+        with self._lock:
+            sessions = {session_id: entry[2] for session_id, entry in self._resident.items()}
+            for name in os.listdir(self.spill_dir):
+                if name.endswith(".pkl") and name[:-4] not in sessions:
+                    sessions[name[:-4]] = os.path.getmtime(os.path.join(self.spill_dir, name))
+        return sorted(sessions.items(), key=lambda item: item[1])
+
+    def metrics(self):
+        with self._lock:
+            spilled = [e for e in os.scandir(self.spill_dir) if e.name.endswith(".pkl")]
+            return {
+                "backend": "memory",
+                "resident_sessions": len(self._resident),
+                "resident_bytes": self._resident_bytes,
+                "spilled_sessions": len(spilled),
+                "spilled_bytes": sum(e.stat().st_size for e in spilled),
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "expired": self.expired
+            }
+
+    # --- internals ---
+    def _is_stale(self, last_access):
+        return self.ttl_seconds > 0 and time.time() - last_access > self.ttl_seconds
+
+    def _admit(self, session_id, session):
+        size = len(pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL))
+        self._resident[session_id] = [session, size, time.time()]
+        self._resident_bytes += size
+        self._spill_over_limit(keep=session_id)
+
+    def _spill_over_limit(self, keep):
+        while len(self._resident) > 1 and (
+            len(self._resident) > self.max_resident or self._resident_bytes > self.max_resident_bytes
+        ):
+            session_id = next(iter(self._resident))
+            if session_id == keep:
+                break
+            session, size, last_access = self._resident.pop(session_id)
+            self._resident_bytes -= size
+            self._write_spill(session_id, session, last_access)
+            self.evictions += 1
+
+    def _spill_path(self, session_id):
+        # Session ids are uuid4 strings; keep the filename safe regardless
+        safe_id = "".join(c for c in session_id if c.isalnum() or c == '-')
+        return os.path.join(self.spill_dir, f"{safe_id}.pkl")
+
+    def _write_spill(self, session_id, session, last_access):
+        path = self._spill_path(session_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(session, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        os.utime(path, (last_access, last_access))   # mtime carries the TTL clock
+
+    def _load_spilled(self, session_id):
+        path = self._spill_path(session_id)
+        try:
+            if self._is_stale(os.path.getmtime(path)):
+                self._remove_spill(session_id)
+                self.expired += 1
+                return None
+            with open(path, 'rb') as f:
+                session = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        self._remove_spill(session_id)
+        return session
+
+    def _remove_spill(self, session_id):
+        try:
+            os.remove(self._spill_path(session_id))
+        except OSError:
+            pass
+
+def encode_session(session):
+    """Compact serialized form: zlib-compressed JSON."""
+    return zlib.compress(json.dumps(session, separators=(',', ':')).encode('utf-8'), 6)
+
+def decode_session(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+class SQLiteSessionStore(BaseSessionStore):
+    """
+    Sessions shared by every worker process through one SQLite file (WAL mode).
+    Each get() returns a fresh copy, so callers must save() after mutating.
+    """
+
+    # Refreshing the TTL clock is a write; skip it if the row was touched recently
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, db_path, ttl_seconds):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                                id TEXT PRIMARY KEY,
+                                data BLOB NOT NULL,
+                                size INTEGER NOT NULL,
+                                updated_at REAL NOT NULL)""")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _cutoff(self):
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0
+
+    def get(self, session_id, default=None):
+        conn = self._conn()
+        row = conn.execute("SELECT data, updated_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return default
+        data, updated_at = row
+        if updated_at < self._cutoff():
+            self.delete(session_id)
+            return default
+        if time.time() - updated_at > self.TOUCH_INTERVAL:
+            with conn:
+                conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (time.time(), session_id))
+        return decode_session(data)
+
+    def save(self, session_id, session):
+        blob = encode_session(session)
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (id, data, size, updated_at) VALUES (?, ?, ?, ?)",
+                         (session_id, blob, len(blob), time.time()))
+
+    def update(self, session_id, mutate):
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, serialising updaters across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data, updated_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None or row[1] < self._cutoff():
+                conn.rollback()
+                return None
+            session = decode_session(row[0])
+            mutate(session)
+            blob = encode_session(session)
+            conn.execute("UPDATE sessions SET data = ?, size = ?, updated_at = ? WHERE id = ?",
+                         (blob, len(blob), time.time(), session_id))
+            conn.commit()
+            return session
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def delete(self, session_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def expire(self):
+        conn = self._conn()
+        cutoff = self._cutoff()
+        removed = [row[0] for row in conn.execute("SELECT id FROM sessions WHERE updated_at < ?", (cutoff,))]
+        if removed:
+            with conn:
+                conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+        return removed
+
+    def idle_sessions(self):
+        return self._conn().execute("SELECT id, updated_at FROM sessions WHERE updated_at >= ? ORDER BY updated_at",
+                                    (self._cutoff(),)).fetchall()
+
+    def metrics(self):
+        count, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        return {"backend": "sqlite", "stored_sessions": count, "stored_bytes": total}
+
+def create_store():
+    """Builds the session backend selected by config.SESSION_BACKEND ("sqlite" or "memory")."""
+    if config.SESSION_BACKEND == "memory":
+        return SessionStore(config.SESSION_DIR, config.SESSION_TTL_SECONDS,
+                            config.SESSION_MAX_RESIDENT, config.SESSION_MAX_RESIDENT_BYTES)
+    if config.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(config.SESSION_DB_FILE, config.SESSION_TTL_SECONDS)
+    raise ValueError(f"Unknown SESSION_BACKEND '{config.SESSION_BACKEND}' (use 'sqlite' or 'memory')")
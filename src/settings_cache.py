@@ -0,0 +1,62 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from src import config
+
+# Keys that only affect canvas layout, never the generated settings.xml
+LAYOUT_KEYS = ('x', 'y')
+
+def canonical_config(node_config):
+    """Stable JSON form of a node config (sorted keys, layout stripped)."""
+    cleaned = {k: v for k, v in node_config.items() if k not in LAYOUT_KEYS}
+    return json.dumps(cleaned, sort_keys=True, separators=(',', ':'), default=str)
+
+def settings_key(spec, node_config, builder_version):
+    """Content address for one node's settings: (spec, config, builder version)."""
+    payload = json.dumps([builder_version, spec], sort_keys=True) + canonical_config(node_config)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SettingsCache:
+    """
+    Bounded LRU of generated settings.xml text plus its deflated zip payload.
+    Shared by every build in the process, so a rebuild after review edits
+    only regenerates the nodes whose config actually changed.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> {"text": str, "compressed": (crc, bytes, size)}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, text, compressed=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {"text": text, "compressed": compressed}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+SETTINGS_CACHE = SettingsCache(config.SETTINGS_CACHE_MAX_ENTRIES)
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from src import config
+
+def normalize_alias(alias):
+    """Filename-safe, case-insensitive key for a DB alias (e.g. ' tmuprod ' -> 'TMUPROD')."""
+    safe_alias = "".join([c for c in alias if c.isalnum() or c in (' ', '_', '-')]).strip()
+    return safe_alias.upper()
+
+class TemplateStore:
+    """
+    In-memory index of "Gold Image" settings.xml templates.
+    - The directory is listed once and re-listed only when its mtime changes.
+    - File contents are cached and reloaded only when the file's mtime changes.
+    - Disk is re-checked at most every `recheck_seconds`, so repeat lookups are a dict hit.
+    """
+
+    def __init__(self, templates_dir, recheck_seconds=2.0):
+        self.templates_dir = templates_dir
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._index = {}        # normalized alias -> file path
+        self._contents = {}     # file path -> (mtime, text)
+        self._dir_mtime = None
+        self._last_check = 0.0
+
+    def _dir_stat(self):
+        try:
+            return os.stat(self.templates_dir).st_mtime
+        except OSError:
+            return None
+
+    def _reindex(self, dir_mtime):
+        index = {}
+        if dir_mtime is not None:
+            for filename in sorted(os.listdir(self.templates_dir)):
+                stem, ext = os.path.splitext(filename)
+                if ext.lower() == ".xml":
+                    index[normalize_alias(stem)] = os.path.join(self.templates_dir, filename)
+        self._index = index
+        self._contents = {p: c for p, c in self._contents.items() if p in index.values()}
+        self._dir_mtime = dir_mtime
+
+    def _revalidate(self):
+        """Picks up added/removed/edited templates. Caller holds the lock."""
+        now = time.monotonic()
+        if self._last_check and now - self._last_check < self.recheck_seconds:
+            return
+        self._last_check = now
+
+        dir_mtime = self._dir_stat()
+        if dir_mtime is None or dir_mtime != self._dir_mtime:
+            self._reindex(dir_mtime)
+
+        for path, (mtime, _) in list(self._contents.items()):
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    del self._contents[path]
+            except OSError:
+                del self._contents[path]
+
+    def get(self, alias):
+        """Returns the template text for `alias`, or None if there is no template."""
+        key = normalize_alias(alias)
+        with self._lock:
+            self._revalidate()
+            path = self._index.get(key)
+            if path is None:
+                return None
+
+            cached = self._contents.get(path)
+            if cached is not None:
+                return cached[1]
+
+            try:
+                mtime = os.stat(path).st_mtime
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except OSError:
+                return None
+            self._contents[path] = (mtime, text)
+            return text
+
+    def invalidate(self):
+        """Forces a full re-scan on the next lookup."""
+        with self._lock:
+            self._dir_mtime = None
+            self._last_check = 0.0
+            self._contents.clear()
+
+# Shared store used by the builder (one per process)
+ORACLE_TEMPLATES = TemplateStore(config.ORACLE_TEMPLATE_DIR, config.TEMPLATE_RECHECK_SECONDS)
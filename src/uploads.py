@@ -0,0 +1,95 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from src import config
+
+# Content-addressed upload storage. Multipart file parts are written straight to
+# disk while their sha256 is computed, so the hash is known the moment the upload
+# ends. Identical packages share one blob (UPLOAD_BLOB_DIR/<sha256><ext>); each
+# session gets its own hard link to it, so deleting a session's copy never
+# touches another session's file.
+
+class HashingSpool:
+    """Writable upload target: bytes go to a temp file next to the blobs, hashed as they arrive."""
+
+    def __init__(self, max_bytes):
+        os.makedirs(config.UPLOAD_BLOB_DIR, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=config.UPLOAD_BLOB_DIR, prefix='.upload_', delete=False)
+        self.path = self._file.name
+        self.max_bytes = max_bytes
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            # Stop as soon as the limit is crossed instead of after the whole body
+            self.discard()
+            raise RequestEntityTooLarge(f"File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit")
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read/seek/close/... go to the temp file
+        return getattr(self._file, name)
+
+class UploadRequest(Request):
+    """
+    Flask request class that spools every uploaded file through a HashingSpool.
+    A view may raise the per-file limit by setting max_file_bytes before reading request.files.
+    """
+    max_file_bytes = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpool(self.max_file_bytes or config.UPLOAD_MAX_BYTES)
+
+def link_or_copy(src, dst):
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Filesystems without hard links: fall back to a private copy
+        shutil.copyfile(src, dst)
+
+def blob_path(digest, filename):
+    """Where the blob for an upload with this content hash and original filename is stored."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    return os.path.join(config.UPLOAD_BLOB_DIR, digest + ext)
+
+def commit_upload(file_storage, dest_path):
+    """
+    Moves a spooled upload into the blob store and links it to dest_path.
+    Returns (sha256 hex digest, size in bytes, duplicate) where duplicate means an
+    identical blob was already stored.
+    """
+    spool = file_storage.stream
+    if not isinstance(spool, HashingSpool):
+        # Not parsed by UploadRequest (e.g. a test client stream): hash it here
+        spool = HashingSpool(config.UPLOAD_MAX_BYTES)
+        shutil.copyfileobj(file_storage.stream, spool, config.UPLOAD_CHUNK_BYTES)
+    spool.close()
+
+    digest = spool.sha256.hexdigest()
+    blob = blob_path(digest, file_storage.filename)
+
+    duplicate = os.path.exists(blob)
+    if duplicate:
+        try:
+            link_or_copy(blob, dest_path)
+            os.remove(spool.path)
+        except FileNotFoundError:
+            # The reaper removed the unreferenced blob in the meantime: store this copy
+            duplicate = False
+    if not duplicate:
+        os.replace(spool.path, blob)
+        link_or_copy(blob, dest_path)
+    return digest, spool.size, duplicate
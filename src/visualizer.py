@@ -3,21 +3,106 @@ import matplotlib
 matplotlib.use('Agg') 
 
 import json
+import math
 import networkx as nx
 import matplotlib.pyplot as plt
 import os
+from collections import Counter
+from src import config
 
-def draw_exact_workflow(graph_data, output_path):
-    """Draws the workflow using exact Alteryx coordinates."""
-    
-    # Safety Check
-    if not graph_data.get('nodes'):
-        print("⚠️  No nodes to visualize.")
-        return
+def node_color(n_type):
+    """Color Coding for easier visual debugging (shared by PNG and browser rendering)."""
+    if "Input" in n_type or "Reader" in n_type: 
+        return '#90EE90'   # Green
+    elif "Join" in n_type: 
+        return '#FFD700'   # Yellow/Gold
+    elif "Browse" in n_type or "Output" in n_type: 
+        return '#FFB6C1'   # Pink
+    elif "Formula" in n_type or "Filter" in n_type: 
+        return '#ADD8E6'   # Blue
+    return '#D3D3D3'       # Grey
+
+def build_layout(graph_data):
+    """
+    Compact node/edge layout for client-side rendering (no matplotlib involved).
+    nodes: [id, type, x, y, color] in Alteryx coordinates (y grows downwards, like SVG)
+    edges: [source_id, target_id]
+    bounds: [min_x, min_y, max_x, max_y]
+    """
+    nodes = [[n['id'], n['type'], n['x'], n['y'], node_color(n['type'])] for n in graph_data['nodes']]
+    edges = [[e['source'], e['target']] for e in graph_data['edges']]
+    xs = [n['x'] for n in graph_data['nodes']] or [0]
+    ys = [n['y'] for n in graph_data['nodes']] or [0]
+    return {"nodes": nodes, "edges": edges, "bounds": [min(xs), min(ys), max(xs), max(ys)]}
+
+LOD_LEVELS = ("auto", "full", "compact", "overview")
+
+def level_of_detail(node_count, lod=None):
+    """
+    How much to draw for a graph of `node_count` tools:
+    - "full": labelled boxes with arrow heads (the original look)
+    - "compact": smaller boxes, no labels, plain edge lines
+    - "overview": tools collapsed into aggregate region nodes
+    """
+    lod = lod or config.VIZ_LOD
+    if lod != "auto":
+        return lod
+    if node_count > config.VIZ_OVERVIEW_MIN_NODES:
+        return "overview"
+    if node_count > config.VIZ_LABEL_MAX_NODES:
+        return "compact"
+    return "full"
+
+def aggregate_regions(graph_data, max_cells=None):
+    """
+    Collapses tools into a coarse grid over the canvas. Each occupied cell becomes
+    one node (at the members' centroid, typed by its most common tool) carrying a
+    `count`; edges between cells are de-duplicated with a `count` as well.
+    """
+    max_cells = max_cells or config.VIZ_MAX_AGGREGATES
+    nodes = graph_data['nodes']
+    xs = [n['x'] for n in nodes]
+    ys = [n['y'] for n in nodes]
+    side = max(1, math.ceil(math.sqrt(max_cells)))
+    cell_w = (max(xs) - min(xs)) / side or 1.0
+    cell_h = (max(ys) - min(ys)) / side or 1.0
+
+    cell_of = {}
+    members = {}
+    for n in nodes:
+        cell = (min(side - 1, int((n['x'] - min(xs)) / cell_w)),
+                min(side - 1, int((n['y'] - min(ys)) / cell_h)))
+        cell_of[n['id']] = f"{cell[0]},{cell[1]}"
+        members.setdefault(cell_of[n['id']], []).append(n)
+
+    agg_nodes = []
+    for cell_id, group in members.items():
+        types = Counter(n['type'] for n in group)
+        agg_nodes.append({
+            "id": cell_id,
+            "type": types.most_common(1)[0][0],
+            "x": sum(n['x'] for n in group) / len(group),
+            "y": sum(n['y'] for n in group) / len(group),
+            "count": len(group)
+        })
+
+    edge_counts = Counter()
+    for e in graph_data['edges']:
+        src, tgt = cell_of.get(e['source']), cell_of.get(e['target'])
+        if src and tgt and src != tgt:
+            edge_counts[(src, tgt)] += 1
+    agg_edges = [{"source": s, "target": t, "count": c} for (s, t), c in edge_counts.items()]
+    return {"nodes": agg_nodes, "edges": agg_edges}
+
+def draw_graph(ax, graph_data, level, node_size=2500, label_size=8):
+    """Draws one level of detail onto `ax` (y-axis flipped to match Alteryx)."""
+    if level == "overview":
+        graph_data = aggregate_regions(graph_data)
 
     G = nx.DiGraph()
     pos = {}
     node_colors = []
+    node_sizes = []
     labels = {}
 
     # 1. Build Graph & Position Dictionary
@@ -32,44 +117,72 @@ def draw_exact_workflow(graph_data, output_path):
         # We must FLIP the Y-axis (-n['y']) so the graph isn't upside down.
         pos[n_id] = (n['x'], -n['y']) 
         
-        labels[n_id] = f"{n_id}\n{n_type}"
+        if level == "overview":
+            labels[n_id] = str(n['count'])
+            node_sizes.append(node_size * min(4.0, 0.5 + math.sqrt(n['count']) / 4))
+        else:
+            labels[n_id] = f"{n_id}\n{n_type}"
+            node_sizes.append(node_size)
         
         # Color Coding for easier visual debugging
-        if "Input" in n_type or "Reader" in n_type: 
-            col = '#90EE90'   # Green
-        elif "Join" in n_type: 
-            col = '#FFD700'   # Yellow/Gold
-        elif "Browse" in n_type or "Output" in n_type: 
-            col = '#FFB6C1'   # Pink
-        elif "Formula" in n_type or "Filter" in n_type: 
-            col = '#ADD8E6'   # Blue
-        else: 
-            col = '#D3D3D3'   # Grey
-        node_colors.append(col)
-
-    # 2. Add Edges
+        node_colors.append(node_color(n_type))
+
+    # 2. Add Edges (only between drawn nodes); widths follow the edge list they are drawn with
+    edge_widths = {}
     for e in graph_data['edges']:
-        G.add_edge(e['source'], e['target'])
+        if e['source'] in pos and e['target'] in pos:
+            G.add_edge(e['source'], e['target'])
+            edge_widths.setdefault((e['source'], e['target']), min(4.0, 0.5 + math.log1p(e.get('count', 1))))
+    edgelist = list(edge_widths)
 
-    # 3. Plot Configuration
-    plt.figure(figsize=(20, 12)) # Large canvas for clarity
-    
     # Draw Nodes (Square shape 's' mimics icons better)
-    nx.draw_networkx_nodes(G, pos, node_size=2500, node_color=node_colors, 
-                           edgecolors='black', node_shape='s', linewidths=1)
+    nx.draw_networkx_nodes(G, pos, ax=ax, node_size=node_sizes, node_color=node_colors, 
+                           edgecolors='black', node_shape='s',
+                           linewidths=1 if level == "full" else 0.3)
     
-    # Draw Labels
-    nx.draw_networkx_labels(G, pos, labels, font_size=8, font_weight="bold")
+    # Draw Labels (dropped in compact mode; counts only in overview)
+    if level != "compact":
+        nx.draw_networkx_labels(G, pos, labels, ax=ax, font_size=label_size, font_weight="bold")
     
-    # Draw Edges
-    nx.draw_networkx_edges(G, pos, arrowstyle='-|>', arrowsize=20, edge_color='gray', width=1.5)
+    # Draw Edges (arrow heads are individual patches, so only at full detail)
+    if level == "full":
+        nx.draw_networkx_edges(G, pos, ax=ax, arrowstyle='-|>', arrowsize=20,
+                               edge_color='gray', width=1.5)
+    else:
+        nx.draw_networkx_edges(G, pos, ax=ax, edgelist=edgelist, arrows=False, edge_color='gray',
+                               width=list(edge_widths.values()) or 0.5)
+
+def draw_exact_workflow(graph_data, output_path, lod=None):
+    """
+    Draws the workflow using exact Alteryx coordinates.
+    `lod` picks the level of detail ("auto", "full", "compact", "overview"), see level_of_detail().
+    """
+    
+    # Safety Check
+    if not graph_data.get('nodes'):
+        print("⚠️  No nodes to visualize.")
+        return
+
+    node_count = len(graph_data['nodes'])
+    level = level_of_detail(node_count, lod)
+
+    # 3. Plot Configuration
+    fig = plt.figure(figsize=(20, 12)) # Large canvas for clarity
+    ax = fig.gca()
+
+    # Shrink boxes as the canvas fills up so they don't merge into one blob
+    node_size = 2500 if level == "full" else max(20, 2500 * config.VIZ_LABEL_MAX_NODES / node_count)
+    draw_graph(ax, graph_data, level, node_size=node_size)
 
-    plt.title("Alteryx Workflow Structure (Exact Layout)", fontsize=16)
+    title = "Alteryx Workflow Structure (Exact Layout)"
+    if level != "full":
+        title += f" - {node_count} tools, {level} view"
+    plt.title(title, fontsize=16)
     plt.axis('off')
     
     # Ensure directory exists before saving
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close() # Close memory to prevent leaks
-    print(f"🖼️  Graph saved to {output_path}")
\ No newline at end of file
+    plt.savefig(output_path, dpi=config.VIZ_DPI, bbox_inches='tight')
+    plt.close(fig) # Close memory to prevent leaks
+    print(f"🖼️  Graph saved to {output_path}")
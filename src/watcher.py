@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import shutil
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src import config, batch, reaper, uploads
+
+# Watch mode (python main.py --watch): polls INPUT_DIR and converts new or changed
+# Alteryx files to OUTPUT_DIR/<name with extension>.knwf on a worker pool, with the same chain
+# as the batch API. A small SQLite database remembers every file seen (stat,
+# content hash, outcome, timings), so restarts pick up where they left off and a
+# file whose content was already converted is not converted again.
+
+class WatchState:
+    """Processed files in one SQLite file: one row per input path."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                                path TEXT PRIMARY KEY,
+                                size INTEGER NOT NULL,
+                                mtime_ns INTEGER NOT NULL,
+                                content_hash TEXT,
+                                status TEXT NOT NULL,
+                                output TEXT,
+                                output_hash TEXT,
+                                error TEXT,
+                                seconds REAL,
+                                timings TEXT,
+                                updated_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS files_hash ON files (content_hash, status)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+            if "output_hash" not in columns:
+                # State files from before archives were fingerprinted: their rows are never reused
+                conn.execute("ALTER TABLE files ADD COLUMN output_hash TEXT")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, path):
+        row = self._conn().execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def converted(self, content_hash, path=None):
+        """
+        A file with this content whose archive is still the one it wrote (path's own
+        row first), or None. Archives overwritten or deleted since are not reused.
+        """
+        rows = self._conn().execute("""SELECT * FROM files WHERE content_hash = ? AND status IN ('ok', 'duplicate')
+                                       ORDER BY path = ? DESC, status = 'ok' DESC""", (content_hash, path)).fetchall()
+        for row in rows:
+            if row['output'] and row['output_hash'] and os.path.exists(row['output']):
+                if file_hash(row['output']) == row['output_hash']:
+                    return dict(row)
+        return None
+
+    def record(self, path, stat, status, content_hash=None, output=None, error=None, seconds=None, timings=None,
+               output_hash=None):
+        with self._conn() as conn:
+            conn.execute("""INSERT OR REPLACE INTO files
+                                (path, size, mtime_ns, content_hash, status, output, output_hash, error, seconds,
+                                 timings, updated_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                         (path, stat.st_size, stat.st_mtime_ns, content_hash, status, output, output_hash, error,
+                          seconds, json.dumps(timings) if timings else None, time.time()))
+
+    def summary(self):
+        rows = self._conn().execute("SELECT status, COUNT(*), COALESCE(SUM(seconds), 0) FROM files GROUP BY status")
+        return {status: {"files": count, "seconds": round(seconds, 3)} for status, count, seconds in rows}
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(config.UPLOAD_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def candidates(input_dir):
+    """(path, stat) of the Alteryx files directly in input_dir, skipping web app uploads."""
+    for entry in os.scandir(input_dir):
+        if not entry.is_file() or not entry.name.lower().endswith(batch.WORKFLOW_EXTENSIONS):
+            continue
+        if reaper.UPLOAD_FILE.match(entry.name):
+            continue   # <session id>_name: owned by a web session
+        yield entry.path, entry.stat()
+
+def write_output(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _interrupt():
+    raise KeyboardInterrupt
+
+class Watcher:
+    def __init__(self, input_dir=None, output_dir=None, state=None, workers=None):
+        self.input_dir = input_dir or config.INPUT_DIR
+        self.output_dir = output_dir or config.OUTPUT_DIR
+        self.state = state or WatchState(config.WATCH_DB_FILE)
+        self.pool = ThreadPoolExecutor(max_workers=workers or config.WATCH_WORKERS, thread_name_prefix="watch")
+        self._in_flight = set()
+        self._converting = {}   # content hash -> Event set when its conversion ends
+        self._lock = threading.Lock()
+
+    def scan(self):
+        """Queues every new or changed file that has finished copying. Returns how many were queued."""
+        queued, now = 0, time.time()
+        for path, stat in candidates(self.input_dir):
+            known = self.state.get(path)
+            if known and (known['size'], known['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            if now - stat.st_mtime < config.WATCH_SETTLE_SECONDS:
+                continue   # Probably still being written; look again next scan
+            with self._lock:
+                if path in self._in_flight:
+                    continue
+                self._in_flight.add(path)
+            self.pool.submit(self.process, path, stat)
+            queued += 1
+        return queued
+
+    def process(self, path, stat):
+        name = os.path.basename(path)
+        # a.yxmd and a.yxzp must not share (and overwrite) one archive
+        output = os.path.join(self.output_dir, f"{name}.knwf")
+        claimed = None
+        try:
+            content_hash = file_hash(path)
+            while True:
+                previous = self.state.converted(content_hash, path)
+                if previous:
+                    self.reuse(path, stat, content_hash, previous, output)
+                    return
+                # Identical files dropped together: one converts, the others wait for its result
+                with self._lock:
+                    running = self._converting.get(content_hash)
+                    if running is None:
+                        claimed = self._converting[content_hash] = threading.Event()
+                        break
+                running.wait()
+
+            work_dir = os.path.join(config.BASE_DIR, "temp_extract", f"watch_{uuid.uuid4().hex}")
+            try:
+                report, archive = batch.convert_file(name, path, work_dir, 0)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            seconds = report['timings']['total_seconds']
+            if archive is None:
+                self.state.record(path, stat, "failed", content_hash, error=report.get('error'),
+                                  seconds=seconds, timings=report['timings'])
+                return
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            write_output(output, archive)
+            self.state.record(path, stat, "ok", content_hash, output=output, seconds=seconds, timings=report['timings'],
+                              output_hash=hashlib.sha256(archive).hexdigest())
+            print(f"✅ {name} → {os.path.basename(output)} ({report['tools']} tools, {seconds:.2f}s)")
+        except Exception as e:
+            print(f"❌ Watch: {name} failed: {e}")
+            self.state.record(path, stat, "failed", error=str(e))
+        finally:
+            if claimed is not None:
+                with self._lock:
+                    del self._converting[content_hash]
+                claimed.set()
+            with self._lock:
+                self._in_flight.discard(path)
+
+    def reuse(self, path, stat, content_hash, previous, output):
+        """Same content as a converted file: give this file the existing archive instead of converting."""
+        if previous['path'] == path:
+            # Touched but unchanged
+            self.state.record(path, stat, previous['status'], content_hash, output=previous['output'],
+                              seconds=previous['seconds'], timings=json.loads(previous['timings'] or 'null'),
+                              output_hash=previous['output_hash'])
+            return
+        if previous['output'] != output:
+            uploads.link_or_copy(previous['output'], output)
+        self.state.record(path, stat, "duplicate", content_hash, output=output, seconds=0,
+                          output_hash=previous['output_hash'])
+        print(f"♻️ {os.path.basename(path)}: same content as {os.path.basename(previous['path'])}, reused its archive")
+
+    def idle(self):
+        with self._lock:
+            return not self._in_flight
+
+    def run(self, interval=None, once=False):
+        """Scans every `interval` seconds until interrupted (or, with once=True, drains one scan)."""
+        interval = interval or config.WATCH_INTERVAL_SECONDS
+        os.makedirs(self.input_dir, exist_ok=True)
+        # Stop as on Ctrl+C when run as a service (SIGTERM)
+        signal.signal(signal.SIGTERM, lambda signum, frame: _interrupt())
+        print(f"👀 Watching {self.input_dir} every {interval}s → {self.output_dir}")
+        try:
+            while True:
+                self.scan()
+                if once:
+                    self.pool.shutdown(wait=True)
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("🛑 Stopping watcher, waiting for running conversions...")
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        print(f"📊 Watch state: {self.state.summary()}")
@@ -0,0 +1,73 @@
+import struct
+import zlib
+
+# Minimal ZIP writer for .knwf archives.
+# Unlike zipfile, it accepts entries that were deflated ahead of time, so the
+# builder can reuse cached compressed bytes and emit the archive chunk by chunk.
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+
+DEFLATED = 8                         # Same as zipfile.ZIP_DEFLATED
+VERSION = 20                         # 2.0: deflate
+CREATE_VERSION = (3 << 8) | VERSION  # made by: Unix
+UTF8_FLAG = 0x800
+EXTERNAL_ATTR = 0o600 << 16
+
+def compress_entry(content):
+    """Deflates text/bytes. Returns (crc32, compressed_bytes, uncompressed_size)."""
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return zlib.crc32(data), compressed, len(data)
+
+def dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | (second // 2)
+    return dos_time, dos_date
+
+class ZipWriter:
+    """
+    Builds a deflated ZIP archive as a sequence of byte chunks.
+    add()/add_compressed() return the bytes for one entry; finish() returns
+    the central directory. Callers write or stream the chunks in order.
+    """
+
+    def __init__(self, date_time):
+        self.dos_time, self.dos_date = dos_datetime(date_time)
+        self.offset = 0
+        self.entries = []
+
+    def add(self, arcname, content):
+        return self.add_compressed(arcname, *compress_entry(content))
+
+    def add_compressed(self, arcname, crc, compressed, size):
+        name = arcname.encode('utf-8')
+        flags = 0 if arcname.isascii() else UTF8_FLAG
+        header = LOCAL_HEADER.pack(
+            0x04034b50, VERSION, flags, DEFLATED, self.dos_time, self.dos_date,
+            crc, len(compressed), size, len(name), 0
+        )
+        self.entries.append((name, flags, crc, len(compressed), size, self.offset))
+        chunk = header + name + compressed
+        self.offset += len(chunk)
+        return chunk
+
+    def finish(self):
+        central = []
+        for name, flags, crc, compressed_size, size, offset in self.entries:
+            central.append(CENTRAL_HEADER.pack(
+                0x02014b50, CREATE_VERSION, VERSION, flags, DEFLATED,
+                self.dos_time, self.dos_date, crc, compressed_size, size,
+                len(name), 0, 0, 0, 0, EXTERNAL_ATTR, offset
+            ) + name)
+        directory = b"".join(central)
+        end = END_RECORD.pack(
+            0x06054b50, 0, 0, len(self.entries), len(self.entries),
+            len(directory), self.offset, 0
+        )
+        self.offset += len(directory) + len(end)
+        return directory + end
+
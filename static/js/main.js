@@ -23,7 +23,7 @@ async function handleUpload(input) {
             transitionTo('viz');
             loadVisualization();
         } else {
-            alert('Upload failed');
+            alert(data.error ? `Upload failed: ${data.error}` : 'Upload failed');
             box.innerHTML = originalContent;
         }
     } catch (e) {
@@ -42,7 +42,14 @@ async function loadVisualization() {
         const res = await fetch(`/visualize/${sessionID}`);
         const data = await res.json();
         
-        img.src = data.image_url;
+        if (data.layout) {
+            // Client mode: draw the layout ourselves (zoom + pan)
+            renderLayout(data.layout);
+            document.getElementById('graph-badge').innerText = 'scroll to zoom · drag to pan';
+        } else {
+            // PNG mode: the image is drawn in the background, poll until it's ready
+            showImageWhenReady(data);
+        }
         nodeCount.innerText = `${data.node_count} Nodes Detected`;
         
         // Enable Next Button
@@ -52,6 +59,122 @@ async function loadVisualization() {
     }
 }
 
+async function showImageWhenReady(data) {
+    const img = document.getElementById('graph-img');
+    const badge = document.getElementById('graph-badge');
+    while (data.image_status === 'pending' || data.image_status === 'missing') {
+        badge.innerText = 'rendering graph...';
+        await new Promise(resolve => setTimeout(resolve, 500));
+        const res = await fetch(data.status_url || `/visualize/${sessionID}/status`);
+        data = { ...data, ...(await res.json()) };
+    }
+    if (data.image_status === 'ready') {
+        img.src = data.image_url;
+        img.classList.remove('hidden');
+        badge.innerText = 'generated by networkx';
+    } else {
+        badge.innerText = 'graph rendering failed';
+    }
+}
+
+// --- CLIENT-SIDE GRAPH RENDERING ---
+const SVG_NS = 'http://www.w3.org/2000/svg';
+const NODE_SIZE = 40;
+
+function svgEl(tag, attrs) {
+    const el = document.createElementNS(SVG_NS, tag);
+    for (const [key, value] of Object.entries(attrs || {})) el.setAttribute(key, value);
+    return el;
+}
+
+function renderLayout(layout) {
+    const svg = document.getElementById('graph-svg');
+    svg.innerHTML = '';
+    svg.classList.remove('hidden');
+
+    // Arrow head for edges
+    const defs = svgEl('defs');
+    const marker = svgEl('marker', { id: 'arrow', viewBox: '0 0 10 10', refX: 10, refY: 5,
+                                     markerWidth: 6, markerHeight: 6, orient: 'auto-start-reverse' });
+    marker.appendChild(svgEl('path', { d: 'M 0 0 L 10 5 L 0 10 z', fill: 'gray' }));
+    defs.appendChild(marker);
+
+    const half = NODE_SIZE / 2;
+    const centers = {};
+    layout.nodes.forEach(([id, , x, y]) => { centers[id] = [x + half, y + half]; });
+
+    // Edges first so nodes sit on top; stop short of the target box
+    const edges = svgEl('g', { stroke: 'gray', 'stroke-width': 1.5 });
+    layout.edges.forEach(([source, target]) => {
+        const a = centers[source], b = centers[target];
+        if (!a || !b) return;
+        const dx = b[0] - a[0], dy = b[1] - a[1];
+        const dist = Math.hypot(dx, dy) || 1;
+        const trim = Math.min(half * 1.2, dist / 2);
+        edges.appendChild(svgEl('line', { x1: a[0], y1: a[1],
+                                          x2: b[0] - dx / dist * trim, y2: b[1] - dy / dist * trim,
+                                          'marker-end': 'url(#arrow)' }));
+    });
+
+    const nodes = svgEl('g', { 'font-family': 'sans-serif', 'text-anchor': 'middle' });
+    layout.nodes.forEach(([id, type, x, y, color]) => {
+        const g = svgEl('g');
+        const title = svgEl('title');
+        title.textContent = `${id} · ${type}`;
+        g.appendChild(title);
+        g.appendChild(svgEl('rect', { x, y, width: NODE_SIZE, height: NODE_SIZE, fill: color, stroke: 'black' }));
+        const idLabel = svgEl('text', { x: x + half, y: y + half + 4, 'font-size': 11, 'font-weight': 'bold' });
+        idLabel.textContent = id;
+        const typeLabel = svgEl('text', { x: x + half, y: y + NODE_SIZE + 11, 'font-size': 8, fill: '#334155' });
+        typeLabel.textContent = type;
+        g.append(idLabel, typeLabel);
+        nodes.appendChild(g);
+    });
+
+    svg.append(defs, edges, nodes);
+
+    const [minX, minY, maxX, maxY] = layout.bounds;
+    const pad = 60;
+    enablePanZoom(svg, { x: minX - pad, y: minY - pad,
+                         w: maxX - minX + NODE_SIZE + 2 * pad, h: maxY - minY + NODE_SIZE + 2 * pad });
+}
+
+function enablePanZoom(svg, view) {
+    const apply = () => {
+        svg.setAttribute('viewBox', `${view.x} ${view.y} ${view.w} ${view.h}`);
+        // Level of detail: hide labels once a tool box is too small to read (< ~14px)
+        const pxPerUnit = svg.getBoundingClientRect().width / view.w;
+        svg.classList.toggle('lod-no-labels', NODE_SIZE * pxPerUnit < 14);
+    };
+    apply();
+
+    svg.onwheel = (e) => {
+        e.preventDefault();
+        const rect = svg.getBoundingClientRect();
+        const scale = e.deltaY > 0 ? 1.15 : 1 / 1.15;
+        // Zoom around the cursor
+        const px = view.x + (e.clientX - rect.left) / rect.width * view.w;
+        const py = view.y + (e.clientY - rect.top) / rect.height * view.h;
+        view.x = px - (px - view.x) * scale;
+        view.y = py - (py - view.y) * scale;
+        view.w *= scale;
+        view.h *= scale;
+        apply();
+    };
+
+    let drag = null;
+    svg.onmousedown = (e) => { drag = { x: e.clientX, y: e.clientY }; svg.classList.add('cursor-grabbing'); };
+    window.addEventListener('mouseup', () => { drag = null; svg.classList.remove('cursor-grabbing'); });
+    svg.onmousemove = (e) => {
+        if (!drag) return;
+        const rect = svg.getBoundingClientRect();
+        view.x -= (e.clientX - drag.x) / rect.width * view.w;
+        view.y -= (e.clientY - drag.y) / rect.height * view.h;
+        drag = { x: e.clientX, y: e.clientY };
+        apply();
+    };
+}
+
 // --- STEP 3: TERMINAL STREAM ---
 function startTerminal() {
     transitionTo('terminal');
@@ -62,6 +185,8 @@ function startTerminal() {
 
     const eventSource = new EventSource(`/stream_conversion/${sessionID}`);
 
+    // On a dropped connection EventSource reconnects by itself and sends
+    // Last-Event-ID, so the server replays only the events we missed.
     eventSource.onmessage = function(e) {
         const data = JSON.parse(e.data);
 
@@ -69,6 +194,16 @@ function startTerminal() {
         progressBar.style.width = `${data.progress}%`;
         progressText.innerText = `${data.progress}%`;
 
+        // Job failed (e.g. session expired): stay on the terminal and show why
+        if (data.failed) {
+            eventSource.close();
+            const err = document.createElement('div');
+            err.className = 'log-line error';
+            err.innerText = data.log;
+            terminalBody.appendChild(err);
+            return;
+        }
+
         // Check if Done
         if (data.done) {
             eventSource.close();
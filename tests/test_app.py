@@ -0,0 +1,36 @@
+import uuid
+import unittest
+
+import app
+from src import conversion_jobs
+
+PLACEHOLDER = "// No conversion found"
+
+
+class BuildEditsTest(unittest.TestCase):
+    def setUp(self):
+        self.session_id = str(uuid.uuid4())
+        node = {"id": "1", "type": "Formula", "x": 0, "y": 0,
+                "config": {"formulas": [{"field": "a"}, {"field": "b"}],
+                           "reviewed_js": {"a": PLACEHOLDER, "b": PLACEHOLDER}}}
+        app.SESSIONS.save(self.session_id, {"filename": "t.yxmd", "filepath": "", "graph": {"nodes": [node], "edges": []}})
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.SESSIONS.delete(self.session_id)
+
+    def test_only_changed_fields_survive_a_late_conversion(self):
+        # A stale review page posts an untouched placeholder next to a real edit
+        edits = {"1": {"js_code": {"a": "var x = 1;", "b": PLACEHOLDER}}}
+        self.assertEqual(self.client.post(f"/build/{self.session_id}", json=edits).status_code, 200)
+
+        latest = app.SESSIONS.get(self.session_id)
+        self.assertEqual(latest['graph']['nodes'][0]['config']['edited_fields'], ["a"])
+
+        finished = {"nodes": [{"id": "1", "config": {"reviewed_js": {"a": "converted a", "b": "converted b"}}}]}
+        conversion_jobs.merge_converted(latest, finished)
+        self.assertEqual(latest['graph']['nodes'][0]['config']['reviewed_js'], {"a": "var x = 1;", "b": "converted b"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+import xml.etree.ElementTree as ET
+
+from src import builder
+
+
+def graph_with_container(caption):
+    return {
+        "nodes": [
+            {"id": "1", "type": "ToolContainer", "config": {"caption": caption}, "x": 0, "y": 0},
+            {"id": "2", "type": "Union", "config": {}, "x": 100, "y": 100, "container": "1"},
+            {"id": "3", "type": "Union", "config": {}, "x": 200, "y": 100, "container": "1"},
+        ],
+        "edges": [{"source": "2", "target": "3"}],
+    }
+
+
+class MetanodeCaptionTest(unittest.TestCase):
+    def test_caption_with_xml_special_characters(self):
+        caption = 'Sales & Returns "Q1" <draft>'
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "out.knwf")
+            stats = builder.build_skeleton(graph_with_container(caption), output_path=output,
+                                           workers=1, partition="containers")
+            with open(output, 'rb') as f:
+                archive = zipfile.ZipFile(io.BytesIO(f.read()))
+
+        self.assertEqual(stats['metanodes'], 1)
+        metanode_files = [name for name in archive.namelist()
+                          if name.endswith("/workflow.knime") and name != "Workflow/workflow.knime"]
+        self.assertEqual(len(metanode_files), 1)
+        for name in archive.namelist():
+            if name.endswith((".knime", ".xml")):
+                ET.fromstring(archive.read(name))   # every file stays well-formed
+
+        root = ET.fromstring(archive.read(metanode_files[0]))
+        names = [e.get("value") for e in root if e.get("key") == "name"]
+        self.assertEqual(names, [caption])
+
+
+if __name__ == "__main__":
+    unittest.main()
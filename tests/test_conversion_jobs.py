@@ -0,0 +1,70 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from src.conversion_jobs import JobStore
+
+
+class JobStoreConcurrencyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_is_created_lazily(self):
+        self.assertFalse(os.path.exists(self.store.db_path))
+        self.store.create("session")
+        self.assertTrue(os.path.exists(self.store.db_path))
+
+    def test_concurrent_appends_get_unique_sequence_numbers(self):
+        job_id = self.store.create("session")
+        seqs, errors = [], []
+        barrier = threading.Barrier(8)
+
+        def append(worker):
+            barrier.wait()
+            try:
+                for i in range(50):
+                    seqs.append(self.store.append_event(job_id, {"progress": i, "log": f"{worker}-{i}"}))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=append, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(seqs), list(range(1, 401)))
+        self.assertEqual([seq for seq, _ in self.store.events_after(job_id, 0)], list(range(1, 401)))
+
+    def test_concurrent_claims_create_one_job(self):
+        results = []
+        barrier = threading.Barrier(8)
+
+        def claim():
+            barrier.wait()
+            results.append(self.store.claim("session", stale_seconds=60))
+
+        threads = [threading.Thread(target=claim) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({job_id for job_id, _ in results}), 1)
+        self.assertEqual(sum(created for _, created in results), 1)
+
+    def test_stale_job_is_replaced(self):
+        job_id, _ = self.store.claim("session", stale_seconds=60)
+        replacement, created = self.store.claim("session", stale_seconds=-1)
+        self.assertTrue(created)
+        self.assertNotEqual(job_id, replacement)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import time
+import unittest
+
+from src import render_jobs
+
+
+class RenderStatusTest(unittest.TestCase):
+    def tearDown(self):
+        render_jobs.reset_pool()
+
+    def wait_for(self, key, timeout=60):
+        deadline = time.time() + timeout
+        state, detail = render_jobs.status(key)
+        while state == "pending" and time.time() < deadline:
+            time.sleep(0.1)
+            state, detail = render_jobs.status(key)
+        return state, detail
+
+    def test_empty_graph_is_reported_as_failed(self):
+        key = render_jobs.submit({"nodes": [], "edges": []}, "auto")
+        self.assertEqual(self.wait_for(key), ("failed", "Nothing to render"))
+        # Reported once: asking again means nothing is known here any more
+        self.assertEqual(render_jobs.status(key), ("missing", None))
+
+
+if __name__ == "__main__":
+    unittest.main()